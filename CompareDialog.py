@@ -0,0 +1,75 @@
+from PyQt6.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QCheckBox,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QAbstractItemView,
+    QHeaderView,
+)
+from SweepDialog import NumericItem
+
+
+class CompareDialog(QDialog):
+    """Pick the architectures to train side by side; after exec(), models is the checked list."""
+
+    def __init__(self, models, selected=(), parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Compare models")
+        self.models = []
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("Train these models in parallel on the selected graph data\n"
+                                "(current training and model parameters):"))
+        self.checks = {}
+        for name in models:
+            check = QCheckBox(name.upper())
+            check.setChecked(name in selected)
+            check.toggled.connect(self.update_ok)
+            self.checks[name] = check
+            layout.addWidget(check)
+        self.btnOk = QPushButton("Start")
+        self.btnOk.clicked.connect(self.accept)
+        btnClose = QPushButton("Cancel")
+        btnClose.clicked.connect(self.reject)
+        buttons = QHBoxLayout()
+        buttons.addStretch(1)
+        buttons.addWidget(self.btnOk)
+        buttons.addWidget(btnClose)
+        layout.addLayout(buttons)
+        self.update_ok()
+
+    def update_ok(self):
+        self.models = [name for name, check in self.checks.items() if check.isChecked()]
+        self.btnOk.setEnabled(len(self.models) > 0)
+
+
+class ComparisonResults(QDialog):
+    """Metrics and throughput of a compare run, one row per model (see compare_models.comparison_frame)."""
+
+    def __init__(self, frame, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Model comparison")
+        self.resize(900, 300)
+        table = QTableWidget(len(frame), len(frame.columns))
+        table.setHorizontalHeaderLabels([str(c) for c in frame.columns])
+        table.verticalHeader().hide()
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        for row, values in enumerate(frame.itertuples(index=False)):
+            for col, value in enumerate(values):
+                if isinstance(value, str):
+                    item = QTableWidgetItem(value)
+                elif value is None or value != value: # missing (None / NaN)
+                    item = NumericItem("", float("-inf"))
+                else:
+                    item = NumericItem(f"{value:.4g}" if isinstance(value, float) else str(value), value)
+                table.setItem(row, col, item)
+        table.setSortingEnabled(True)
+        btnClose = QPushButton("Close")
+        btnClose.clicked.connect(self.accept)
+        layout = QVBoxLayout(self)
+        layout.addWidget(table)
+        layout.addWidget(btnClose)
@@ -0,0 +1,32 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+
+class DataFrameModel(QAbstractTableModel):
+    """Read-only table model over a DataFrame: cells are formatted only when the view paints them."""
+
+    def __init__(self, data=None, parent=None):
+        super().__init__(parent)
+        self._data = data
+
+    def set_data(self, data):
+        self.beginResetModel()
+        self._data = data
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if self._data is None or parent.isValid() else len(self._data)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if self._data is None or parent.isValid() else len(self._data.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        return str(self._data.iat[index.row(), index.column()])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or self._data is None:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return str(self._data.columns[section])
+        return str(section + 1)
@@ -0,0 +1,122 @@
+import itertools
+from PyQt6.QtCore import QObject, pyqtSignal
+from WorkThread import Worker
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class Job:
+    """One queued task: fn(conf, *args) with its own config snapshot, run in its own process."""
+    _ids = itertools.count(1)
+
+    def __init__(self, name, fn, conf, args, on_done=None):
+        self.id = next(Job._ids)
+        self.name = name
+        self.fn = fn
+        self.conf = conf
+        self.args = args
+        self.on_done = on_done
+        self.status = "queued" # queued, running, done, failed, cancelled
+        self.message = ""
+        self.worker = None
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+
+class JobQueue(QObject):
+    """
+    Bounded queue of background jobs: at most max_running run at once (one spawned process each, so a
+    job can be cancelled on its own), at most max_pending wait for a slot. The GUI stays usable meanwhile.
+    """
+    # Signal emitted when a job was added or its status / progress changed
+    changed = pyqtSignal(object)
+    # Signal emitted when a job got a slot and its process is about to start
+    started = pyqtSignal(object)
+    # Signal emitted with (job, error dict) when a job failed
+    failed = pyqtSignal(object, object)
+
+    def __init__(self, max_running=2, max_pending=8, parent=None):
+        super().__init__(parent)
+        self.max_running = max(1, max_running)
+        self.max_pending = max_pending
+        self.jobs = []
+
+    def running(self):
+        return [j for j in self.jobs if j.status == "running"]
+
+    def pending(self):
+        return [j for j in self.jobs if j.status == "queued"]
+
+    def submit(self, name, fn, conf, *args, on_done=None):
+        """Queue fn(conf, *args); conf should be a snapshot (see config.snapshot_config). Raises QueueFull."""
+        if len(self.pending()) >= self.max_pending:
+            raise QueueFull(f"{len(self.pending())} jobs are already waiting")
+        job = Job(name, fn, conf, args, on_done)
+        self.jobs.append(job)
+        self.changed.emit(job)
+        self._start_next()
+        return job
+
+    def cancel(self, job):
+        if job.status == "queued":
+            self._set(job, "cancelled")
+        elif job.status == "running":
+            job.message = "Cancelling..."
+            self.changed.emit(job)
+            job.worker.cancel()
+
+    def cancel_all(self):
+        for job in list(self.jobs):
+            self.cancel(job)
+
+    def shutdown(self):
+        """Cancel every job and wait for the running ones' processes to be gone (on exit)."""
+        self.cancel_all()
+        for job in self.jobs:
+            if job.worker is not None:
+                job.worker.wait()
+
+    def clear_finished(self):
+        for job in self.jobs:
+            if not job.active and job.worker is not None:
+                job.worker.wait()
+        self.jobs = [j for j in self.jobs if j.active]
+
+    def _set(self, job, status, message=""):
+        job.status = status
+        job.message = message
+        self.changed.emit(job)
+
+    def _start_next(self):
+        while len(self.running()) < self.max_running and self.pending():
+            job = self.pending()[0]
+            job.worker = Worker(job.fn, job.conf, *job.args, subprocess=True)
+            job.worker.progress.connect(lambda info, job=job: self._on_progress(job, info))
+            job.worker.finished.connect(lambda result, job=job: self._on_finished(job, result))
+            job.worker.failed.connect(lambda error, job=job: self._on_failed(job, error))
+            job.worker.cancelled.connect(lambda job=job: self._on_stopped(job, "cancelled"))
+            self._set(job, "running")
+            self.started.emit(job)
+            job.worker.start()
+
+    def _on_progress(self, job, info):
+        job.message = info.get("message", "")
+        self.changed.emit(job)
+
+    def _on_finished(self, job, result):
+        self._on_stopped(job, "done")
+        if job.on_done is not None:
+            job.on_done(job, result)
+
+    def _on_failed(self, job, error):
+        self._on_stopped(job, "failed", error["message"])
+        self.failed.emit(job, error)
+
+    def _on_stopped(self, job, status, message=""):
+        # job keeps its worker: the thread may still be returning from run()
+        self._set(job, status, message)
+        self._start_next()
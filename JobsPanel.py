@@ -0,0 +1,69 @@
+from PyQt6.QtWidgets import (
+    QDockWidget,
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QAbstractItemView,
+    QHeaderView,
+)
+
+
+class JobsPanel(QDockWidget):
+    """Floating list of the JobQueue's jobs (status and last progress message), with cancel / clear."""
+    COLUMNS = ["#", "Job", "Status", "Progress"]
+
+    def __init__(self, queue, parent=None):
+        super().__init__("Jobs", parent)
+        self.queue = queue
+        self.rows = {} # job id -> table row
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.btnCancelJob = QPushButton("Cancel job")
+        self.btnClearJobs = QPushButton("Clear finished")
+        self.btnCancelJob.clicked.connect(self.cancel_selected)
+        self.btnClearJobs.clicked.connect(self.clear_finished)
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.btnCancelJob)
+        buttons.addWidget(self.btnClearJobs)
+        body = QWidget()
+        layout = QVBoxLayout(body)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+        self.setWidget(body)
+        self.resize(520, 260)
+        queue.changed.connect(self.update_job)
+
+    def update_job(self, job):
+        row = self.rows.get(job.id)
+        if row is None:
+            row = self.rows[job.id] = self.table.rowCount()
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(str(job.id)))
+            self.table.setItem(row, 1, QTableWidgetItem(job.name))
+            self.table.setItem(row, 2, QTableWidgetItem())
+            self.table.setItem(row, 3, QTableWidgetItem())
+        self.table.item(row, 2).setText(job.status)
+        self.table.item(row, 3).setText(job.message)
+        self.table.item(row, 3).setToolTip(job.message)
+
+    def selected_jobs(self):
+        ids = {int(self.table.item(i.row(), 0).text()) for i in self.table.selectionModel().selectedRows()}
+        return [j for j in self.queue.jobs if j.id in ids]
+
+    def cancel_selected(self):
+        for job in self.selected_jobs():
+            self.queue.cancel(job)
+
+    def clear_finished(self):
+        self.queue.clear_finished()
+        self.table.setRowCount(0)
+        self.rows = {}
+        for job in self.queue.jobs:
+            self.update_job(job)
@@ -1,27 +1,77 @@
 import os
 import time
-from PyQt6.QtCore import QThread, pyqtSignal
+import fnmatch
+from PyQt6.QtCore import QThread, QTimer, QFileSystemWatcher, pyqtSignal
 
 class LogFileWatcher(QThread):
+    """Wait for a new log file in folder: directory change notifications plus a slow fallback poll."""
     logfile_found = pyqtSignal(str)
 
-    def __init__(self, folder, pattern="*.log", poll_interval=2, parent=None):
+    def __init__(self, folder, pattern="*.log", poll_interval=2, since=None, parent=None):
         super().__init__(parent)
         self.folder = folder
         self.pattern = pattern
         self.poll_interval = poll_interval
-        self._running = True
+        # only logs written after the watcher was created (older runs share the folder)
+        self.since = time.time() if since is None else since
+        self._stopping = False # quit() before run() reaches exec() is lost: run() and scan() check this
 
     def run(self):
-        while self._running:
-            files = [f for f in os.listdir(self.folder) if f.endswith(".log")]
-            if files:
-                files = sorted(files, key=lambda f: os.path.getmtime(os.path.join(self.folder, f)), reverse=True)
-                latest = os.path.join(self.folder, files[0])
+        # created here so notifications and the poll timer are handled by this thread's event loop
+        watcher = QFileSystemWatcher()
+        timer = QTimer()
+
+        def scan():
+            if self._stopping:
+                timer.stop()
+                self.quit()
+                return
+            if self.folder not in watcher.directories():
+                if os.path.isdir(self.folder):
+                    watcher.addPath(self.folder)
+                elif not watcher.directories():
+                    # the folder may only be created by the training run: watch its parent until then
+                    parent = os.path.dirname(os.path.abspath(self.folder))
+                    if os.path.isdir(parent):
+                        watcher.addPath(parent)
+            latest = self.find_latest()
+            if latest is not None:
+                timer.stop()
                 print(latest)
                 self.logfile_found.emit(latest)
-                break  # stop after found
+                self.quit()
+
+        watcher.directoryChanged.connect(lambda _: scan())
+        # fallback for file systems without notifications (network shares, some containers)
+        timer.timeout.connect(scan)
+        timer.start(int(self.poll_interval * 1000))
+        scan()
+        if timer.isActive() and not self._stopping:
+            # a stop() landing between the check and exec() is picked up by the next poll
+            self.exec()
+        timer.stop()
+        if watcher.directories():
+            watcher.removePaths(watcher.directories())
+
+    def find_latest(self):
+        """Newest file matching pattern written since the watcher started, None if there is none yet."""
+        try:
+            names = [f for f in os.listdir(self.folder) if fnmatch.fnmatch(f, self.pattern)]
+        except OSError:
+            return None
+        latest, latest_mtime = None, None
+        for name in names:
+            path = os.path.join(self.folder, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError: # removed in between
+                continue
+            # 1 s slack for file systems with coarse timestamps
+            if mtime >= self.since - 1 and (latest_mtime is None or mtime > latest_mtime):
+                latest, latest_mtime = path, mtime
+        return latest
 
     def stop(self):
-        self._running = False
-        self.wait()
\ No newline at end of file
+        self._stopping = True
+        self.quit()
+        self.wait()
@@ -1,33 +1,51 @@
+import os
 import time
 from PyQt6.QtCore import QThread, pyqtSignal
 
 class LogPrinter(QThread):
-    newLine = pyqtSignal(str)
+    """Tail a log file, emitting new lines in chunks (every flush_ms or max_lines lines)."""
+    newLines = pyqtSignal(str)
 
-    def __init__(self, path, parent=None):
+    def __init__(self, path, flush_ms=50, max_lines=500, tail_kb=None, parent=None):
         super().__init__(parent)
         self.path = path
+        self.flush_interval = flush_ms / 1000
+        self.max_lines = max_lines
+        self.tail_bytes = tail_kb * 1024 if tail_kb else None # start near the end of big files
         self._running = True
 
     def run(self):
         try:
-            with open(self.path, "r") as f:
-                # print every line already in file
-                for line in f:
-                    if not self._running:
-                        return
-                    self.newLine.emit(line.rstrip("\n"))
-
-                # tail file -- read new lines as they arrive
+            with open(self.path, "r", errors="replace") as f:
+                size = os.fstat(f.fileno()).st_size
+                if self.tail_bytes and size > self.tail_bytes:
+                    f.seek(size - self.tail_bytes)
+                    f.readline() # drop the cut line
+                    self.newLines.emit(f"[... skipped {(size - self.tail_bytes) // 1024} KB of earlier log ...]")
+                chunk, partial = [], ""
+                last_flush = time.monotonic()
                 while self._running:
                     line = f.readline()
-                    if line:
-                        self.newLine.emit(line.rstrip("\n"))
-                    else:
-                        time.sleep(0.2)
+                    if line.endswith("\n"):
+                        chunk.append((partial + line).rstrip("\n"))
+                        partial = ""
+                    elif line:
+                        partial += line # writer is mid-line, wait for the rest
+                    idle = not line or not line.endswith("\n")
+                    if chunk and (idle or len(chunk) >= self.max_lines
+                                  or time.monotonic() - last_flush >= self.flush_interval):
+                        self.newLines.emit("\n".join(chunk))
+                        chunk = []
+                        last_flush = time.monotonic()
+                    if idle:
+                        time.sleep(self.flush_interval)
+                if partial:
+                    chunk.append(partial)
+                if chunk:
+                    self.newLines.emit("\n".join(chunk))
         except Exception as e:
-            self.newLine.emit(f"[Error tailing file: {e}]")
+            self.newLines.emit(f"[Error tailing file: {e}]")
 
     def stop(self):
         self._running = False
-        self.wait()
\ No newline at end of file
+        self.wait()
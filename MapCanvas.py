@@ -0,0 +1,299 @@
+"""
+Interactive map of a mapping result: partitions coloured by point count and the event points,
+drawn from memory with QGraphicsView.
+
+Levels of detail: zoomed out, both layers are pre-rendered overview images (cells painted once,
+points binned into a density raster). Zoomed in, the scene's spatial index culls the map to the
+visible chunks (the extent split into a grid), and each chunk draws its cells as cached paths
+simplified to the current pixel size, and its points as individual markers.
+"""
+import math
+import numpy as np
+from PyQt6.QtCore import Qt, QRectF, QPointF
+from PyQt6.QtGui import QColor, QImage, QPainter, QPainterPath, QPen, QBrush, QPolygonF, QPixmapCache
+from PyQt6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsItem, QStyleOptionGraphicsItem
+import density_render
+
+CHUNKS = 64 # chunk grid per side
+OVERVIEW_PX = 4096 # long side of the cells overview image (the density image is half of it)
+MAX_VECTOR_CELLS = 6000 # more visible cells than this: overview image instead of vector cells
+MAX_VECTOR_POINTS = 10000 # more visible points than this: density image instead of markers
+CHUNK_CACHE_MB = 128 # pixmap cache for drawn chunks (pans blit them instead of redrawing)
+# viridis, 8 steps (log point count bins)
+PALETTE = ["#440154", "#46327e", "#365c8d", "#277f8e", "#1fa187", "#4ac16d", "#a0da39", "#fde725"]
+
+
+class MapLayers:
+    """Projected, chunked and pre-rendered data of one mapping result (built off the GUI thread)."""
+
+    def __init__(self, geoms, color_bin, cell_chunk, points_xy, point_offsets, extent, chunk_rects,
+                 cells_image, points_image):
+        self.geoms = geoms # shapely polygons in scene coordinates (y flipped)
+        self.color_bin = color_bin
+        self.cell_chunk = cell_chunk # chunk id -> cell indices
+        self.points_xy = points_xy # points sorted by chunk
+        self.point_offsets = point_offsets # chunk id -> slice start/end into points_xy
+        self.extent = extent # QRectF of everything
+        self.chunk_rects = chunk_rects # chunk id -> (x0, y0, x1, y1) of its cells and points
+        self.cells_image = cells_image
+        self.points_image = points_image
+        self.cell_counts = np.array([len(c) for c in cell_chunk]) # cells per chunk
+
+
+def prepare_map_layers(partition_gdf, points_gdf, point_to_partition, crs="EPSG:3857",
+                       chunks=CHUNKS, overview_px=OVERVIEW_PX):
+    """Worker function: project, index and pre-render a mapping result for MapCanvas."""
+    import shapely
+    import pandas as pd
+    regions = partition_gdf.to_crs(crs)
+    # scene y grows downwards
+    geoms = shapely.transform(regions.geometry.values, lambda c: c * np.array([1.0, -1.0]))
+    bounds = shapely.bounds(geoms)
+    p2x = np.asarray(point_to_partition, dtype=np.int64)
+    counts = pd.Series(p2x[p2x >= 0]).value_counts().reindex(regions.index, fill_value=0).to_numpy()
+    log_counts = np.log1p(counts)
+    color_bin = np.minimum((log_counts / max(log_counts.max(), 1e-9) * len(PALETTE)).astype(np.int64), len(PALETTE) - 1)
+
+    px, py = density_render.project_xy(points_gdf, crs)
+    py = -np.asarray(py)
+    px = np.asarray(px)
+    x0 = min(np.nanmin(bounds[:, 0]), px.min() if len(px) else np.inf)
+    y0 = min(np.nanmin(bounds[:, 1]), py.min() if len(py) else np.inf)
+    x1 = max(np.nanmax(bounds[:, 2]), px.max() if len(px) else -np.inf)
+    y1 = max(np.nanmax(bounds[:, 3]), py.max() if len(py) else -np.inf)
+    size = max(x1 - x0, y1 - y0) or 1.0
+
+    def chunk_of(x, y):
+        cx = np.clip(((x - x0) / size * chunks).astype(np.int64), 0, chunks - 1)
+        cy = np.clip(((y - y0) / size * chunks).astype(np.int64), 0, chunks - 1)
+        return cy * chunks + cx
+
+    n_chunks = chunks * chunks
+    # cells belong to the chunk of their bbox centre; a chunk's rect grows to cover its cells
+    cell_ids = chunk_of((bounds[:, 0] + bounds[:, 2]) / 2, (bounds[:, 1] + bounds[:, 3]) / 2)
+    order = np.argsort(cell_ids, kind="stable")
+    splits = np.searchsorted(cell_ids[order], np.arange(n_chunks + 1))
+    cell_chunk = [order[splits[i]:splits[i + 1]] for i in range(n_chunks)]
+    point_ids = chunk_of(px, py)
+    porder = np.argsort(point_ids, kind="stable")
+    points_xy = np.column_stack([px[porder], py[porder]])
+    point_offsets = np.searchsorted(point_ids[porder], np.arange(n_chunks + 1))
+
+    step = size / chunks
+    chunk_rects = np.empty((n_chunks, 4))
+    for i in range(n_chunks):
+        cx, cy = x0 + (i % chunks) * step, y0 + (i // chunks) * step
+        rect = [cx, cy, cx + step, cy + step]
+        cells = cell_chunk[i]
+        if len(cells):
+            b = bounds[cells]
+            rect = [min(rect[0], b[:, 0].min()), min(rect[1], b[:, 1].min()),
+                    max(rect[2], b[:, 2].max()), max(rect[3], b[:, 3].max())]
+        chunk_rects[i] = rect
+
+    extent = (x0, y0, x1, y1)
+    scale = overview_px / size
+    cells_image = paint_cells_overview(geoms, color_bin, extent, scale)
+    points_image = density_image(px, py, extent, scale / 2)
+    layers = MapLayers(geoms, color_bin, cell_chunk, points_xy, point_offsets,
+                       QRectF(x0, y0, x1 - x0, y1 - y0), chunk_rects, cells_image, points_image)
+    return {"status": "ok", "layers": layers}
+
+
+def paint_cells_overview(geoms, color_bin, extent, scale):
+    """All cells painted once into an image, simplified to the image resolution."""
+    import shapely
+    x0, y0, x1, y1 = extent
+    img = QImage(max(1, math.ceil((x1 - x0) * scale)), max(1, math.ceil((y1 - y0) * scale)),
+                 QImage.Format.Format_ARGB32_Premultiplied)
+    img.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(img)
+    painter.scale(scale, scale)
+    painter.translate(-x0, -y0)
+    painter.setPen(QPen(QColor(0, 0, 0, 140), 0))
+    simplified = shapely.simplify(geoms, 0.5 / scale)
+    for b, color in enumerate(PALETTE):
+        painter.setBrush(QBrush(QColor(color)))
+        painter.setOpacity(0.6)
+        painter.drawPath(polygons_path(simplified[color_bin == b]))
+    painter.end()
+    return img
+
+
+def density_image(x, y, extent, scale):
+    """Point density (log scale, transparent where empty) as an image over extent."""
+    x0, y0, x1, y1 = extent
+    res = max(1, int(max(x1 - x0, y1 - y0) * scale))
+    counts = density_render.bin_points(np.asarray(x), np.asarray(y), (x0, x1, y0, y1), resolution=res)
+    level = np.log1p(counts) / max(np.log1p(counts.max()), 1e-9)
+    rgba = np.zeros(counts.shape + (4,), dtype=np.uint8)
+    # premultiplied red ramp, alpha by density
+    alpha = np.where(counts > 0, 80 + level * 175, 0).astype(np.uint8)
+    rgba[..., 2] = alpha # B,G,R,A byte order of ARGB32 on little endian
+    rgba[..., 3] = alpha
+    rgba = np.ascontiguousarray(rgba)
+    h, w = counts.shape
+    return QImage(rgba.data, w, h, w * 4, QImage.Format.Format_ARGB32_Premultiplied).copy()
+
+
+def polygons_path(geoms):
+    """One QPainterPath holding the rings of all (multi)polygons."""
+    import shapely
+    path = QPainterPath()
+    path.setFillRule(Qt.FillRule.OddEvenFill)
+    rings = shapely.get_rings(shapely.get_parts(geoms))
+    coords, ring_idx = shapely.get_coordinates(rings, return_index=True)
+    if not len(coords):
+        return path
+    starts = np.flatnonzero(np.r_[True, ring_idx[1:] != ring_idx[:-1]])
+    ends = np.r_[starts[1:], len(coords)]
+    for s, e in zip(starts, ends):
+        path.addPolygon(QPolygonF([QPointF(x, y) for x, y in coords[s:e]]))
+    return path
+
+
+class ChunkItem(QGraphicsItem):
+    """Cells (or points) of one chunk, built lazily per level of detail and cached."""
+
+    def __init__(self, layers, chunk, kind, parent=None):
+        super().__init__(parent)
+        self.layers = layers
+        self.chunk = chunk
+        self.kind = kind
+        x0, y0, x1, y1 = layers.chunk_rects[chunk]
+        self._rect = QRectF(x0, y0, x1 - x0, y1 - y0)
+        self._paths = {} # lod level -> [(brush index, QPainterPath)]
+        self._points = None
+        self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+
+    def boundingRect(self):
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        if self.kind == "points":
+            if self._points is None:
+                s, e = self.layers.point_offsets[self.chunk], self.layers.point_offsets[self.chunk + 1]
+                self._points = QPolygonF([QPointF(x, y) for x, y in self.layers.points_xy[s:e]])
+            pen = QPen(QColor(220, 20, 20, 180), 3)
+            pen.setCosmetic(True) # 3 px at any zoom
+            painter.setPen(pen)
+            painter.drawPoints(self._points)
+            return
+        level = max(0, int(math.log2(lod))) if lod > 0 else 0 # paths rebuilt per doubling of the zoom
+        paths = self._paths.get(level)
+        if paths is None:
+            paths = self._paths[level] = self._build(0.5 / (2 ** level))
+            while len(self._paths) > 3:
+                self._paths.pop(next(iter(self._paths)))
+        painter.setPen(QPen(QColor(0, 0, 0, 160), 0))
+        painter.setOpacity(0.6)
+        for b, path in paths:
+            painter.setBrush(QBrush(QColor(PALETTE[b])))
+            painter.drawPath(path)
+
+    def _build(self, tolerance):
+        import shapely
+        cells = self.layers.cell_chunk[self.chunk]
+        geoms = shapely.simplify(self.layers.geoms[cells], tolerance)
+        bins = self.layers.color_bin[cells]
+        return [(b, polygons_path(geoms[bins == b])) for b in np.unique(bins)]
+
+
+class LayerItem(QGraphicsItem):
+    """Parent of the chunks of one layer: one setVisible switches the whole layer."""
+
+    def __init__(self):
+        super().__init__()
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemHasNoContents)
+
+    def boundingRect(self):
+        return QRectF()
+
+    def paint(self, painter, option, widget=None):
+        pass
+
+
+class OverviewItem(QGraphicsItem):
+    def __init__(self, image, rect):
+        super().__init__()
+        self.image = image
+        self.rect = rect
+        # scaled once per zoom level, pans only blit the cached pixels
+        self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+
+    def boundingRect(self):
+        return self.rect
+
+    def paint(self, painter, option, widget=None):
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.drawImage(self.rect, self.image)
+
+
+class MapCanvas(QGraphicsView):
+    """Pan (drag) and zoom (wheel) map of the partitions and points of a mapping result."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setScene(QGraphicsScene(self))
+        self.layers = None
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.SmartViewportUpdate)
+        self.setOptimizationFlags(QGraphicsView.OptimizationFlag.DontSavePainterState
+                                  | QGraphicsView.OptimizationFlag.DontAdjustForAntialiasing)
+        self.setBackgroundBrush(QColor(245, 245, 245))
+        QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), CHUNK_CACHE_MB * 1024))
+
+    def set_layers(self, layers):
+        scene = self.scene()
+        scene.clear()
+        self.layers = None # no detail switching until the items exist
+        rect = layers.extent
+        scene.setSceneRect(rect.adjusted(-rect.width() * 0.05, -rect.height() * 0.05, rect.width() * 0.05, rect.height() * 0.05))
+        self.cells_overview = OverviewItem(layers.cells_image, rect)
+        self.points_overview = OverviewItem(layers.points_image, rect)
+        self.points_overview.setZValue(2)
+        self.cells_layer = LayerItem()
+        self.points_layer = LayerItem()
+        self.points_layer.setZValue(3)
+        for chunk, cells in enumerate(layers.cell_chunk):
+            if len(cells):
+                ChunkItem(layers, chunk, "cells", self.cells_layer)
+            if layers.point_offsets[chunk + 1] > layers.point_offsets[chunk]:
+                ChunkItem(layers, chunk, "points", self.points_layer)
+        for item in (self.cells_overview, self.points_overview, self.cells_layer, self.points_layer):
+            scene.addItem(item)
+        self.layers = layers
+        self.fitInView(rect, Qt.AspectRatioMode.KeepAspectRatio)
+        self.update_detail()
+
+    def update_detail(self):
+        """Switch each layer between overview image and vector chunks for the current view."""
+        if self.layers is None:
+            return
+        # cells and points in the visible chunks
+        view = self.mapToScene(self.viewport().rect()).boundingRect()
+        r = self.layers.chunk_rects
+        hit = (r[:, 0] < view.right()) & (r[:, 2] > view.left()) & (r[:, 1] < view.bottom()) & (r[:, 3] > view.top())
+        vector_cells = int(self.layers.cell_counts[hit].sum()) <= MAX_VECTOR_CELLS
+        self.cells_layer.setVisible(vector_cells)
+        self.cells_overview.setVisible(not vector_cells)
+        offsets = self.layers.point_offsets
+        vector_points = int((offsets[1:] - offsets[:-1])[hit].sum()) <= MAX_VECTOR_POINTS
+        self.points_layer.setVisible(vector_points)
+        self.points_overview.setVisible(not vector_points)
+
+    def wheelEvent(self, event):
+        factor = 1.25 if event.angleDelta().y() > 0 else 0.8
+        self.scale(factor, factor)
+        self.update_detail()
+        event.accept()
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.update_detail()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_detail()
@@ -1,5 +1,5 @@
 from PyQt6.QtGui import QPainter
-from PyQt6.QtCore import Qt, QSize, QRectF, QThread, pyqtSignal, QCoreApplication
+from PyQt6.QtCore import Qt, QSize, QRectF, QObject, QRunnable, QThreadPool, pyqtSignal, QCoreApplication
 from PyQt6.QtPdf import QPdfDocument
 from PyQt6.QtPdfWidgets import QPdfView
 from PyQt6.QtSvg import QSvgGenerator
@@ -8,28 +8,52 @@ from PyQt6.QtWidgets import (
     QMessageBox,
     QWidget,
     QVBoxLayout,
+    QStackedLayout,
 )
-import os, shutil
+import os, shutil, time
+from collections import OrderedDict
 from utils import filter_pdf
+from TiledPdfView import TiledPdfView
 
-class PdfLoaderThread(QThread):
-    loaded = pyqtSignal(object, int)  # (QPdfDocument or None, index)
+class PdfLoaderSignals(QObject):
+    loaded = pyqtSignal(object, object, int)  # (QPdfDocument, None on error or False if skipped; key; generation)
 
-    def __init__(self, path, index, parent=None):
-        super().__init__(parent)
-        self.path = path
-        self.index = index
+
+class PdfLoader(QRunnable):
+    """Parse one PDF on the shared loader pool; results are tagged with the request generation."""
+    def __init__(self, key, generation, is_current):
+        super().__init__()
+        self.key = key
+        self.generation = generation
+        self.is_current = is_current
+        # created on the GUI thread, so the result is delivered there
+        self.signals = PdfLoaderSignals()
 
     def run(self):
+        if not self.is_current(self.generation):
+            # outdated before it started (user clicked on)
+            self.signals.loaded.emit(False, self.key, self.generation)
+            return
         doc = QPdfDocument(None)
-        err = doc.load(self.path)
+        err = doc.load(self.key[0])
         if err != QPdfDocument.Error.None_:
             # emit None on error
-            self.loaded.emit(None, self.index)
+            self.signals.loaded.emit(None, self.key, self.generation)
         else:
             # move the doc into the GUI thread
             doc.moveToThread(QCoreApplication.instance().thread())
-            self.loaded.emit(doc, self.index)
+            self.signals.loaded.emit(doc, self.key, self.generation)
+
+
+_pool = None
+
+def loader_pool():
+    """Small pool shared by all viewers: threads are reused and never joined on the GUI thread."""
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(2)
+    return _pool
 
 
 class PdfView(QPdfView):
@@ -51,15 +75,31 @@ class PdfView(QPdfView):
 
 
 class PdfViewerWidget(QWidget):
+    displayed = pyqtSignal(str, float)  # (path, ms from request to display)
+    filesChanged = pyqtSignal(list)  # new file_list
+    currentChanged = pyqtSignal(int)  # index of the file being shown
+    # loaded documents kept for instant back/forth navigation (bounded by count and file size)
+    MAX_CACHED_DOCS = 8
+    MAX_CACHED_BYTES = 256 * 1024 * 1024
+    # PDFs this big (huge vector scatter plots) are shown coarse first, then refined in tiles
+    TILED_MIN_BYTES = 8 * 1024 * 1024
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.currentPdf = None
         self.doc = None
-        self.loader = None
         self.file_list = []
         self.current_index = -1
+        self._docs = OrderedDict() # (path, mtime, size) -> QPdfDocument, least recently shown first
+        self._loaders = {} # key -> queued/running PdfLoader
+        self._wanted = None # key of the document to show once loaded
+        self._generation = 0 # bumped on every navigation, older results are not shown
+        self._requested_at = 0.0
+        self.last_latency_ms = None
 
-        self.view = PdfView(self)
+        self.pdf_view = PdfView(self)
+        self.tiled_view = TiledPdfView(self)
+        self.view = self.pdf_view
         self.view.setDocument(self.doc)
         # single page mode only 
         self.view.setPageMode(QPdfView.PageMode.SinglePage)
@@ -68,40 +108,114 @@ class PdfViewerWidget(QWidget):
 
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
-        layout.addWidget(self.view)
+        self.stack = QStackedLayout()
+        self.stack.addWidget(self.pdf_view)
+        self.stack.addWidget(self.tiled_view)
+        layout.addLayout(self.stack)
+
+    @staticmethod
+    def _doc_key(path):
+        # a rewritten figure (same name, new run) must not hit the old document
+        try:
+            st = os.stat(path)
+        except OSError:
+            return (path, None, 0)
+        return (path, st.st_mtime_ns, st.st_size)
 
     def _start_loading(self, path, index):
-        # disable view during load
-        self.view.setEnabled(False)
-        # kill old loader
-        if self.loader:
-            self.loader.loaded.disconnect(self._on_loaded)
-            self.loader.quit()
-            self.loader.wait()
-        self.loader = PdfLoaderThread(path, index)
-        self.loader.loaded.connect(self._on_loaded)
-        self.loader.start()
-
-    def _on_loaded(self, new_doc, index):
+        key = self._doc_key(path)
+        self._wanted = key
+        self._generation += 1
+        self._requested_at = time.perf_counter()
+        self.currentChanged.emit(index)
+        if key in self._docs:
+            self._show(key, index)
+        else:
+            # disable view during load
+            self.view.setEnabled(False)
+            self._request(key, index)
+        self._prefetch(index)
+
+    def _request(self, key, index):
+        if key in self._docs:
+            return
+        if key in self._loaders:
+            # still queued/running: retag it, so it is not dropped as outdated
+            self._loaders[key].generation = self._generation
+            return
+        loader = PdfLoader(key, self._generation, lambda gen: gen == self._generation)
+        loader.signals.loaded.connect(
+            lambda doc, key, gen, index=index, loader=loader: self._on_loaded(doc, index, key, gen, loader))
+        self._loaders[key] = loader
+        loader_pool().start(loader)
+
+    def _prefetch(self, index):
+        # load the neighbours in the background, so next/prev are instant
+        for i in (index + 1, index - 1):
+            if 0 <= i < len(self.file_list):
+                self._request(self._doc_key(self.file_list[i]), i)
+
+    def _on_loaded(self, new_doc, index, key, generation, loader):
+        if self._loaders.get(key) is loader:
+            self._loaders.pop(key)
+        if new_doc is False:
+            if key == self._wanted:
+                # skipped just before being retagged by a newer request
+                self._request(key, index)
+            return
         if new_doc is None:
-            QMessageBox.warning(self, "Error", f"Failed to load:\n{self.file_list[index]}")
+            if key == self._wanted and generation == self._generation:
+                self.view.setEnabled(True)
+                QMessageBox.warning(self, "Error", f"Failed to load:\n{key[0]}")
             return
+        self._docs[key] = new_doc
+        if key == self._wanted and generation == self._generation:
+            self._show(key, index)
+        elif self.doc is not None:
+            # prefetched: neighbours rank just below the document on screen
+            self._docs.move_to_end(self._key_of(self.doc))
+        self._evict()
+
+    def _key_of(self, doc):
+        return next(k for k, d in self._docs.items() if d is doc)
+
+    def _show(self, key, index):
+        self._docs.move_to_end(key)
         # save current PDF
-        self.currentPdf = self.file_list[index]
-        # remove old doc from the view 
-        if self.doc:
+        self.currentPdf = key[0]
+        # setup new doc (the old one stays cached)
+        self.doc = self._docs[key]
+        # big figures: rasterized copy (or a coarse render) first, sharp tiles of the vector original on zoom
+        base_name, ext = os.path.splitext(key[0])
+        vector = base_name[:-len("_rasterized")] + ext if base_name.endswith("_rasterized") else None
+        view = self.tiled_view if (vector and os.path.exists(vector)) or key[2] >= self.TILED_MIN_BYTES else self.pdf_view
+        if view is not self.view:
             self.view.setDocument(None)
-            # schedule to del the old one
-            self.doc.deleteLater()
-
-        # setup new doc
-        self.doc = new_doc
-        self.view.setDocument(self.doc)
+            self.view = view
+            self.stack.setCurrentWidget(view)
+        if view is self.tiled_view:
+            if vector and os.path.exists(vector):
+                view.setDocument(self.doc, source=vector, rasterized=True)
+            else:
+                view.setDocument(self.doc, source=key[0])
+        else:
+            self.view.setDocument(self.doc)
 
         # re-apply our single-page + fit-width rules
         self.view.setPageMode(QPdfView.PageMode.SinglePage)       
         self.view.setZoomMode(QPdfView.ZoomMode.FitInView)       
         self.view.setEnabled(True)
+        self._evict()
+        self.last_latency_ms = (time.perf_counter() - self._requested_at) * 1000
+        self.displayed.emit(self.currentPdf, self.last_latency_ms)
+
+    def _evict(self):
+        while len(self._docs) > 1 and (len(self._docs) > self.MAX_CACHED_DOCS
+                                       or sum(k[2] for k in self._docs) > self.MAX_CACHED_BYTES):
+            key = next(k for k in self._docs if self._docs[k] is not self.doc)
+            doc = self._docs.pop(key)
+            doc.close()
+            doc.deleteLater()
     
     def _load_folder(self, folder):
         pdfs = sorted(
@@ -114,6 +228,7 @@ class PdfViewerWidget(QWidget):
             return
         self.file_list = filter_pdf(pdf_files=pdfs)
         self.current_index = 0
+        self.filesChanged.emit(self.file_list)
         self._start_loading(self.file_list[0], 0)
 
     def _load_file(self, path: str):
@@ -123,8 +238,14 @@ class PdfViewerWidget(QWidget):
         self.currentPdf = path
         self.file_list = [path]
         self.current_index = 0
+        self.filesChanged.emit(self.file_list)
         self._start_loading(path, 0)
     
+    def show_index(self, index):
+        if 0 <= index < len(self.file_list) and index != self.current_index:
+            self.current_index = index
+            self._start_loading(self.file_list[index], index)
+
     def next_file(self):
         if self.current_index < len(self.file_list) - 1:
             self.current_index += 1
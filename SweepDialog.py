@@ -0,0 +1,146 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QAbstractItemView,
+    QHeaderView,
+)
+from WorkThread import Worker
+from config import snapshot_config
+from mapping_sweep import SWEEP_PARAMS, parse_values, format_params, sweep_task
+
+
+class NumericItem(QTableWidgetItem):
+    """Table cell shown as text, sorted by value."""
+    def __init__(self, text, value):
+        super().__init__(text)
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value < getattr(other, "value", 0)
+
+
+class SweepDialog(QDialog):
+    """
+    Run the current mapping method for a list of parameter values in parallel and compare them.
+    After exec(), chosen is (config updates, (partition_gdf, p2x)) of the picked result, or None.
+    """
+    COLUMNS = ["Parameters", "Regions", "Valid points (%)", "Empty cells (%)", "Runtime (s)"]
+
+    def __init__(self, conf, geodf, parent=None):
+        super().__init__(parent)
+        self.conf = snapshot_config(conf)
+        self.geodf = geodf
+        self.worker = None
+        self.results = []
+        self.chosen = None
+        mapping = self.conf["mapping"]
+        names = SWEEP_PARAMS[mapping]
+        self.setWindowTitle(f"Sweep {mapping} mapping")
+        self.resize(620, 420)
+
+        current = [self.conf[n] for n in names]
+        self.lineValues = QLineEdit(", ".join(
+            ":".join(str(max(1, int(v * f))) for v in current) for f in (0.5, 1, 2)))
+        self.lineValues.setToolTip("Comma separated " + ("small:large cell sizes" if len(names) > 1 else "cell sizes")
+                                   + " in meters")
+        self.btnRunSweep = QPushButton("Run")
+        self.btnRunSweep.clicked.connect(self.run_sweep)
+        row = QHBoxLayout()
+        row.addWidget(QLabel(":".join(names)))
+        row.addWidget(self.lineValues, 1)
+        row.addWidget(self.btnRunSweep)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.itemSelectionChanged.connect(lambda: self.btnUse.setEnabled(bool(self.selected())))
+        self.table.doubleClicked.connect(lambda _: self.use_selected())
+        self.labelStatus = QLabel("")
+
+        self.btnUse = QPushButton("Use selected")
+        self.btnUse.setEnabled(False)
+        self.btnUse.clicked.connect(self.use_selected)
+        self.btnClose = QPushButton("Close")
+        self.btnClose.clicked.connect(self.reject)
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.labelStatus, 1)
+        buttons.addWidget(self.btnUse)
+        buttons.addWidget(self.btnClose)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(row)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+
+    def run_sweep(self):
+        if self.worker is not None: # the button cancels a running sweep
+            self.btnRunSweep.setEnabled(False)
+            self.worker.cancel()
+            return
+        try:
+            values = parse_values(self.conf["mapping"], self.lineValues.text())
+        except ValueError as e:
+            self.labelStatus.setText(str(e))
+            return
+        self.labelStatus.setText(f"Mapping {len(values)} values...")
+        self.btnRunSweep.setText("Cancel")
+        self.btnUse.setEnabled(False)
+        self.table.setRowCount(0)
+        self.results = []
+        self.worker = Worker(sweep_task, self.conf, self.geodf, values)
+        self.worker.progress.connect(lambda info: self.labelStatus.setText(info["message"]))
+        self.worker.finished.connect(self.on_sweep_done)
+        self.worker.failed.connect(lambda error: self.end_sweep(error["message"]))
+        self.worker.cancelled.connect(lambda: self.end_sweep("Cancelled"))
+        self.worker.start()
+
+    def end_sweep(self, message):
+        self.worker = None
+        self.btnRunSweep.setText("Run")
+        self.btnRunSweep.setEnabled(True)
+        self.labelStatus.setText(message)
+
+    def on_sweep_done(self, result):
+        self.end_sweep("Pick a result to continue with")
+        self.results = result["results"]
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(self.results))
+        for row, res in enumerate(self.results):
+            stats = res["stats"]
+            first = NumericItem(format_params(res["params"]), tuple(res["params"].values()))
+            first.setData(Qt.ItemDataRole.UserRole, row)
+            self.table.setItem(row, 0, first)
+            self.table.setItem(row, 1, NumericItem(str(stats["regions"]), stats["regions"]))
+            self.table.setItem(row, 2, NumericItem(f"{100 * stats['valid_ratio']:.1f}", stats["valid_ratio"]))
+            self.table.setItem(row, 3, NumericItem(f"{100 * stats['empty_ratio']:.1f}", stats["empty_ratio"]))
+            self.table.setItem(row, 4, NumericItem(f"{stats['seconds']:.1f}", stats["seconds"]))
+        self.table.setSortingEnabled(True)
+
+    def selected(self):
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            return None
+        return self.results[self.table.item(rows[0].row(), 0).data(Qt.ItemDataRole.UserRole)]
+
+    def use_selected(self):
+        res = self.selected()
+        if res is not None:
+            self.chosen = (res["params"], res["result"])
+            self.accept()
+
+    def reject(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        super().reject()
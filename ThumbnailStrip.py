@@ -0,0 +1,152 @@
+import os
+from PyQt6.QtCore import Qt, QSize, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage, QIcon, QPixmap
+from PyQt6.QtPdf import QPdfDocument
+from PyQt6.QtWidgets import QListWidget, QListWidgetItem, QListView, QAbstractItemView
+from config import CONFIG
+from stage_cache import file_fingerprint, make_key
+
+THUMB_SIZE = 96
+# rendered first pages, shared by all output folders
+THUMB_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "stm_graph", "thumbnails")
+THUMB_CACHE_FILES = 2000 # least recently used thumbnails beyond this are deleted (~10 KB each)
+
+_pool = None
+
+def thumbnail_pool():
+    """Own pool, so thumbnails never queue in front of the document the user asked for."""
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(2)
+    return _pool
+
+
+def thumbnail_path(pdf_path, size=THUMB_SIZE, content_hash=False):
+    """Cache file of a PDF's thumbnail: path, size and mtime (or content hash) + pixel size."""
+    key = make_key("thumbnail", file_fingerprint(pdf_path, content_hash), size)
+    return os.path.join(THUMB_CACHE_DIR, f"{key}.png")
+
+
+def prune_thumbnails(max_files=THUMB_CACHE_FILES):
+    """Delete the least recently used thumbnails beyond max_files."""
+    try:
+        entries = [e for e in os.scandir(THUMB_CACHE_DIR) if e.name.endswith(".png")]
+    except OSError:
+        return
+    if len(entries) <= max_files:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[:len(entries) - max_files]:
+        try:
+            os.remove(entry.path)
+        except OSError: # removed by another renderer
+            pass
+
+
+def render_thumbnail(pdf_path, size=THUMB_SIZE, content_hash=False):
+    """First page of pdf_path as a QImage fitting size x size, from the disk cache when possible."""
+    cached = thumbnail_path(pdf_path, size, content_hash)
+    img = QImage(cached) if os.path.exists(cached) else QImage()
+    if not img.isNull():
+        try:
+            os.utime(cached) # recently used: pruned last
+        except OSError:
+            pass
+        return img
+    doc = QPdfDocument(None)
+    if doc.load(pdf_path) != QPdfDocument.Error.None_ or doc.pageCount() == 0:
+        return None
+    page = doc.pagePointSize(0).toSize().scaled(QSize(size, size), Qt.AspectRatioMode.KeepAspectRatio)
+    img = doc.render(0, page)
+    doc.close()
+    if img.isNull():
+        return None
+    os.makedirs(THUMB_CACHE_DIR, exist_ok=True)
+    # write then rename: a concurrent reader never sees half a PNG
+    tmp = f"{cached}.{os.getpid()}.tmp.png"
+    if img.save(tmp, "PNG"):
+        os.replace(tmp, cached)
+        prune_thumbnails()
+    return img
+
+
+class ThumbnailSignals(QObject):
+    rendered = pyqtSignal(int, int, object)  # (row, generation, QImage or None)
+
+
+class ThumbnailRenderer(QRunnable):
+    def __init__(self, path, row, generation, is_current):
+        super().__init__()
+        self.path = path
+        self.row = row
+        self.generation = generation
+        self.is_current = is_current
+        self.signals = ThumbnailSignals()
+
+    def run(self):
+        if not self.is_current(self.generation):
+            return
+        try:
+            img = render_thumbnail(self.path, content_hash=CONFIG.get("cache_hash_input", False))
+        except OSError:
+            img = None
+        self.signals.rendered.emit(self.row, self.generation, img)
+
+
+class ThumbnailStrip(QListWidget):
+    """Vertical strip of first-page thumbnails for the files of a PdfViewerWidget; click to show one."""
+
+    def __init__(self, viewer, parent=None):
+        super().__init__(parent)
+        self.viewer = viewer
+        self._generation = 0
+        self._renderers = []
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setFlow(QListView.Flow.TopToBottom)
+        self.setWrapping(False)
+        self.setMovement(QListView.Movement.Static)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setIconSize(QSize(THUMB_SIZE, THUMB_SIZE))
+        self.setFixedWidth(THUMB_SIZE + 30)
+        self.setSpacing(4)
+
+        viewer.filesChanged.connect(self.set_files)
+        viewer.currentChanged.connect(self._select)
+        self.currentRowChanged.connect(self._on_row_changed)
+        if viewer.file_list:
+            self.set_files(viewer.file_list)
+            self._select(viewer.current_index)
+
+    def set_files(self, files):
+        self._generation += 1
+        self._renderers = []
+        self.blockSignals(True)
+        self.clear()
+        placeholder = QPixmap(THUMB_SIZE, THUMB_SIZE)
+        placeholder.fill(Qt.GlobalColor.lightGray)
+        for row, path in enumerate(files):
+            item = QListWidgetItem(QIcon(placeholder), os.path.splitext(os.path.basename(path))[0])
+            item.setToolTip(path)
+            item.setSizeHint(QSize(THUMB_SIZE + 10, THUMB_SIZE + 24))
+            self.addItem(item)
+            renderer = ThumbnailRenderer(path, row, self._generation, lambda gen: gen == self._generation)
+            renderer.signals.rendered.connect(self._on_rendered)
+            # keep the signal object alive until the pool has run it
+            self._renderers.append(renderer)
+            thumbnail_pool().start(renderer)
+        self.blockSignals(False)
+
+    def _on_rendered(self, row, generation, img):
+        if generation != self._generation or img is None or row >= self.count():
+            return
+        self.item(row).setIcon(QIcon(QPixmap.fromImage(img)))
+
+    def _select(self, index):
+        self.blockSignals(True)
+        self.setCurrentRow(index)
+        self.blockSignals(False)
+
+    def _on_row_changed(self, row):
+        if row >= 0:
+            self.viewer.show_index(row)
@@ -0,0 +1,269 @@
+import math
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PyQt6.QtCore import Qt, QSize, QRect, QRectF, QPointF, QObject, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QImage
+from PyQt6.QtPdf import QPdfPageNavigator
+from PyQt6.QtPdfWidgets import QPdfView
+from PyQt6.QtWidgets import QAbstractScrollArea
+from utils import render_pdf_clip
+
+TILE = 512 # tile edge in device pixels
+COARSE_PX = 1024 # long side of the whole-page image shown until tiles arrive
+MAX_TILE_BYTES = 256 * 1024 * 1024
+
+_executor = None
+
+def tile_executor():
+    """
+    One render process: rendering holds the GIL in-process (QtPdf and PyMuPDF alike), which would
+    freeze the GUI for seconds on big scatter plots. The process keeps the parsed page between tiles.
+    """
+    global _executor
+    if _executor is None:
+        # spawn: never fork a process that runs Qt threads
+        _executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+class TileSignals(QObject):
+    rendered = pyqtSignal(object, object)  # (tile key, QImage or None)
+
+
+class TiledPdfView(QAbstractScrollArea):
+    """
+    Single-page PDF view for huge vector figures: a coarse whole-page image is shown first,
+    then the visible area is refined in tiles rendered by a background process. Tiles are cached
+    per zoom level, so zooming back and forth is instant. Mirrors the parts of the QPdfView API
+    that PdfViewerWidget uses.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._doc = None
+        self._source = None # vector PDF the tiles are rendered from
+        self._rasterized = False # doc is a rasterized copy of source
+        self._serial = 0 # bumped per document, first part of every tile key
+        self._zoom_mode = QPdfView.ZoomMode.FitInView
+        self._zoom = 1.0
+        self._navigator = QPdfPageNavigator(self)
+        self._coarse = None # (page, QImage)
+        self._tiles = OrderedDict() # (serial, page, zoom key, col, row) -> QImage, LRU
+        self._tile_bytes = 0
+        self._pending = {} # key -> Future
+        self._signals = TileSignals()
+        self._signals.rendered.connect(self._on_tile)
+
+    # ---- QPdfView compatible API ----
+    def setDocument(self, doc, source=None, rasterized=False):
+        """
+        doc gives the page sizes, source is the PDF file tiles are rendered from.
+        With rasterized, doc is a raster copy of source and is drawn as the coarse image right away.
+        """
+        for future in list(self._pending.values()):
+            future.cancel()
+        self._pending = {}
+        self._doc = doc
+        self._source = source
+        self._rasterized = rasterized
+        self._serial += 1
+        self._coarse = None
+        self._tiles.clear()
+        self._tile_bytes = 0
+        self._navigator.jump(0, QPointF(), 0)
+        self._relayout()
+
+    def document(self):
+        return self._doc
+
+    def setPageMode(self, mode):
+        pass # single page only
+
+    def pageMode(self):
+        return QPdfView.PageMode.SinglePage
+
+    def pageNavigator(self):
+        return self._navigator
+
+    def setZoomMode(self, mode):
+        self._zoom_mode = mode
+        self._relayout()
+
+    def zoomMode(self):
+        return self._zoom_mode
+
+    def zoomFactor(self):
+        return self._zoom
+
+    def setZoomFactor(self, factor):
+        # keep the point in the viewport centre in place
+        old = self._zoom
+        centre = QPointF(self.horizontalScrollBar().value() + self.viewport().width() / 2,
+                         self.verticalScrollBar().value() + self.viewport().height() / 2)
+        self._zoom = max(0.05, min(factor, 64.0))
+        self._relayout()
+        scale = self._zoom / old
+        self.horizontalScrollBar().setValue(int(centre.x() * scale - self.viewport().width() / 2))
+        self.verticalScrollBar().setValue(int(centre.y() * scale - self.viewport().height() / 2))
+
+    # ---- layout ----
+    def _page(self):
+        return self._navigator.currentPage()
+
+    def _page_points(self):
+        if self._doc is None or self._doc.pageCount() == 0:
+            return None
+        return self._doc.pagePointSize(self._page())
+
+    def _page_size(self):
+        """Page size in logical pixels at the current zoom."""
+        pts = self._page_points()
+        if pts is None:
+            return QSize()
+        return QSize(max(1, round(pts.width() * self._zoom)), max(1, round(pts.height() * self._zoom)))
+
+    def _relayout(self):
+        pts = self._page_points()
+        if pts is not None and pts.width() > 0 and pts.height() > 0:
+            vw, vh = self.viewport().width(), self.viewport().height()
+            if self._zoom_mode == QPdfView.ZoomMode.FitInView:
+                self._zoom = min(vw / pts.width(), vh / pts.height())
+            elif self._zoom_mode == QPdfView.ZoomMode.FitToWidth:
+                self._zoom = vw / pts.width()
+            if self._coarse is None or self._coarse[0] != self._page():
+                self._load_coarse(pts)
+        size = self._page_size()
+        self.horizontalScrollBar().setRange(0, max(0, size.width() - self.viewport().width()))
+        self.verticalScrollBar().setRange(0, max(0, size.height() - self.viewport().height()))
+        self.horizontalScrollBar().setPageStep(self.viewport().width())
+        self.verticalScrollBar().setPageStep(self.viewport().height())
+        self.viewport().update()
+
+    def _load_coarse(self, pts):
+        scale = COARSE_PX / max(pts.width(), pts.height())
+        if self._rasterized or self._source is None:
+            # one image per page: cheap to render right here
+            size = QSize(max(1, round(pts.width() * scale)), max(1, round(pts.height() * scale)))
+            self._coarse = (self._page(), self._doc.render(self._page(), size))
+        else:
+            self._request((self._serial, self._page(), "coarse", 0, 0), scale, None)
+
+    def _page_rect(self):
+        """Page rectangle in viewport coordinates (centred when smaller than the viewport)."""
+        size = self._page_size()
+        x = (self.viewport().width() - size.width()) // 2 if size.width() < self.viewport().width() \
+            else -self.horizontalScrollBar().value()
+        y = (self.viewport().height() - size.height()) // 2 if size.height() < self.viewport().height() \
+            else -self.verticalScrollBar().value()
+        return QRect(x, y, size.width(), size.height())
+
+    # ---- tiles ----
+    def _request(self, key, zoom, clip):
+        if key in self._pending or self._source is None:
+            return
+        global _executor
+        try:
+            future = tile_executor().submit(render_pdf_clip, self._source, key[1], zoom, clip)
+        except BrokenProcessPool:
+            # render process died (e.g. out of memory): start a fresh one on the next request
+            _executor = None
+            return
+        self._pending[key] = future
+        future.add_done_callback(lambda f, key=key: self._deliver(key, f))
+
+    def _deliver(self, key, future):
+        # runs on the executor's thread: hand the result over to the GUI thread
+        try:
+            self._signals.rendered.emit(key, self._tile_image(future))
+        except RuntimeError: # view closed meanwhile
+            pass
+
+    @staticmethod
+    def _tile_image(future):
+        if future.cancelled() or future.exception() is not None:
+            return None
+        width, height, samples = future.result()
+        return QImage(samples, width, height, width * 3, QImage.Format.Format_RGB888).copy()
+
+    def _on_tile(self, key, img):
+        if key in self._pending and self._pending[key].done():
+            self._pending.pop(key)
+        if img is None or img.isNull() or key[0] != self._serial:
+            return
+        if key[2] == "coarse":
+            self._coarse = (key[1], img)
+        else:
+            self._tiles[key] = img
+            self._tile_bytes += img.sizeInBytes()
+            while self._tile_bytes > MAX_TILE_BYTES and len(self._tiles) > 1:
+                _, old = self._tiles.popitem(last=False)
+                self._tile_bytes -= old.sizeInBytes()
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(self.viewport().rect(), QColor(128, 128, 128))
+        if self._page_points() is None or not self.isEnabled():
+            return
+        page_rect = self._page_rect()
+        if self._coarse is None:
+            painter.fillRect(page_rect, Qt.GlobalColor.white)
+        else:
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+            painter.drawImage(QRectF(page_rect), self._coarse[1])
+        if self._source is None or (self._coarse is not None and page_rect.width() * self.devicePixelRatioF()
+                                    <= self._coarse[1].width()):
+            return # the coarse image is sharp enough at this zoom
+
+        # visible part of the page in device pixels, split into tiles
+        dpr = self.devicePixelRatioF()
+        visible = page_rect.intersected(self.viewport().rect())
+        if visible.isEmpty():
+            return
+        zoom = self._zoom * dpr
+        zoom_key = round(zoom, 4)
+        page_px = QRect(0, 0, math.ceil(page_rect.width() * dpr), math.ceil(page_rect.height() * dpr))
+        cols = range(int((visible.left() - page_rect.left()) * dpr) // TILE,
+                     int((visible.right() - page_rect.left()) * dpr) // TILE + 1)
+        rows = range(int((visible.top() - page_rect.top()) * dpr) // TILE,
+                     int((visible.bottom() - page_rect.top()) * dpr) // TILE + 1)
+        for row in rows:
+            for col in cols:
+                clip = QRect(col * TILE, row * TILE, TILE, TILE).intersected(page_px)
+                if clip.isEmpty():
+                    continue
+                key = (self._serial, self._page(), zoom_key, col, row)
+                img = self._tiles.get(key)
+                if img is None:
+                    self._request(key, zoom, (clip.left() / zoom, clip.top() / zoom,
+                                              (clip.right() + 1) / zoom, (clip.bottom() + 1) / zoom))
+                    continue
+                self._tiles.move_to_end(key)
+                target = QRectF(page_rect.left() + clip.left() / dpr, page_rect.top() + clip.top() / dpr,
+                                clip.width() / dpr, clip.height() / dpr)
+                painter.drawImage(target, img)
+        # drop queued tiles of other zoom levels (scrolled-away tiles of this level are kept for later)
+        for key, future in list(self._pending.items()):
+            if key[2] not in ("coarse", zoom_key) and future.cancel():
+                self._pending.pop(key, None)
+
+    # ---- events ----
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._relayout()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            # manual zoom mode
+            if self._zoom_mode != QPdfView.ZoomMode.Custom:
+                self._zoom_mode = QPdfView.ZoomMode.Custom
+            factor = 1.25 if event.angleDelta().y() > 0 else 0.8
+            self.setZoomFactor(self._zoom * factor)
+            event.accept()
+        else:
+            super().wheelEvent(event)
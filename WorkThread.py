@@ -1,18 +1,162 @@
+import os
+import inspect
+import queue
+import signal
+import time
+import traceback
+import multiprocessing
 from PyQt6.QtCore import QThread, pyqtSignal
+from task_control import TaskCancelled, CancelToken
+
+CANCEL_GRACE_S = 5 # a cancelled task process gets this long to reach a cancel point and clean up
+
+
+def error_info(e):
+    return {"status": "error", "message": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+
+
+def _run_in_subprocess(fn, args, kwargs, wants_progress, wants_token, out, event):
+    # entry point of the task process: everything goes back through the queue
+    os.environ.setdefault("MPLBACKEND", "Agg") # figures are only saved, never shown, from a task process
+    if hasattr(os, "setsid"):
+        os.setsid() # own process group: cancel reaches the pools the task starts too
+    token = CancelToken(event)
+    if wants_progress:
+        def report(info):
+            token.check()
+            out.put(("progress", info))
+        kwargs["progress_callback"] = report
+    if wants_token:
+        kwargs["cancel_token"] = token
+    try:
+        out.put(("result", fn(*args, **kwargs)))
+    except TaskCancelled:
+        out.put(("cancelled", None))
+    except Exception as e:
+        out.put(("error", error_info(e)))
+
 
 class Worker(QThread):
     # Signal emitted when work is done, carrying result
     finished = pyqtSignal(object)
+    # Signal emitted with progress info (dict with stage, done, total, message)
+    progress = pyqtSignal(object)
+    # Signal emitted when the task raised (dict with status, message, traceback)
+    failed = pyqtSignal(object)
+    # Signal emitted when the task stopped after cancel()
+    cancelled = pyqtSignal()
 
-    def __init__(self, fn, *args, **kwargs):
+    def __init__(self, fn, *args, subprocess=False, **kwargs):
+        """
+        Run fn(*args, **kwargs) off the GUI thread. Tasks that accept progress_callback / cancel_token
+        get them injected. With subprocess, fn runs in a spawned process (fn, args and the result must
+        pickle). After cancel() that process gets CANCEL_GRACE_S to unwind (shut down its pools,
+        release shared memory), then it and every process it started are killed, which frees their
+        CPU and memory. A task without progress_callback / cancel_token has no cancel point and is
+        killed at once.
+        """
         super().__init__()
         self.fn = fn
         self.args = args
         self.kwargs = kwargs
+        self.subprocess = subprocess
+        self._process = None
+        params = inspect.signature(fn).parameters
+        self._wants_progress = "progress_callback" in params and "progress_callback" not in kwargs
+        self._wants_token = "cancel_token" in params and "cancel_token" not in kwargs
+        if subprocess:
+            self._ctx = multiprocessing.get_context("spawn") # never fork a process running Qt threads
+            self.token = CancelToken(self._ctx.Event())
+        else:
+            self.token = CancelToken()
+            # tasks that accept a progress_callback report through the progress signal;
+            # every report is also a cancel point
+            if self._wants_progress:
+                self.kwargs["progress_callback"] = self._report
+            if self._wants_token:
+                self.kwargs["cancel_token"] = self.token
+
+    def _report(self, info):
+        self.token.check()
+        self.progress.emit(info)
+
+    def cancel(self):
+        self.token.cancel()
+
+    def shutdown(self):
+        """cancel() and, for a task process, wait until it and its children are gone (on exit)."""
+        self.cancel()
+        if self.subprocess:
+            self.wait()
+
+    def _kill_processes(self):
+        # the task process and everything it started share its process group
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(self._process.pid, signal.SIGTERM)
+            except (ProcessLookupError, PermissionError): # group gone (or not set up yet)
+                pass
+        if self._process.is_alive():
+            self._process.terminate()
 
     def run(self):
-        # Call the long‐running function
-        result = self.fn(*self.args, **self.kwargs)
+        if self.subprocess:
+            self._run_process()
+            return
+        try:
+            # Call the long‐running function
+            result = self.fn(*self.args, **self.kwargs)
+        except TaskCancelled:
+            self.cancelled.emit()
+            return
+        except Exception as e:
+            print(traceback.format_exc())
+            self.failed.emit(error_info(e))
+            return
         # Emit the result
         self.finished.emit(result)
 
+    def _run_process(self):
+        out = self._ctx.Queue()
+        self._process = self._ctx.Process(
+            # not a daemon: tasks start process pools of their own (rasterization, data loaders)
+            target=_run_in_subprocess,
+            args=(self.fn, self.args, dict(self.kwargs), self._wants_progress, self._wants_token, out,
+                  self.token._event))
+        self._process.start()
+        # a task that never checks the token cannot unwind: no point in waiting for it
+        grace = CANCEL_GRACE_S if self._wants_progress or self._wants_token else 0
+        cancel_seen = None
+        while True:
+            try:
+                # the result must be read before join: a full pipe blocks the child's exit
+                kind, payload = out.get(timeout=0.1)
+            except queue.Empty:
+                if self._process.is_alive():
+                    if self.token.cancelled:
+                        cancel_seen = cancel_seen or time.monotonic()
+                        if time.monotonic() - cancel_seen >= grace: # no cancel point reached
+                            self._kill_processes()
+                    continue
+                try: # last words of a process that just exited
+                    kind, payload = out.get(timeout=1)
+                except queue.Empty:
+                    kind, payload = ("cancelled", None) if self.token.cancelled else \
+                        ("error", {"status": "error", "traceback": "",
+                                   "message": f"Task process exited with code {self._process.exitcode}"})
+            if kind == "progress":
+                self.progress.emit(payload)
+                continue
+            break
+        self._process.join(CANCEL_GRACE_S)
+        # whatever the task left running (pool workers of a cancelled task) would keep computing
+        self._kill_processes()
+        self._process.join()
+        self._process = None
+        if kind == "result":
+            self.finished.emit(payload)
+        elif kind == "cancelled":
+            self.cancelled.emit()
+        else:
+            print(payload["traceback"])
+            self.failed.emit(payload)
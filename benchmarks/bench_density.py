@@ -0,0 +1,91 @@
+"""
+Benchmark of the point figures: density raster (density_render) against the scatter plot of every
+point that stm_graph draws (geopandas/matplotlib scatter, vector PDF). Reports render time and file size.
+
+    python benchmarks/bench_density.py                      # 1M and 10M points
+    python benchmarks/bench_density.py --points 100000 1000000 --max-scatter-points 1000000 --json density.json
+
+The scatter path grows linearly with the number of points; above --max-scatter-points it is skipped.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_points(n, seed=0):
+    """Clustered event-like points in EPSG:3857 around a city centre."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(scale=8000, size=(50, 2))
+    idx = rng.integers(0, len(centres), n)
+    xy = centres[idx] + rng.normal(scale=rng.uniform(200, 2000, len(centres))[idx, None], size=(n, 2))
+    return xy[:, 0] + 1.0e6, xy[:, 1] + 6.0e6
+
+
+def child(variant, n, out):
+    sys.path.insert(0, REPO_DIR)
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    x, y = make_points(n)
+    start = time.perf_counter()
+    fig, ax = plt.subplots(figsize=(12, 10))
+    if variant == "scatter":
+        # what the stm_graph visualizations do: one vector marker per point
+        ax.scatter(x, y, s=1, color="red", alpha=0.5)
+    else:
+        import density_render
+        extent = density_render.padded_extent(x, y)
+        ax.set_xlim(extent[0], extent[1])
+        ax.set_ylim(extent[2], extent[3])
+        density_render.draw_density(ax, density_render.bin_points(x, y, extent), extent)
+    ax.set_axis_off()
+    fig.savefig(out, dpi=200, bbox_inches="tight", format="pdf")
+    plt.close(fig)
+    print(json.dumps({"seconds": time.perf_counter() - start}))
+
+
+def run(variant, n, out_dir):
+    out = os.path.join(out_dir, f"{variant}_{n}.pdf")
+    res = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", variant, "--points", str(n), "--out", out],
+                         capture_output=True, text=True, check=True)
+    r = json.loads(res.stdout.strip().splitlines()[-1])
+    r["file_mb"] = os.path.getsize(out) / 2**20
+    return r
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Density vs scatter point figures.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    parser.add_argument("--points", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--max-scatter-points", type=int, default=10_000_000)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.points[0], args.out)
+        return
+
+    out_dir = tempfile.mkdtemp()
+    results = []
+    print(f"{'points':>10}  {'variant':<8}{'seconds':>9}{'file MB':>9}")
+    for n in args.points:
+        for variant in ("density", "scatter"):
+            if variant == "scatter" and n > args.max_scatter_points:
+                continue
+            r = {"points": n, "variant": variant, **run(variant, n, out_dir)}
+            results.append(r)
+            print(f"{n:>10}  {variant:<8}{r['seconds']:>9.2f}{r['file_mb']:>9.1f}", flush=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Frame-time benchmark of the interactive map (MapCanvas) on a synthetic city-scale grid.
+
+    python benchmarks/bench_map_canvas.py --cells 100000 --points 1000000
+
+Builds the layers (as the GUI does in a worker), then paints the canvas viewport for a sequence
+of zoom levels and pans, and reports the time per frame. The target is <= 16.7 ms (60 fps).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_data(n_cells, n_points, seed=0):
+    """Square grid of about n_cells 250 m cells (EPSG:3857) and clustered points on it."""
+    import numpy as np
+    import geopandas as gpd
+    import shapely
+    side = int(round(n_cells ** 0.5))
+    xs, ys = np.meshgrid(np.arange(side) * 250.0, np.arange(side) * 250.0)
+    cells = shapely.box(xs.ravel(), ys.ravel(), xs.ravel() + 250, ys.ravel() + 250)
+    partitions = gpd.GeoDataFrame(geometry=cells, crs="EPSG:3857")
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform(0, side * 250, size=(40, 2))
+    idx = rng.integers(0, len(centres), n_points)
+    xy = np.clip(centres[idx] + rng.normal(scale=1500, size=(n_points, 2)), 0, side * 250 - 1e-6)
+    points = gpd.GeoDataFrame(geometry=gpd.points_from_xy(xy[:, 0], xy[:, 1]), crs="EPSG:3857")
+    p2x = (xy[:, 1] // 250).astype(int) * side + (xy[:, 0] // 250).astype(int)
+    return partitions, points, p2x
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MapCanvas frame times.")
+    parser.add_argument("--cells", type=int, default=100_000)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--size", type=int, nargs=2, default=[1280, 800], help="viewport size")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    sys.path.insert(0, REPO_DIR)
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+    from MapCanvas import MapCanvas, prepare_map_layers
+
+    partitions, points, p2x = make_data(args.cells, args.points)
+    start = time.perf_counter()
+    layers = prepare_map_layers(partitions, points, p2x)["layers"]
+    prepare_s = time.perf_counter() - start
+
+    canvas = MapCanvas()
+    canvas.resize(*args.size)
+    canvas.show()
+    canvas.set_layers(layers)
+    app.processEvents()
+
+    def frame():
+        t = time.perf_counter()
+        canvas.viewport().grab()
+        return (time.perf_counter() - t) * 1000
+
+    results = {"cells": len(partitions), "points": args.points, "prepare_s": prepare_s, "levels": []}
+    print(f"prepare layers: {prepare_s:.1f} s for {len(partitions)} cells, {args.points} points")
+    print(f"{'zoom':>6}  {'cells layer':<12}{'points layer':<13}{'first ms':>9}{'pan median ms':>15}{'pan max ms':>11}")
+    for zoom in (1, 2, 4, 8, 16, 32, 64):
+        canvas.resetTransform()
+        canvas.fitInView(layers.extent)
+        canvas.scale(zoom, zoom)
+        canvas.centerOn(layers.extent.center())
+        canvas.update_detail()
+        first = frame() # builds the paths of newly visible chunks
+        pans = []
+        for i in range(30):
+            canvas.horizontalScrollBar().setValue(canvas.horizontalScrollBar().value() + 15)
+            pans.append(frame())
+        level = {"zoom": zoom, "vector_cells": canvas.cells_layer.isVisible(),
+                 "vector_points": canvas.points_layer.isVisible(), "first_ms": first,
+                 "pan_median_ms": statistics.median(pans), "pan_max_ms": max(pans)}
+        results["levels"].append(level)
+        print(f"{zoom:>6}  {'vector' if level['vector_cells'] else 'overview':<12}"
+              f"{'markers' if level['vector_points'] else 'density':<13}{first:>9.1f}"
+              f"{level['pan_median_ms']:>15.1f}{level['pan_max_ms']:>11.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
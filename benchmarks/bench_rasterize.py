@@ -0,0 +1,108 @@
+"""
+Benchmark of the PDF rasterizer (utils.generate_rasterized_pdf) against the previous
+single-page PIL implementation: peak RSS and time per page, each run in a fresh process.
+
+    python benchmarks/bench_rasterize.py                       # synthetic 3-page scatter PDF
+    python benchmarks/bench_rasterize.py --pdf big_figure.pdf --band-mb 16 32 64
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_rasterize(input_pdf_path, output_pdf_path, dpi=200):
+    # previous implementation: page 0 only, full pixmap + PIL copy + same-size resize
+    import fitz
+    from PIL import Image
+    pdf_doc = fitz.open(input_pdf_path)
+    page = pdf_doc.load_page(0)
+    zoom = dpi / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    img = Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
+    img = img.resize((int(page.rect.width * zoom), int(page.rect.height * zoom)), Image.Resampling.LANCZOS)
+    img.save(output_pdf_path)
+
+
+def make_pdf(path, points, pages):
+    import numpy as np
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+    rng = np.random.default_rng(0)
+    with PdfPages(path) as pdf:
+        for _ in range(pages):
+            fig, ax = plt.subplots(figsize=(12, 12))
+            ax.scatter(rng.normal(size=points), rng.normal(size=points), s=1, color="red", alpha=0.5)
+            pdf.savefig(fig)
+            plt.close(fig)
+
+
+def child(args):
+    sys.path.insert(0, REPO_DIR)
+    import fitz
+    from utils import generate_rasterized_pdf
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    out = os.path.join(tempfile.mkdtemp(), "out.pdf")
+    start = time.perf_counter()
+    if args.variant == "legacy":
+        legacy_rasterize(args.pdf, out, dpi=args.dpi)
+        pages = 1
+    else:
+        generate_rasterized_pdf(args.pdf, out, dpi=args.dpi, max_band_mb=args.band_mb[0])
+        pages = fitz.open(args.pdf).page_count
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"pages": pages, "seconds": elapsed, "base_rss_mb": base_rss / 1024,
+                      "peak_rss_mb": peak / 1024, "out_mb": os.path.getsize(out) / 2**20}))
+
+
+def run(variant, pdf, dpi, band_mb=None):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", variant, "--pdf", pdf, "--dpi", str(dpi)]
+    if band_mb:
+        cmd += ["--band-mb", str(band_mb)]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rasterizer peak memory and speed.")
+    parser.add_argument("--child", dest="variant", help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help="PDF to rasterize (default: generate a synthetic one)")
+    parser.add_argument("--points", type=int, default=200_000, help="points per page of the synthetic PDF")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--band-mb", type=int, nargs="+", default=[16, 64])
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    if args.variant:
+        child(args)
+        return
+
+    pdf = args.pdf
+    if pdf is None:
+        pdf = os.path.join(tempfile.mkdtemp(), "synthetic.pdf")
+        make_pdf(pdf, args.points, args.pages)
+    print(f"input: {pdf} ({os.path.getsize(pdf) / 2**20:.1f} MB)")
+
+    results = {"legacy": run("legacy", pdf, args.dpi)}
+    for mb in args.band_mb:
+        results[f"bands_{mb}mb"] = run("bands", pdf, args.dpi, mb)
+    print(f"{'variant':<14}{'pages':>6}{'s/page':>9}{'peak RSS MB':>13}{'over base MB':>14}{'output MB':>11}")
+    for name, r in results.items():
+        print(f"{name:<14}{r['pages']:>6}{r['seconds'] / r['pages']:>9.2f}{r['peak_rss_mb']:>13.0f}"
+              f"{r['peak_rss_mb'] - r['base_rss_mb']:>14.0f}{r['out_mb']:>11.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
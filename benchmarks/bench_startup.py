@@ -0,0 +1,129 @@
+"""
+Startup benchmark for the GUI.
+
+Measures, in fresh interpreters:
+  - time-to-first-paint of MainWindow (process launch -> first paintEvent)
+  - time spent importing main.py and building the window
+  - the import-time breakdown of `import main` (python -X importtime)
+and lists heavy modules (see utils.HEAVY_MODULES) that got imported before the first paint.
+
+    python benchmarks/bench_startup.py --runs 5 --max-first-paint-ms 1500 --json startup.json
+
+Exits with 1 if the median time-to-first-paint exceeds --max-first-paint-ms
+or a heavy module is imported eagerly, so it can guard against regressions.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child():
+    t_start = time.time()
+    sys.path.insert(0, REPO_DIR)
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+    t_import = time.time()
+    import main
+    from utils import HEAVY_MODULES
+    t_window = time.time()
+    window = main.MainWindow()
+    t_built = time.time()
+    res = {}
+
+    def on_first_paint():
+        res["first_paint"] = time.time()
+        res["eager_modules"] = [m for m in HEAVY_MODULES if m in sys.modules]
+        # exit() leaves the loop without closing windows (closeEvent asks for confirmation)
+        app.exit(0)
+
+    window.first_painted.connect(on_first_paint)
+    window.show()
+    app.exec()
+    print(json.dumps({
+        "interpreter_to_main": t_start,
+        "import_main_s": t_window - t_import,
+        "build_window_s": t_built - t_window,
+        "first_paint": res["first_paint"],
+        "eager_modules": res["eager_modules"],
+    }))
+
+
+def run_once(env):
+    launched = time.time()
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                         cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True)
+    res = json.loads(out.stdout.strip().splitlines()[-1])
+    res["first_paint_ms"] = (res.pop("first_paint") - launched) * 1000
+    res["interpreter_start_ms"] = (res.pop("interpreter_to_main") - launched) * 1000
+    return res
+
+
+def import_breakdown(env, top=15):
+    """Cumulative import time (ms) of top-level modules imported by `import main`."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                         cwd=REPO_DIR, env=env, capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # nesting is shown by 2-space indentation: keep main itself and its direct imports
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level <= 1:
+            rows.append((name.strip(), int(cumulative) / 1000))
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure GUI startup time.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-first-paint-ms", type=float, default=None)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return 0
+
+    env = dict(os.environ)
+    if not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    first_paint = [r["first_paint_ms"] for r in runs]
+    result = {
+        "runs": runs,
+        "median_first_paint_ms": statistics.median(first_paint),
+        "median_import_main_ms": statistics.median(r["import_main_s"] for r in runs) * 1000,
+        "median_build_window_ms": statistics.median(r["build_window_s"] for r in runs) * 1000,
+        "eager_modules": sorted({m for r in runs for m in r["eager_modules"]}),
+        "import_breakdown_ms": import_breakdown(env),
+    }
+
+    print(f"time-to-first-paint: median {result['median_first_paint_ms']:.0f} ms "
+          f"(min {min(first_paint):.0f}, max {max(first_paint):.0f}, {args.runs} runs)")
+    print(f"  import main.py:   {result['median_import_main_ms']:.0f} ms")
+    print(f"  build MainWindow: {result['median_build_window_ms']:.0f} ms")
+    print(f"heavy modules loaded before first paint: {', '.join(result['eager_modules']) or 'none'}")
+    print("import breakdown of main.py (cumulative):")
+    for name, ms in result["import_breakdown_ms"]:
+        print(f"  {name:<30} {ms:8.1f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=4)
+
+    failed = bool(result["eager_modules"])
+    if args.max_first_paint_ms is not None and result["median_first_paint_ms"] > args.max_first_paint_ms:
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Out-of-core version of stm_graph.preprocess_dataset: the input is read in chunks sized from a memory
+cap, each chunk is parsed and filtered (time, coordinates, bounds, dates) on its own, and only the
+surviving rows are kept, with text columns stored as categoricals. Peak memory follows the cap and
+the filtered result instead of the raw file. The steps and their order match read_event_dataset.
+"""
+import os
+import pandas as pd
+from data_preview import read_sample
+from data_profile import iter_excel_chunks
+
+MIN_CHUNK_ROWS = 10000
+ID_COLUMNS = ("unique_key", "id") # de-duplication key of read_event_dataset, first one present
+TRUE_VALUES = ("True", "TRUE", "true") # what read_csv parses as bools
+FALSE_VALUES = ("False", "FALSE", "false")
+# parsed chunk + converted columns + filter masks and copies, relative to the parsed chunk alone
+WORKING_SET_FACTOR = 4
+
+
+def chunk_rows_for(path, memory_mb):
+    """Rows per chunk so that one chunk's working set stays within memory_mb."""
+    sample = read_sample(path, 1000)
+    row_bytes = max(1.0, sample.memory_usage(deep=True, index=False).sum() / max(1, len(sample)))
+    return max(MIN_CHUNK_ROWS, int(memory_mb * 1024 * 1024 / (row_bytes * WORKING_SET_FACTOR)))
+
+
+def iter_chunks(path, chunk_rows, dtype=None):
+    """(DataFrame chunk, bytes read so far) over a .csv or .xlsx file; dtype is passed to read_csv."""
+    if path.lower().endswith(".csv"):
+        with open(path, "rb") as f:
+            for chunk in pd.read_csv(f, chunksize=chunk_rows, low_memory=False, dtype=dtype):
+                yield chunk, f.tell()
+    else:
+        for chunk, done in iter_excel_chunks(path, None, chunk_rows):
+            if chunk is not None:
+                yield chunk, done
+
+
+def chunk_kinds(chunk, columns):
+    """Kind ("number", "bool", "text") of each column read as text, judged from this chunk alone."""
+    kinds = {}
+    for col in columns:
+        values = chunk[col].dropna()
+        if len(values) == 0:
+            kinds[col] = None # no evidence either way
+        elif values.isin(TRUE_VALUES + FALSE_VALUES).all():
+            kinds[col] = "bool"
+        elif pd.to_numeric(values, errors="coerce").notna().all():
+            kinds[col] = "number"
+        else:
+            kinds[col] = "text"
+    return kinds
+
+
+def merge_kind(a, b):
+    # a column is a number or bool only if every chunk agrees; any conflict makes it text
+    if a is None or a == b:
+        return b
+    return a if b is None else "text"
+
+
+def apply_kinds(df, kinds):
+    """Convert columns read as text the way read_csv types a whole file (kinds from chunk_kinds/merge_kind)."""
+    for col, kind in kinds.items():
+        if col not in df.columns or kind not in ("number", "bool"):
+            continue
+        values = df[col].astype(object)
+        if kind == "number":
+            df[col] = pd.to_numeric(values)
+        else:
+            values = values.map(lambda v: v if v is None or v != v else v in TRUE_VALUES)
+            df[col] = values.astype(bool) if values.notna().all() else values
+    return df
+
+
+def filter_chunk(df, time_col, lat_col, lon_col, bounds=None, filter_dates=None):
+    df[time_col] = pd.to_datetime(df[time_col], errors="coerce")
+    df[lat_col] = pd.to_numeric(df[lat_col], errors="coerce")
+    df[lon_col] = pd.to_numeric(df[lon_col], errors="coerce")
+    keep = df[time_col].notna() & df[lat_col].notna() & df[lon_col].notna()
+    if bounds:
+        keep &= df[lat_col].between(bounds["min_lat"], bounds["max_lat"]) \
+            & df[lon_col].between(bounds["min_lon"], bounds["max_lon"])
+    if filter_dates:
+        start, end = filter_dates
+        if start is not None:
+            keep &= df[time_col] >= pd.to_datetime(start)
+        if end is not None:
+            keep &= df[time_col] <= pd.to_datetime(end)
+    return df[keep.to_numpy()]
+
+
+def compact(df):
+    # text columns as categoricals: one copy per distinct value instead of one Python string per row
+    for col in df.columns:
+        if df[col].dtype == object or isinstance(df[col].dtype, pd.StringDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def concat_chunks(chunks):
+    """Concatenate compacted chunks, merging categoricals instead of falling back to object."""
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [c[col] for c in chunks]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            columns[col] = pd.Series(pd.api.types.union_categoricals(parts, ignore_order=True))
+        else:
+            columns[col] = pd.concat([p.astype(object) if isinstance(p.dtype, pd.CategoricalDtype) else p
+                                      for p in parts], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def preprocess_chunked(data_file, time_col, lat_col, lng_col, crs="EPSG:4326", testing_mode=False,
+                       test_bounds=None, filter_dates=None, memory_mb=512, target_crs="EPSG:4326",
+                       progress_callback=None):
+    """Same result as stm_graph.preprocess_dataset (without the figures), within memory_mb per chunk."""
+    bounds = test_bounds if testing_mode and test_bounds else None
+    chunk_rows = chunk_rows_for(data_file, memory_mb)
+    total = os.path.getsize(data_file)
+    print(f"Reading dataset from {data_file} in chunks of {chunk_rows} rows (memory cap {memory_mb} MB)...")
+    kept, rows_in, empty, kinds = [], 0, None, {}
+    # as text, typed once at the end: a chunk's own inference would read ids as 0 in one chunk and "0" in the next
+    for chunk, done in iter_chunks(data_file, chunk_rows, dtype=str):
+        missing = [c for c in (time_col, lat_col, lng_col) if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"Required columns missing from dataset: {missing}")
+        rows_in += len(chunk)
+        # judged on every row read, like read_csv, not only the ones kept
+        other = [c for c in chunk.columns if c not in (time_col, lat_col, lng_col)]
+        for col, kind in chunk_kinds(chunk, other).items():
+            kinds[col] = merge_kind(kinds.get(col), kind)
+        chunk = filter_chunk(chunk, time_col, lat_col, lng_col, bounds, filter_dates)
+        if empty is None:
+            empty = chunk.iloc[:0] # keeps the columns when no row survives
+        if len(chunk):
+            kept.append(compact(chunk.reset_index(drop=True)))
+        if progress_callback:
+            rows_out = sum(len(c) for c in kept)
+            progress_callback({"stage": "preprocess", "done": min(done, total), "total": total,
+                               "message": f"Preprocessing: {rows_in:,} rows read, {rows_out:,} kept"})
+    if empty is None:
+        raise ValueError(f"No rows in {data_file}")
+    df = apply_kinds(concat_chunks(kept) if kept else empty, kinds)
+    del kept
+    print(f"Filtered dataset: {rows_in} → {len(df)} rows")
+    return finish_events(df, time_col, lat_col, lng_col, crs, target_crs)
+
+
+def id_column(columns):
+    return next((c for c in ID_COLUMNS if c in columns), None)
+
+
+def finish_events(df, time_col, lat_col, lng_col, crs="EPSG:4326", target_crs="EPSG:4326", deduplicate=True):
+    """Last read_event_dataset steps on the filtered rows: de-duplicate, geometry, CRS, sort by time."""
+    import geopandas as gpd
+    if len(df) > 0: # with no rows every column is empty: keep them
+        if deduplicate:
+            id_col = id_column(df.columns)
+            df = df.drop_duplicates(subset=[id_col] if id_col else None)
+        df = df.dropna(axis=1, how="all")
+
+    gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df[lng_col], df[lat_col]), crs=crs)
+    if target_crs and crs != target_crs:
+        print(f"Converting coordinates from {crs} to {target_crs}")
+        gdf = gdf.to_crs(target_crs)
+        gdf[lng_col] = gdf.geometry.x
+        gdf[lat_col] = gdf.geometry.y
+    gdf = gdf.sort_values(by=time_col)
+    print(f"Final dataset shape: {gdf.shape}")
+    print(f"Time range: {gdf[time_col].min()} to {gdf[time_col].max()}")
+    return gdf
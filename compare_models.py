@@ -0,0 +1,191 @@
+"""
+Compare models: train several architectures at once on one temporal dataset. The dataset is loaded
+once (and converted to 3d once, if a 3d model is selected); its feature, target and edge arrays go
+into named shared memory blocks, and every worker process maps the same blocks as numpy arrays /
+torch tensors instead of loading or receiving its own copy. Each worker gets a fixed thread budget
+(see hparam_sweep.set_thread_budget).
+"""
+import copy
+import os
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from task_control import check_cancel, shutdown_pool
+
+LIST_FIELDS = ("features", "targets") # one array per time step, stacked into one block
+ARRAY_FIELDS = ("edge_index", "edge_weight")
+
+_datasets = {} # "3d"/"4d" -> dataset of a compare worker process, set by the pool initializer
+_shared = None # their SharedDatasets, keeping the attached blocks open
+
+
+def _as_numpy(value):
+    return value.numpy() if hasattr(value, "numpy") else np.asarray(value)
+
+
+class SharedDataset:
+    """
+    Array fields of a temporal dataset in shared memory; pickles as block names plus the rest of the
+    dataset, and attach() rebuilds the dataset on those blocks without copying. The creating process
+    owns the blocks and must release() them.
+    """
+    def __init__(self, dataset):
+        self.skeleton = copy.copy(dataset)
+        self.fields = {} # name -> (block name, shape, dtype, is list, is tensor)
+        self._blocks = []
+        for name in LIST_FIELDS + ARRAY_FIELDS:
+            value = getattr(dataset, name, None)
+            if value is None or (name in LIST_FIELDS and len(value) == 0):
+                continue
+            is_list = name in LIST_FIELDS
+            first = value[0] if is_list else value
+            is_tensor = hasattr(first, "numpy")
+            first = _as_numpy(first)
+            if is_list and any(tuple(v.shape) != first.shape for v in value):
+                continue # ragged: stays in the pickled skeleton
+            shape = (len(value), *first.shape) if is_list else first.shape
+            block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * first.dtype.itemsize))
+            self._blocks.append(block)
+            arr = np.ndarray(shape, first.dtype, buffer=block.buf)
+            if is_list:
+                for i, v in enumerate(value):
+                    arr[i] = _as_numpy(v)
+            else:
+                arr[...] = first
+            self.fields[name] = (block.name, shape, first.dtype.str, is_list, is_tensor)
+            setattr(self.skeleton, name, None)
+        self.nbytes = sum(b.size for b in self._blocks)
+
+    def __getstate__(self):
+        return {"skeleton": self.skeleton, "fields": self.fields, "nbytes": self.nbytes}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._blocks = []
+
+    def attach(self):
+        """The dataset on the shared blocks (in a worker process); keep this object alive while using it."""
+        dataset = copy.copy(self.skeleton)
+        for name, (block_name, shape, dtype, is_list, is_tensor) in self.fields.items():
+            # spawned workers report to the owner's resource tracker, which unlinks leftovers if the owner dies
+            block = shared_memory.SharedMemory(name=block_name)
+            self._blocks.append(block)
+            value = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+            if is_tensor:
+                import torch
+                value = torch.from_numpy(value)
+            setattr(dataset, name, list(value) if is_list else value)
+        return dataset
+
+    def release(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+def _init_worker(threads, shared):
+    from hparam_sweep import set_thread_budget
+    set_thread_budget(threads)
+    global _shared
+    _shared = shared
+    for kind, data in shared.items():
+        _datasets[kind] = data.attach()
+
+
+def train_one(conf, model_name, static_features_count=0):
+    """Train model_name in a compare worker process; returns its metrics and throughput."""
+    from thread_func import THREE_D_MODELS, prepare_training_data, create_model_task, training_task
+    conf = copy.deepcopy(conf)
+    training = conf["training"]
+    training["model"] = model_name
+    training["use_wandb"] = False
+    training["experiment_name"] = f"compare_{model_name}"
+    training["log_dir"] = os.path.join(conf["output_dir"] or "out", "compare")
+    # already in the model's format: only the model parameters are synced with the data shape
+    dataset = prepare_training_data(conf, _datasets["3d" if model_name in THREE_D_MODELS else "4d"],
+                                    static_features_count)
+    model = create_model_task(conf)["model"]
+    started = time.time()
+    results = training_task(conf, model, dataset)["training_results"]
+    seconds = results.get("training_time") or time.time() - started
+    epochs = len(results.get("train_losses", [])) or training["num_epochs"]
+    train_steps = int((1 - (training["val_ratio"] + training["test_ratio"])) * len(dataset.features))
+    return {
+        "model": model_name,
+        "completed": results.get("completed", True),
+        "error": results.get("error"),
+        "best_val_loss": results.get("best_val_loss", float("inf")),
+        "best_epoch": results.get("best_epoch"),
+        "val_metrics": results.get("best_val_metrics") or {},
+        "test_loss": results.get("test_loss"),
+        "test_metrics": results.get("test_metrics") or {},
+        "parameters": sum(p.numel() for p in model.parameters()) if hasattr(model, "parameters") else None,
+        "epochs": epochs,
+        "seconds": seconds,
+        "seconds_per_epoch": seconds / epochs if epochs else None,
+        "steps_per_second": epochs * train_steps / seconds if seconds else None,
+    }
+
+
+def compare_task(conf, models, static_features_count=0, progress_callback=None, cancel_token=None):
+    """Train models side by side on conf['training']['graph_data_path'], results best validation loss first."""
+    import multiprocessing
+    import torch
+    import stm_graph
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    from thread_func import THREE_D_MODELS
+    from hparam_sweep import trial_threads
+    if not models:
+        raise ValueError("No models selected")
+    dataset = torch.load(conf["training"]["graph_data_path"]) #4d
+    shared = {}
+    try:
+        if any(m not in THREE_D_MODELS for m in models):
+            shared["4d"] = SharedDataset(dataset)
+        if any(m in THREE_D_MODELS for m in models):
+            shared["3d"] = SharedDataset(stm_graph.convert_4d_to_3d_dataset(dataset, static_features_count))
+        del dataset
+        workers = max(1, min(len(models), conf["training"].get("trial_workers") or os.cpu_count() or 1))
+        threads = trial_threads(conf, workers)
+        print(f"Comparing {', '.join(models)}: {workers} processes x {threads} threads, "
+              f"{sum(s.nbytes for s in shared.values()) / 2**20:.1f} MB shared")
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(threads, shared))
+        results = []
+        finished = False
+        try:
+            pending = {pool.submit(train_one, conf, m, static_features_count) for m in models}
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                check_cancel(cancel_token)
+                for fut in done:
+                    res = fut.result()
+                    results.append(res)
+                    if progress_callback:
+                        progress_callback({"stage": "compare", "done": len(results), "total": len(models),
+                                           "message": f"{res['model']} trained: val loss {res['best_val_loss']:.4f} "
+                                                      f"({len(results)}/{len(models)})"})
+            finished = True
+        finally:
+            shutdown_pool(pool, finished)
+    finally:
+        for data in shared.values():
+            data.release()
+    results.sort(key=lambda r: (not r["completed"], r["best_val_loss"]))
+    return {"status": "ok", "results": results}
+
+
+def comparison_frame(results):
+    """Results side by side, one row per model."""
+    import pandas as pd
+    rows = []
+    for r in results:
+        row = {"model": r["model"], "best_val_loss": r["best_val_loss"], "best_epoch": r["best_epoch"]}
+        row.update({f"val_{k}": v for k, v in r["val_metrics"].items()})
+        row["test_loss"] = r["test_loss"]
+        row.update({f"test_{k}": v for k, v in r["test_metrics"].items()})
+        row.update({"parameters": r["parameters"], "epochs": r["epochs"], "seconds": r["seconds"],
+                    "s/epoch": r["seconds_per_epoch"], "steps/s": r["steps_per_second"], "error": r["error"]})
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -1,5 +1,17 @@
 CONFIG = {
     'output_dir': None,
+    'use_cache': True, # ---- reuse stage results (see stage_cache.py)
+    'cache_dir': None, # default: <output_dir>/.stm_cache
+    'cache_hash_input': False, # identify input by content hash instead of path/size/mtime
+    'raster_memory_mb': 256, # memory cap shared by the rasterization workers of big PDFs
+    'preprocess_memory_mb': None, # read the raw data in chunks within this cap (MB); None reads it at once
+    'use_ingest': True, # convert the raw data once to Parquet (with the cache) and preprocess from that copy
+    'ingest_columns': None, # raw columns kept besides time/lat/lon/id (None: all)
+    'max_jobs': 2, # background jobs (training, plotting) running at once, each in its own process
+    'max_queued_jobs': 8, # jobs waiting for a free slot; more are refused
+    'subprocess_stages': ['mapping'], # stages run in their own process: Cancel frees their CPU and memory at once (jobs always do)
+    'vis_mode': 'scatter', # point figures: 'scatter' (every point as vector, stm_graph's figures) or 'density' (binned raster, fixed size, for large datasets)
+    'density_resolution': 1024, # density bins along the longer side of the map
     'data_path': None,
     'time_column': None, 
     'lat_column': None, 
@@ -24,6 +36,7 @@ CONFIG = {
     'osm_types': None,
     'mapping': 'grid', # ---- mapping
     'cell_size': 1000,
+    'sweep_workers': None, # processes of a mapping parameter sweep (None: one per core)
     'vor_small_cell_size': 1000,
     'vor_big_cell_size': 2000,
     'adm_shape_file': None,
@@ -104,5 +117,50 @@ CONFIG = {
         "experiment_name": "stm_graph_experiment",
         "use_wandb": False,
         "log_dir": '',
+        "log_flush_ms": 50, # log view: lines are appended in chunks at most this often
+        "log_batch_lines": 500, # or when this many lines are waiting
+        "log_max_lines": 20000, # lines kept in the log view (oldest dropped)
+        "log_tail_kb": 512, # show only the last KB of an existing log (0: whole file)
+        "trial_workers": None, # processes of a hyperparameter sweep (None: one per core, at most one per trial)
+        "trial_threads": None, # torch threads per sweep process (None: cores / processes)
     }
-}
\ No newline at end of file
+}
+
+def merge_config(base, override):
+    # deep-merge override into base; plain values for [value, description] entries only replace the value
+    for k, v in override.items():
+        if isinstance(base.get(k), dict) and isinstance(v, dict):
+            merge_config(base[k], v)
+        elif isinstance(base.get(k), list) and len(base[k]) == 2 and isinstance(base[k][1], str) and not isinstance(v, list):
+            base[k][0] = v
+        else:
+            base[k] = v
+    return base
+
+def load_config(path, base=None):
+    """Load a JSON/YAML config file on top of a copy of CONFIG (or base)."""
+    import copy, json
+    with open(path, "r") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            import yaml
+            user_conf = yaml.safe_load(f) or {}
+        else:
+            user_conf = json.load(f)
+    return merge_config(copy.deepcopy(CONFIG if base is None else base), user_conf)
+
+def save_config(conf, path):
+    """Save config as JSON/YAML, leaving out secrets."""
+    import copy, json
+    conf = copy.deepcopy(conf)
+    conf["training"]["wandb_api_key"] = None
+    with open(path, "w") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            import yaml
+            yaml.safe_dump(conf, f, sort_keys=False)
+        else:
+            json.dump(conf, f, indent=4)
+
+def snapshot_config(conf=None):
+    """Frozen copy of conf (default CONFIG) for one job: later edits in the GUI do not reach a queued or running job."""
+    import copy
+    return copy.deepcopy(CONFIG if conf is None else conf)
@@ -0,0 +1,61 @@
+"""
+Sample of a raw data file for the step 1 preview: only the first rows are read, so the cost does
+not grow with the file. CSV goes through pyarrow's streaming reader (one block), Excel through
+openpyxl in read-only mode (rows streamed, the workbook is never parsed in full). pandas is the
+fallback when those are not installed.
+"""
+import os
+
+PREVIEW_ROWS = 1000
+CSV_BLOCK_BYTES = 1 << 20 # one block of 1 MB usually holds far more than PREVIEW_ROWS rows
+
+
+def read_csv_sample(path, nrows=PREVIEW_ROWS):
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        import pandas as pd
+        return pd.read_csv(path, nrows=nrows)
+    reader = pacsv.open_csv(path, read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_BYTES))
+    batches, rows = [], 0
+    for batch in reader:
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= nrows:
+            break
+    return pa.Table.from_batches(batches, schema=reader.schema).slice(0, nrows).to_pandas()
+
+
+def read_excel_sample(path, nrows=PREVIEW_ROWS):
+    import pandas as pd
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        return pd.read_excel(path, nrows=nrows)
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(max_row=nrows + 1, values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        columns = [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)]
+        return pd.DataFrame([row[:len(columns)] for row in rows], columns=columns)
+    finally:
+        wb.close()
+
+
+def read_sample(path, nrows=PREVIEW_ROWS):
+    """First nrows of a .csv or .xlsx file as a DataFrame."""
+    if path.lower().endswith(".csv"):
+        return read_csv_sample(path, nrows)
+    return read_excel_sample(path, nrows)
+
+
+def preview_task(path, nrows=PREVIEW_ROWS):
+    # worker function: the GUI only gets the (small) sample back
+    try:
+        data = read_sample(path, nrows)
+    except Exception as e:
+        return {"status": "error", "path": path, "message": f"Could not read {os.path.basename(path)}: {e}"}
+    return {"status": "ok", "path": path, "data": data}
@@ -0,0 +1,140 @@
+"""
+One-pass profile of the raw data file for the chosen time/lat/lon columns: row count, time range,
+coordinate bounding box and missing rate. The file is streamed in blocks and only the three columns
+are kept, so memory stays bounded by the block size whatever the file size.
+"""
+import os
+import numpy as np
+from task_control import check_cancel
+
+BLOCK_BYTES = 16 << 20 # CSV bytes per block
+EXCEL_CHUNK_ROWS = 50000
+
+
+class DataProfile:
+    """Running statistics over the chunks seen so far."""
+
+    def __init__(self, time_col, lat_col, lon_col, total_bytes=0):
+        self.columns = {"time": time_col, "lat": lat_col, "lon": lon_col}
+        self.rows = 0
+        self.missing = {key: 0 for key in self.columns} # empty or not parseable
+        self.time_min = self.time_max = None
+        self.lat_min = self.lon_min = np.inf
+        self.lat_max = self.lon_max = -np.inf
+        self.done_bytes = 0
+        self.total_bytes = total_bytes
+
+    def update(self, chunk):
+        """Add a DataFrame chunk holding the three columns (as read, any dtype)."""
+        import pandas as pd
+        self.rows += len(chunk)
+        times = pd.to_datetime(chunk[self.columns["time"]], errors="coerce")
+        self.missing["time"] += int(times.isna().sum())
+        if times.notna().any():
+            lo, hi = times.min(), times.max()
+            self.time_min = lo if self.time_min is None else min(self.time_min, lo)
+            self.time_max = hi if self.time_max is None else max(self.time_max, hi)
+        for key in ("lat", "lon"):
+            values = pd.to_numeric(chunk[self.columns[key]], errors="coerce").to_numpy(dtype=np.float64)
+            valid = values[np.isfinite(values)]
+            self.missing[key] += len(values) - len(valid)
+            if len(valid):
+                setattr(self, f"{key}_min", min(getattr(self, f"{key}_min"), valid.min()))
+                setattr(self, f"{key}_max", max(getattr(self, f"{key}_max"), valid.max()))
+
+    def bounds(self):
+        """Bounding box in the CONFIG['bounds'] layout, None before any valid coordinate."""
+        if not (np.isfinite(self.lat_min) and np.isfinite(self.lon_min)):
+            return None
+        return {"min_lat": float(self.lat_min), "max_lat": float(self.lat_max),
+                "min_lon": float(self.lon_min), "max_lon": float(self.lon_max)}
+
+    def missing_rate(self, key):
+        return self.missing[key] / self.rows if self.rows else 0.0
+
+    def summary(self):
+        lines = [f"Rows: {self.rows:,}"]
+        if self.time_min is not None:
+            lines.append(f"Time: {self.time_min:%Y-%m-%d} to {self.time_max:%Y-%m-%d}")
+        box = self.bounds()
+        if box:
+            lines.append(f"Lat: {box['min_lat']:.4f} to {box['max_lat']:.4f}")
+            lines.append(f"Lon: {box['min_lon']:.4f} to {box['max_lon']:.4f}")
+        lines.append("Missing: " + ", ".join(f"{key} {self.missing_rate(key):.1%}" for key in self.columns))
+        return "\n".join(lines)
+
+
+def iter_csv_chunks(path, columns, block_bytes=BLOCK_BYTES):
+    """(chunk, bytes read so far) over the given columns of a CSV."""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        yield from iter_csv_chunks_pandas(path, columns, block_bytes)
+        return
+    # read as text: a block-wise inferred type breaks on the first odd value further down the file
+    reader = pacsv.open_csv(
+        path, read_options=pacsv.ReadOptions(block_size=block_bytes),
+        convert_options=pacsv.ConvertOptions(include_columns=columns, column_types={c: pa.string() for c in columns}))
+    total = os.path.getsize(path)
+    read = 0
+    for batch in reader:
+        read = min(total, read + block_bytes)
+        yield batch.to_pandas(), read
+    yield None, total
+
+
+def iter_csv_chunks_pandas(path, columns, block_bytes):
+    import pandas as pd
+    total = os.path.getsize(path)
+    with open(path, "rb") as f:
+        for chunk in pd.read_csv(f, usecols=columns, dtype=str, chunksize=max(1000, block_bytes // 200)):
+            yield chunk, min(total, f.tell())
+    yield None, total
+
+
+def iter_excel_chunks(path, columns=None, chunk_rows=EXCEL_CHUNK_ROWS):
+    """(chunk, approximate bytes read so far) over the given columns (None: all) of the first sheet."""
+    import pandas as pd
+    from openpyxl import load_workbook
+    total = os.path.getsize(path)
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = wb.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(name) for name in next(rows, ())]
+        columns = header if columns is None else columns
+        idx = [header.index(c) for c in columns]
+        n_rows = max(1, (sheet.max_row or 1) - 1)
+        buf, seen = [], 0
+        for row in rows:
+            buf.append([row[i] if i < len(row) else None for i in idx])
+            if len(buf) >= chunk_rows:
+                seen += len(buf)
+                yield pd.DataFrame(buf, columns=columns), int(total * min(1.0, seen / n_rows))
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=columns), total
+    finally:
+        wb.close()
+    yield None, total
+
+
+def profile_task(path, time_col, lat_col, lon_col, cancel_token=None, progress_callback=None):
+    # worker function: streams the file once, reports the running profile after every chunk
+    columns = list(dict.fromkeys([time_col, lat_col, lon_col]))
+    profile = DataProfile(time_col, lat_col, lon_col, os.path.getsize(path))
+    chunks = iter_csv_chunks(path, columns) if path.lower().endswith(".csv") else iter_excel_chunks(path, columns)
+    try:
+        for chunk, done in chunks:
+            check_cancel(cancel_token)
+            if chunk is not None:
+                profile.update(chunk)
+            profile.done_bytes = done
+            if progress_callback:
+                progress_callback({"stage": "profile", "done": done, "total": profile.total_bytes,
+                                   "message": f"Profiling {os.path.basename(path)}: {profile.rows:,} rows",
+                                   "summary": profile.summary()})
+    except Exception as e:
+        return {"status": "error", "path": path, "message": f"Could not profile {os.path.basename(path)}: {e}"}
+    return {"status": "ok", "path": path, "profile": profile}
@@ -0,0 +1,150 @@
+"""
+Density rendering of event points (datashader-style): points are binned into a fixed-size 2D count
+raster with NumPy and drawn as one image, so figure size and render time do not grow with the
+number of points. Writes the same figure names as the stm_graph scatter plots, so the viewers,
+the rasterizer and the stage cache treat both the same way.
+"""
+import os
+import numpy as np
+import projection
+
+DEFAULT_RESOLUTION = 1024 # bins along the longer side of the extent
+# partition layers with more cells than this are embedded as an image instead of vector paths
+MAX_VECTOR_PARTITIONS = 5000
+
+
+def project_xy(gdf, crs):
+    """x, y arrays of point geometries in crs (the stored projected columns when present)."""
+    if crs is None:
+        return gdf.geometry.x.values, gdf.geometry.y.values
+    return projection.projected_xy(gdf, crs)
+
+
+def padded_extent(x, y, pad=0.1):
+    """(xmin, xmax, ymin, ymax) of the points with pad * size margin (like the stm_graph plots)."""
+    xmin, xmax, ymin, ymax = np.nanmin(x), np.nanmax(x), np.nanmin(y), np.nanmax(y)
+    dx = (xmax - xmin) * pad or 1.0
+    dy = (ymax - ymin) * pad or 1.0
+    return xmin - dx, xmax + dx, ymin - dy, ymax + dy
+
+
+def bin_points(x, y, extent, resolution=DEFAULT_RESOLUTION):
+    """Count points per cell of a grid over extent -> 2D int array (row 0 at the bottom)."""
+    xmin, xmax, ymin, ymax = extent
+    scale = resolution / max(xmax - xmin, ymax - ymin)
+    width = max(1, int(np.ceil((xmax - xmin) * scale)))
+    height = max(1, int(np.ceil((ymax - ymin) * scale)))
+    col = ((x - xmin) * scale).astype(np.int64)
+    row = ((y - ymin) * scale).astype(np.int64)
+    inside = (col >= 0) & (col < width) & (row >= 0) & (row < height)
+    counts = np.bincount(row[inside] * width + col[inside], minlength=width * height)
+    return counts.reshape(height, width)
+
+
+def draw_density(ax, counts, extent, cmap="inferno", alpha=1.0):
+    """Draw a count raster (log colour scale, empty cells transparent), return the image."""
+    from matplotlib.colors import LogNorm
+    masked = np.ma.masked_equal(counts, 0)
+    vmax = max(int(counts.max()), 2)
+    return ax.imshow(masked, extent=extent, origin="lower", cmap=cmap, norm=LogNorm(vmin=1, vmax=vmax),
+                     interpolation="nearest", alpha=alpha, zorder=3)
+
+
+def add_basemap(ax, crs, **kwargs):
+    try:
+        import contextily as ctx
+        ctx.add_basemap(ax, crs=crs, **kwargs)
+    except Exception as e:
+        print(f"Warning: Could not add background map: {e}")
+
+
+def save_figure(fig, path, dpi):
+    import matplotlib.pyplot as plt
+    fig.savefig(path, dpi=dpi, bbox_inches="tight", format=os.path.splitext(path)[1][1:])
+    plt.close(fig)
+    print(f"Visualization saved to {path}")
+
+
+def render_preprocess_figures(gdf, time_col, output_dir, vis_crs="EPSG:3857", show_background_map=True,
+                              resolution=DEFAULT_RESOLUTION, fig_format="pdf", fig_dpi=200):
+    """Density version of stm_graph's preprocess figures (spatial_distribution, temporal_distribution)."""
+    import matplotlib.pyplot as plt
+    vis_dir = os.path.join(output_dir, "preprocess")
+    os.makedirs(vis_dir, exist_ok=True)
+
+    x, y = project_xy(gdf, vis_crs)
+    extent = padded_extent(x, y)
+    fig, ax = plt.subplots(figsize=(12, 10))
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    if show_background_map:
+        add_basemap(ax, vis_crs)
+    img = draw_density(ax, bin_points(x, y, extent, resolution), extent)
+    fig.colorbar(img, ax=ax, shrink=0.7, label="Events per cell")
+    ax.set_title(f"Spatial Distribution of Events ({len(gdf)} points)")
+    ax.set_axis_off()
+    save_figure(fig, os.path.join(vis_dir, f"spatial_distribution.{fig_format}"), fig_dpi)
+
+    if time_col not in gdf.columns:
+        print(f"Warning: Time column '{time_col}' not found in data. Skipping temporal visualization.")
+        return
+    days, day_counts = np.unique(gdf[time_col].values.astype("datetime64[D]"), return_counts=True)
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(days, day_counts, linewidth=2)
+    ax.set_title("Event Counts Over Time")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Number of Events")
+    ax.grid(True, alpha=0.3)
+    fig.autofmt_xdate()
+    save_figure(fig, os.path.join(vis_dir, f"temporal_distribution.{fig_format}"), fig_dpi)
+
+
+def plot_partitions(ax, partitions, column=None, **kwargs):
+    # very fine partitions become an embedded image: file size bounded by the figure, not the cell count
+    partitions.plot(ax=ax, column=column, rasterized=len(partitions) > MAX_VECTOR_PARTITIONS, **kwargs)
+
+
+def render_mapping_figures(points_gdf, partition_gdf, point_to_partition, output_dir, name="mapping",
+                           plot_crs="EPSG:3857", resolution=DEFAULT_RESOLUTION, fig_format="pdf", fig_dpi=200,
+                           show_background_map=True):
+    """Density version of the mapper figures (all_regions, active_regions, point_density)."""
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    out_dir = os.path.join(output_dir, "mapping")
+    os.makedirs(out_dir, exist_ok=True)
+
+    x, y = project_xy(points_gdf, plot_crs)
+    extent = padded_extent(x, y)
+    counts = bin_points(x, y, extent, resolution)
+    regions = partition_gdf.to_crs(plot_crs)
+    # points per region in one pass (p2x holds partition_gdf index labels, -1 for unmapped)
+    p2x = np.asarray(point_to_partition, dtype=np.int64)
+    point_count = pd.Series(p2x[p2x >= 0]).value_counts().reindex(regions.index, fill_value=0)
+    regions = regions.assign(point_count=point_count.to_numpy())
+
+    def new_axes():
+        fig, ax = plt.subplots(figsize=(12, 12))
+        ax.set_xlim(extent[0], extent[1])
+        ax.set_ylim(extent[2], extent[3])
+        if show_background_map:
+            add_basemap(ax, plot_crs)
+        return fig, ax
+
+    layers = [("all_regions", regions, f"{name.title()} Mapping (All Regions)", "")]
+    layers.append(("active_regions", regions[regions["point_count"] > 0],
+                   f"{name.title()} Mapping - Active Regions Only", " (Active only)"))
+    for fname, parts, title, suffix in layers:
+        fig, ax = new_axes()
+        plot_partitions(ax, parts, column="point_count", alpha=0.5, edgecolor="black", linewidth=0.5, legend=True,
+                        legend_kwds={"label": f"Points per {name} region{suffix}"}, zorder=2)
+        draw_density(ax, counts, extent, cmap="Reds", alpha=0.8)
+        ax.set_title(title)
+        ax.set_axis_off()
+        save_figure(fig, os.path.join(out_dir, f"{fname}.{fig_format}"), fig_dpi)
+
+    fig, ax = new_axes()
+    plot_partitions(ax, regions, column="point_count", cmap="viridis", legend=True,
+                    legend_kwds={"label": "Points per region"}, edgecolor="black", linewidth=0.2, alpha=0.7, zorder=2)
+    ax.set_title(f"{name.title()} Region Point Density")
+    ax.set_axis_off()
+    save_figure(fig, os.path.join(out_dir, f"point_density.{fig_format}"), fig_dpi)
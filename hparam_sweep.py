@@ -0,0 +1,240 @@
+"""
+Hyperparameter sweep over CONFIG['training']: grid, random or successive-halving search, with the
+trials fanned out over a spawned process pool. Every pool process loads the graph dataset once and
+gets a fixed torch thread budget, so workers x threads stays within the cores. Successive halving
+trains all candidates for a few epochs, keeps the best 1/eta, and retrains those with eta times the
+epochs, until max_epochs: bad settings are dropped after their short run.
+
+A sweep spec (JSON/YAML, see load_spec):
+
+    {"strategy": "halving", "n_trials": 27, "seed": 0, "min_epochs": 2, "max_epochs": 18, "eta": 3,
+     "space": {"learning_rate": [0.0001, 0.001, 0.01],
+               "gcn.hidden_channels": [32, 64, 128],
+               "gcn.dropout": {"min": 0.0, "max": 0.5},
+               "scheduler_type": ["step", "plateau"]}}
+
+Keys of the space are CONFIG['training'] keys; "<model>.<param>" sets a model parameter. Lists are
+the values to try, {"min", "max", "log"} ranges are sampled (random and halving only).
+"""
+import copy
+import itertools
+import math
+import os
+import random
+import time
+from task_control import check_cancel, shutdown_pool
+
+STRATEGIES = ("grid", "random", "halving")
+
+_dataset = None # 4d temporal dataset of a sweep worker process, set by the pool initializer
+
+
+def load_spec(path):
+    import json
+    with open(path, "r") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            import yaml
+            spec = yaml.safe_load(f) or {}
+        else:
+            spec = json.load(f)
+    check_spec(spec)
+    return spec
+
+
+def check_spec(spec):
+    if spec.get("strategy", "grid") not in STRATEGIES:
+        raise ValueError(f"Unknown sweep strategy {spec['strategy']!r}, expected one of {', '.join(STRATEGIES)}")
+    if not spec.get("space"):
+        raise ValueError("Sweep spec has no search space")
+    for key, values in spec["space"].items():
+        if isinstance(values, dict):
+            if spec.get("strategy", "grid") == "grid":
+                raise ValueError(f"{key}: ranges can only be sampled (random or halving strategy)")
+            if not {"min", "max"} <= set(values):
+                raise ValueError(f"{key}: a range needs min and max")
+        elif not isinstance(values, list) or not values:
+            raise ValueError(f"{key}: expected a list of values or a min/max range")
+
+
+def apply_params(conf, params):
+    """Copy of conf with the trial's values set in conf['training']."""
+    conf = copy.deepcopy(conf)
+    training = conf["training"]
+    for key, value in params.items():
+        model, _, name = key.rpartition(".")
+        section = training[model] if model else training
+        if name not in section:
+            raise KeyError(f"Unknown training parameter {key}")
+        if isinstance(section[name], list): # [value, description] model parameter
+            section[name][0] = value
+        else:
+            section[name] = value
+    return conf
+
+
+def grid_trials(space):
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def sample(values, rng):
+    if isinstance(values, list):
+        return rng.choice(values)
+    if values.get("log"):
+        return math.exp(rng.uniform(math.log(values["min"]), math.log(values["max"])))
+    value = rng.uniform(values["min"], values["max"])
+    return round(value) if isinstance(values["min"], int) and isinstance(values["max"], int) else value
+
+
+def random_trials(space, n_trials, seed=None):
+    rng = random.Random(seed)
+    return [{k: sample(v, rng) for k, v in space.items()} for _ in range(n_trials)]
+
+
+def candidate_trials(spec):
+    space = spec["space"]
+    if spec.get("strategy", "grid") == "grid":
+        return grid_trials(space)
+    if spec.get("strategy") == "halving" and not spec.get("n_trials") \
+            and all(isinstance(v, list) for v in space.values()):
+        return grid_trials(space) # halving over the whole grid
+    return random_trials(space, spec.get("n_trials", 10), spec.get("seed"))
+
+
+def halving_rungs(n_trials, min_epochs, max_epochs, eta=3):
+    """[(trials kept, epochs)] per rung: n, n/eta, ... candidates with min_epochs, x eta, ... epochs."""
+    rungs = []
+    epochs = min_epochs
+    while True:
+        rungs.append((n_trials, min(epochs, max_epochs)))
+        if epochs >= max_epochs or n_trials <= 1:
+            return rungs
+        n_trials = max(1, n_trials // eta)
+        epochs *= eta
+
+
+def trial_threads(conf, workers):
+    threads = conf["training"].get("trial_threads")
+    return threads or max(1, (os.cpu_count() or 1) // workers)
+
+
+def set_thread_budget(threads):
+    # in a fresh worker process, before torch starts its thread pools: one fixed budget against oversubscription
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+
+def _init_worker(threads, dataset_path):
+    global _dataset
+    set_thread_budget(threads)
+    import torch
+    _dataset = torch.load(dataset_path)
+
+
+def run_trial(conf, trial_id, params, epochs, static_features_count=0):
+    """Train one setting for epochs in a sweep worker process; returns its validation results."""
+    from thread_func import prepare_training_data, create_model_task, training_task
+    conf = apply_params(conf, params)
+    training = conf["training"]
+    training["num_epochs"] = epochs
+    training["use_wandb"] = False
+    training["experiment_name"] = f"trial_{trial_id:03d}_{epochs}ep"
+    training["log_dir"] = os.path.join(conf["output_dir"] or "out", "sweep")
+    started = time.time()
+    dataset = prepare_training_data(conf, _dataset, static_features_count)
+    model = create_model_task(conf)["model"]
+    results = training_task(conf, model, dataset)["training_results"]
+    return {
+        "trial": trial_id,
+        "params": params,
+        "epochs": epochs,
+        "completed": results.get("completed", True),
+        "error": results.get("error"),
+        "best_val_loss": results.get("best_val_loss", math.inf),
+        "best_epoch": results.get("best_epoch"),
+        "val_metrics": results.get("best_val_metrics") or {},
+        "test_loss": results.get("test_loss"),
+        "seconds": time.time() - started,
+    }
+
+
+def rank(trials):
+    """Best first: trials that reached more epochs, then lower validation loss; failed trials last."""
+    return sorted(trials, key=lambda t: (not t["completed"], -t["epochs"], t["best_val_loss"]))
+
+
+def run_rung(pool, conf, trials, epochs, static_features_count, done, total, progress_callback, cancel_token):
+    from concurrent.futures import wait, FIRST_COMPLETED
+    pending = {pool.submit(run_trial, conf, trial_id, params, epochs, static_features_count)
+               for trial_id, params in trials}
+    results = []
+    while pending:
+        finished, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+        check_cancel(cancel_token)
+        for fut in finished:
+            res = fut.result()
+            results.append(res)
+            if progress_callback:
+                progress_callback({"stage": "sweep", "done": done + len(results), "total": total,
+                                   "message": f"Trial {res['trial']} ({epochs} epochs): "
+                                              f"val loss {res['best_val_loss']:.4f} "
+                                              f"({done + len(results)}/{total} runs)"})
+    return results
+
+
+def hparam_sweep_task(conf, spec, static_features_count=0, progress_callback=None, cancel_token=None):
+    """
+    Run the sweep described by spec on conf['training']['graph_data_path']. Returns all trial results,
+    ranked (see rank); with successive halving a trial's entry is its longest run.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    check_spec(spec)
+    candidates = list(enumerate(candidate_trials(spec), 1))
+    if spec.get("strategy", "grid") == "halving":
+        rungs = halving_rungs(len(candidates), spec.get("min_epochs", 1),
+                              spec.get("max_epochs", conf["training"]["num_epochs"]), spec.get("eta", 3))
+    else:
+        rungs = [(len(candidates), spec.get("epochs", conf["training"]["num_epochs"]))]
+    total = sum(n for n, _ in rungs)
+    workers = max(1, min(len(candidates), conf["training"].get("trial_workers") or os.cpu_count() or 1))
+    threads = trial_threads(conf, workers)
+    print(f"Sweep: {len(candidates)} candidates, rungs {rungs}, {workers} processes x {threads} threads")
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(threads, conf["training"]["graph_data_path"]))
+    latest = {} # trial id -> its longest run so far
+    runs = 0
+    finished = False
+    try:
+        alive = candidates
+        for keep, epochs in rungs:
+            if latest:
+                # prune: only the best `keep` of the previous rung train again, longer
+                ids = {t["trial"] for t in rank([latest[t] for t, _ in alive])[:keep] if t["completed"]}
+                alive = [(t, p) for t, p in alive if t in ids]
+            results = run_rung(pool, conf, alive, epochs, static_features_count, runs, total,
+                               progress_callback, cancel_token)
+            runs += len(results)
+            latest.update({r["trial"]: r for r in results})
+        finished = True
+    finally:
+        shutdown_pool(pool, finished)
+    return {"status": "ok", "strategy": spec.get("strategy", "grid"), "rungs": rungs,
+            "trials": rank(list(latest.values()))}
+
+
+def ranking_frame(trials):
+    """Ranked trials as a DataFrame: one column per swept parameter and validation metric."""
+    import pandas as pd
+    rows = []
+    for place, t in enumerate(rank(trials), 1):
+        row = {"rank": place, "trial": t["trial"], **t["params"], "epochs": t["epochs"],
+               "best_val_loss": t["best_val_loss"], "best_epoch": t["best_epoch"]}
+        row.update({f"val_{k}": v for k, v in t["val_metrics"].items()})
+        row.update({"test_loss": t["test_loss"], "seconds": round(t["seconds"], 1), "error": t["error"]})
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,179 @@
+"""
+Ingest cache: the raw CSV/XLSX is converted once into a typed Parquet copy (time column parsed,
+lat/lon as float32, the other columns as their raw text) kept with the stage cache in the output directory.
+Like read_csv on the whole file, a column is numeric (or bool) only if all of its values are; that kind is
+decided over all chunks, stored in the file metadata, and applied when reading.
+Later runs read that copy with column projection and with the date filter and bounds pushed down
+to the Parquet row groups, instead of parsing the text file again. The copy is keyed by the source
+fingerprint and the chosen columns, so an edited or replaced source is converted again.
+"""
+import os
+import json
+import numpy as np
+import pandas as pd
+import stage_cache
+from chunked_preprocess import (ID_COLUMNS, id_column, chunk_rows_for, iter_chunks, chunk_kinds, merge_kind,
+                                apply_kinds, finish_events)
+
+INGEST_MEMORY_MB = 256 # chunk working set while converting, unless preprocess_memory_mb is set
+INGEST_FORMAT = 2 # bump when the layout of the copy changes, so old copies are converted again
+PARQUET_FILE = "events.parquet"
+KINDS_KEY = b"stm_column_kinds" # Parquet metadata: {column: "number" | "bool" | "text"}
+
+
+def ingest_key(conf):
+    return stage_cache.make_key(
+        "ingest", INGEST_FORMAT,
+        stage_cache.file_fingerprint(conf["data_path"], content_hash=conf.get("cache_hash_input", False)),
+        conf["time_column"], conf["lat_column"], conf["long_column"],
+    )
+
+
+def chunk_schema(columns, time_col, lat_col, lon_col):
+    """Arrow schema of the copy: parsed time, float32 coordinates, everything else as text."""
+    import pyarrow as pa
+    fields = []
+    for col in columns:
+        if col == time_col:
+            typ = pa.timestamp("ns")
+        elif col in (lat_col, lon_col):
+            typ = pa.float32()
+        else:
+            typ = pa.string()
+        fields.append(pa.field(str(col), typ))
+    return pa.schema(fields)
+
+
+def as_text(col):
+    return col.astype(object).where(col.notna(), None).map(lambda v: v if v is None else str(v))
+
+
+def typed_chunk(chunk, schema):
+    import pyarrow as pa
+    arrays = []
+    for field in schema:
+        col = chunk[field.name]
+        if pa.types.is_timestamp(field.type):
+            col = pd.to_datetime(col, errors="coerce")
+            if getattr(col.dt, "tz", None) is not None:
+                col = col.dt.tz_localize(None) # keep the local wall time the time bins are made of
+        elif pa.types.is_floating(field.type):
+            col = pd.to_numeric(col, errors="coerce")
+        else:
+            col = as_text(col)
+        arrays.append(pa.array(col, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def convert_to_parquet(src, dst, time_col, lat_col, lon_col, memory_mb=INGEST_MEMORY_MB, progress_callback=None):
+    """Stream src into a typed Parquet file dst, one row group per chunk; returns the row count."""
+    import pyarrow.parquet as pq
+    chunk_rows = chunk_rows_for(src, memory_mb)
+    total = os.path.getsize(src)
+    writer, rows, kinds = None, 0, {}
+    try:
+        # as text: a chunk's own inference would turn "00123" into 123 before the file-wide kind is known
+        for chunk, done in iter_chunks(src, chunk_rows, dtype=str):
+            chunk.columns = [str(c) for c in chunk.columns]
+            missing = [c for c in (time_col, lat_col, lon_col) if c not in chunk.columns]
+            if missing:
+                raise ValueError(f"Required columns missing from dataset: {missing}")
+            if writer is None:
+                schema = chunk_schema(chunk.columns, time_col, lat_col, lon_col)
+                text_cols = [c for c in chunk.columns if c not in (time_col, lat_col, lon_col)]
+                kinds = dict.fromkeys(text_cols)
+                writer = pq.ParquetWriter(dst, schema, compression="zstd")
+            writer.write_table(typed_chunk(chunk, schema))
+            for col, kind in chunk_kinds(chunk, text_cols).items():
+                kinds[col] = merge_kind(kinds[col], kind)
+            rows += len(chunk)
+            if progress_callback:
+                progress_callback({"stage": "ingest", "done": min(done, total), "total": total,
+                                   "message": f"Converting {os.path.basename(src)} to Parquet: {rows:,} rows"})
+        if writer is not None:
+            writer.add_key_value_metadata({KINDS_KEY: json.dumps({c: k or "text" for c, k in kinds.items()})})
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def ensure_parquet(conf, progress_callback=None):
+    """Path of the Parquet copy of conf['data_path'], converting the source on first use."""
+    key = ingest_key(conf)
+    hit = stage_cache.lookup(conf, "ingest", key)
+    if hit:
+        return os.path.join(hit[0], hit[1]["files"]["events"])
+    def write(d):
+        rows = convert_to_parquet(conf["data_path"], os.path.join(d, PARQUET_FILE), conf["time_column"],
+                                  conf["lat_column"], conf["long_column"],
+                                  conf.get("preprocess_memory_mb") or INGEST_MEMORY_MB, progress_callback)
+        return {"files": {"events": PARQUET_FILE}, "meta": {"data_path": conf["data_path"], "rows": rows}}
+    entry = stage_cache.store(conf, "ingest", key, write)
+    return None if entry is None else os.path.join(entry, PARQUET_FILE)
+
+
+def event_filter(time_col, lat_col, lon_col, bounds=None, filter_dates=None):
+    """Row filter of read_event_dataset (valid time and coordinates, bounds, dates) as an Arrow expression."""
+    import pyarrow.compute as pc
+    expr = pc.field(time_col).is_valid() & pc.field(lat_col).is_valid() & pc.field(lon_col).is_valid()
+    if bounds:
+        # compared in float32 like the stored values
+        lat, lon = pc.field(lat_col), pc.field(lon_col)
+        expr &= (lat >= np.float32(bounds["min_lat"])) & (lat <= np.float32(bounds["max_lat"])) \
+            & (lon >= np.float32(bounds["min_lon"])) & (lon <= np.float32(bounds["max_lon"]))
+    if filter_dates:
+        start, end = filter_dates
+        if start is not None:
+            expr &= pc.field(time_col) >= pd.to_datetime(start)
+        if end is not None:
+            expr &= pc.field(time_col) <= pd.to_datetime(end)
+    return expr
+
+
+def column_kinds(path):
+    import pyarrow.parquet as pq
+    return json.loads((pq.read_metadata(path).metadata or {}).get(KINDS_KEY, b"{}"))
+
+
+def read_events(path, time_col, lat_col, lon_col, columns=None, bounds=None, filter_dates=None):
+    """
+    Filtered rows of the Parquet copy; columns=None reads all, otherwise the given ones plus time/lat/lon/id.
+    Without an id column, full-row duplicates are dropped here before projecting, so events that only
+    differ in a column not read are kept; finish_events then must not de-duplicate again.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pq.read_schema(path)
+    kinds = column_kinds(path)
+    project = None
+    if columns is not None:
+        wanted = [time_col, lat_col, lon_col, *ID_COLUMNS, *columns]
+        columns = [c for c in dict.fromkeys(wanted) if c in schema.names]
+        if id_column(schema.names) is None:
+            project, columns = columns, None
+    names = columns or schema.names
+    table = pq.read_table(path, columns=columns, filters=event_filter(time_col, lat_col, lon_col, bounds, filter_dates),
+                          read_dictionary=[c for c in names if pa.types.is_string(schema.field(c).type)
+                                           and kinds.get(c, "text") == "text"])
+    df = apply_kinds(table.to_pandas(), kinds)
+    if project is not None:
+        df = df.drop_duplicates()[project]
+    return df
+
+
+def preprocess_ingested(conf, progress_callback=None):
+    """stm_graph.preprocess_dataset equivalent (without the figures) served from the Parquet copy."""
+    path = ensure_parquet(conf, progress_callback)
+    if path is None: # cache off or not writable: nothing to read from
+        return None
+    bounds = conf["bounds"] if conf["test_mode"] and conf["bounds"] else None
+    columns = conf.get("ingest_columns")
+    df = read_events(path, conf["time_column"], conf["lat_column"], conf["long_column"],
+                     columns=columns, bounds=bounds,
+                     filter_dates=(conf["date_filter_start"], conf["date_filter_end"]))
+    print(f"Read {len(df)} rows from {path}")
+    # projected without an id column: read_events already dropped the full-row duplicates
+    deduplicate = columns is None or id_column(df.columns) is not None
+    return finish_events(df, conf["time_column"], conf["lat_column"], conf["long_column"], crs=conf["input_crs"],
+                         deduplicate=deduplicate)
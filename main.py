@@ -7,32 +7,42 @@ if getattr(sys, 'frozen', False):
     gui_path = os.path.join(sys._MEIPASS, "gui.ui")
     
     
-import stm_graph
-import torch
-import time
-import pandas as pd
 from PyQt6.uic import loadUi
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer, QDate, pyqtSignal
 from PyQt6.QtGui import QIcon, QMovie
 from PyQt6.QtWidgets import (
     QApplication,
     QFileDialog,
     QMessageBox,
-    QTableWidgetItem,
     QMainWindow,
     QCheckBox,
     QPushButton,
     QLabel,
     QLineEdit, 
     QComboBox,
-    QAbstractItemView
+    QAbstractItemView,
+    QHBoxLayout,
+    QStackedWidget,
+    QWidget
 )
 from WorkThread import Worker
+from JobQueue import JobQueue, QueueFull
+from JobsPanel import JobsPanel
+from SweepDialog import SweepDialog
+from CompareDialog import CompareDialog, ComparisonResults
 from PDFViewer import PdfViewerWidget
+from ThumbnailStrip import ThumbnailStrip
+from MapCanvas import MapCanvas, prepare_map_layers
+from DataFrameModel import DataFrameModel
+from data_preview import preview_task
+from data_profile import profile_task
 from LogPrinter import LogPrinter as LP
 from LogFileWatcher import LogFileWatcher as LFW
-from thread_func import *
-from config import CONFIG
+from config import CONFIG, save_config, snapshot_config
+import stage_cache
+from utils import warm_up_imports
+# N.B. heavy modules (stm_graph, torch, pandas, fitz) are imported where first needed,
+# see warm_up() for preloading them in background once the window is shown
 
 crs_pattern = r"(?i)^EPSG:\d{3,}$"
 
@@ -44,8 +54,12 @@ def resource_path(relative_path):
 
 
 class MainWindow(QMainWindow):
+    first_painted = pyqtSignal()
+
     def __init__(self):
         super(MainWindow, self).__init__()
+        self._painted = False
+        self.warmer = None
         loadUi(gui_path, self)
         self.setWindowTitle("STM-Graph v1.0.0")
         self.setWindowIcon(QIcon(resource_path("images/app-icon.png")))
@@ -54,6 +68,11 @@ class MainWindow(QMainWindow):
 
         # initial value -- DATA
         self.loaded_data = None
+        self.preview_path = None
+        self.profile = None
+        self.profile_key = None
+        self.profile_generation = 0
+        self.profile_prefill = {}
         self.data_tab_index = 0
         self.model_tab_index = 0
         self.column_names = []
@@ -92,6 +111,7 @@ class MainWindow(QMainWindow):
         self.btnBrowseOutDir.clicked.connect(lambda: self.browse_dir(self.txtOutDir))
         self.txtOutDir.textChanged.connect(self.validate_data_s2)
         self.btnQuit.clicked.connect(self.quit)
+        self.btnCancel.clicked.connect(self.cancel_task)
         self.tabMain.currentChanged.connect(self.main_active_tab)
         self.tabDataMain.currentChanged.connect(self.data_active_tab)
         self.tabTrainingMain.currentChanged.connect(self.mod_active_tab)
@@ -110,6 +130,7 @@ class MainWindow(QMainWindow):
         self.lineGridSizeVal.textChanged.connect(self.validate_data_s4)
         self.lineVoronoiCellSmallVal.textChanged.connect(self.validate_data_s4)
         self.lineVoronoiCellLargeVal.textChanged.connect(self.validate_data_s4)
+        self.btnSweep.clicked.connect(self.open_sweep)
         self.comboBoxPlotType.activated.connect(self.update_plot_config)
         self.btnDataPlot.clicked.connect(self.start_plotting)
         
@@ -129,6 +150,8 @@ class MainWindow(QMainWindow):
         self.numeric_line_model_config = {}
         self.comboBox_model_config = {}
         self.printer = None
+        self.log_watcher = None
+        self.current_task = None
         self.log_file_watcher = None
         # func connect -- MODEL
         for le in self.float_params_line_edits.values(): # params tab
@@ -139,6 +162,7 @@ class MainWindow(QMainWindow):
         self.comboBoxOptim.activated.connect(self.validate_model_params)
         self.comboBoxScheduler.activated.connect(self.validate_model_params)
         self.comboBoxEarlyStop.activated.connect(self.validate_model_params)
+        self.btnCompareModels.clicked.connect(self.start_compare)
         self.btnBrowseGraphData.clicked.connect(lambda: self.browse_file("Select graph data file", ["pt"], self.lineGraphData, False))
         self.lineGraphData.textChanged.connect(self.validate_model_params)
         self.btnBrowseLog.clicked.connect(lambda: self.browse_dir(self.txtLogDir)) # log tab
@@ -149,6 +173,87 @@ class MainWindow(QMainWindow):
         self.lineWandbToken.textChanged.connect(self.validate_model_log)
         self.lineWandbID.textChanged.connect(self.validate_model_log)
     
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            # let the first frame reach the screen before anything else
+            QTimer.singleShot(0, self.first_painted.emit)
+
+    def warm_up(self):
+        self.warmer = Worker(warm_up_imports)
+        self.warmer.finished.connect(self.on_warm_up_done)
+        self.warmer.start()
+
+    def on_progress(self, info):
+        self.statusbar.showMessage(info["message"])
+
+    def run_task(self, worker, on_done, reset):
+        # long stage: Cancel stops it, and a failure or cancel runs reset() instead of leaving the spinner on
+        self.current_task = worker
+        worker.finished.connect(lambda _: self.end_task())
+        worker.finished.connect(on_done)
+        worker.progress.connect(self.on_progress)
+        worker.failed.connect(lambda error: self.on_task_failed(reset, error))
+        worker.cancelled.connect(lambda: self.on_task_cancelled(reset))
+        self.btnCancel.setEnabled(True)
+        self.btnCancel.show()
+        worker.start()
+
+    def end_task(self):
+        self.current_task = None
+        self.btnCancel.hide()
+
+    def cancel_task(self):
+        if self.current_task is not None:
+            self.btnCancel.setEnabled(False)
+            self.statusbar.showMessage("Cancelling...")
+            self.current_task.cancel()
+
+    def on_task_failed(self, reset, error):
+        self.end_task()
+        reset()
+        self.statusbar.clearMessage()
+        QMessageBox.warning(self, "Task failed", error["message"])
+
+    def on_task_cancelled(self, reset):
+        self.end_task()
+        reset()
+        self.statusbar.showMessage("Cancelled", 5000)
+
+    def submit_job(self, name, fn, *args, on_done=None):
+        # the job gets a snapshot of CONFIG, so editing the next run does not change it
+        try:
+            job = self.job_queue.submit(name, fn, snapshot_config(), *args, on_done=on_done)
+        except QueueFull as e:
+            QMessageBox.warning(self, "Job queue full", f"{e}. Wait for one to finish or cancel one in the Jobs panel.")
+            return None
+        self.jobs_panel.show()
+        return job
+
+    def on_job_changed(self, job):
+        running, queued = len(self.job_queue.running()), len(self.job_queue.pending())
+        self.btnJobs.setText(f"Jobs ({running} running, {queued} queued)" if running or queued else "Jobs")
+        if job.active:
+            return
+        if job is self.training_job:
+            self.stop_log_view()
+        if job in self.plot_jobs:
+            self.plot_jobs.remove(job)
+            if not self.plot_jobs:
+                self.movieTGD.stop()
+                self.spinnerTGD.hide()
+
+    def on_job_started(self, job):
+        if job is self.training_job:
+            self.start_log_view() # it was queued behind other jobs
+
+    def on_job_failed(self, job, error):
+        QMessageBox.warning(self, "Job failed", f"{job.name} (#{job.id}) failed:\n{error['message']}")
+
+    def on_warm_up_done(self, timings):
+        print("Preloaded modules: " + ", ".join(f"{m} ({t:.2f}s)" for m, t in timings.items()))
+
     # override the closeEvent function
     def closeEvent(self, event):
         reply = QMessageBox.question(
@@ -157,6 +262,9 @@ class MainWindow(QMainWindow):
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No
         )
         if reply == QMessageBox.StandardButton.Yes:
+            if self.current_task is not None:
+                self.current_task.shutdown() # do not leave a task process behind
+            self.job_queue.shutdown()
             event.accept()
         else:
             event.ignore()
@@ -168,6 +276,9 @@ class MainWindow(QMainWindow):
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No,
         )
         if response == QMessageBox.StandardButton.Yes:
+            if self.current_task is not None:
+                self.current_task.shutdown()
+            self.job_queue.shutdown()
             sys.exit()
         else:
             return
@@ -287,6 +398,22 @@ class MainWindow(QMainWindow):
         self.tableInputView.setEditTriggers(
             QAbstractItemView.EditTrigger.NoEditTriggers
         )
+        self.preview_model = DataFrameModel()
+        self.tableInputView.setModel(self.preview_model)
+        # background jobs (training, plotting): the wizard stays usable while they run
+        self.job_queue = JobQueue(CONFIG["max_jobs"], CONFIG["max_queued_jobs"], self)
+        self.job_queue.changed.connect(self.on_job_changed)
+        self.job_queue.failed.connect(self.on_job_failed)
+        self.job_queue.started.connect(self.on_job_started)
+        self.jobs_panel = JobsPanel(self.job_queue, self)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.jobs_panel)
+        self.jobs_panel.setFloating(True) # the main window has a fixed layout
+        self.jobs_panel.hide()
+        self.btnJobs = QPushButton("Jobs")
+        self.btnJobs.clicked.connect(lambda: self.jobs_panel.setVisible(not self.jobs_panel.isVisible()))
+        self.statusbar.addPermanentWidget(self.btnJobs)
+        self.training_job = None
+        self.plot_jobs = []
         self.labelGeoGuide.setText(
             "N.B. For accurate mapping result, refer to "
             '<a href="https://epsg.io/">epsg.io</a>'
@@ -386,6 +513,20 @@ class MainWindow(QMainWindow):
         btnPrev.setEnabled(bool(fl) and idx > 0)
         btnNext.setEnabled(bool(fl) and idx < len(fl) - 1)
 
+    def on_figure_displayed(self, path, latency_ms):
+        # time from the page request to the figure on screen; a running task's progress message stays
+        if self.current_task is None:
+            self.statusbar.showMessage(f"{os.path.basename(path)} shown in {latency_ms:.0f} ms", 3000)
+
+    def with_thumbnails(self, viewer, btnPrev, btnNext):
+        # viewer with a thumbnail strip on its right; clicking a thumbnail moves prev/next too
+        strip = ThumbnailStrip(viewer)
+        viewer.currentChanged.connect(lambda _: self.update_nav_buttons(viewer, btnPrev, btnNext))
+        layout = QHBoxLayout()
+        layout.addWidget(viewer, stretch=1)
+        layout.addWidget(strip)
+        return layout
+
     def on_prev(self, viewer, btnPrev, btnNext):
         viewer.prev_file()
         self.update_nav_buttons(viewer, btnPrev, btnNext)
@@ -394,6 +535,12 @@ class MainWindow(QMainWindow):
         viewer.next_file()
         self.update_nav_buttons(viewer, btnPrev, btnNext)
 
+    def export_config(self):
+        # keep a replayable copy of the current settings next to the outputs (see run_pipeline.py)
+        out_dir = CONFIG["output_dir"] or CONFIG["training"]["log_dir"]
+        if out_dir and os.path.isdir(out_dir):
+            save_config(CONFIG, os.path.join(out_dir, "stm_config.json"))
+
     def browse_dir(self, line_edit):
         fname = QFileDialog.getExistingDirectory(self, "Select Folder")
         if fname:
@@ -416,19 +563,29 @@ class MainWindow(QMainWindow):
             line_edit.setText(fname[0])
             if preview_raw: # for loading preview raw data (in first step)
                 CONFIG['data_path'] = fname[0]
-                if CONFIG['data_path'].lower().endswith(".csv"):
-                    self.loaded_data = pd.read_csv(CONFIG['data_path'], nrows=1000)
-                else: # xlxs
-                    self.loaded_data = pd.read_excel(CONFIG['data_path'], nrows=1000)
-                if self.loaded_data is not None:
-                    self.comboBoxTime.clear()
-                    self.comboBoxLong.clear()
-                    self.comboBoxLat.clear()
-                    self.column_names = [str(x) for x in self.loaded_data.columns]
-                    self.comboBoxTime.addItems(self.column_names)
-                    self.comboBoxLong.addItems(self.column_names)
-                    self.comboBoxLat.addItems(self.column_names)
-                    self.preview()
+                self.statusbar.showMessage(f"Reading {os.path.basename(fname[0])}...")
+                # sample read off the GUI thread; a newer selection makes older results stale
+                self.preview_worker = Worker(preview_task, fname[0])
+                self.preview_worker.finished.connect(self.on_preview_done)
+                self.preview_worker.start()
+
+    def on_preview_done(self, result):
+        if result["path"] != CONFIG['data_path']:
+            return
+        self.statusbar.clearMessage()
+        if result["status"] != "ok":
+            QMessageBox.warning(self, "Invalid File", result["message"])
+            return
+        self.loaded_data = result["data"]
+        self.preview_path = result["path"]
+        self.comboBoxTime.clear()
+        self.comboBoxLong.clear()
+        self.comboBoxLat.clear()
+        self.column_names = [str(x) for x in self.loaded_data.columns]
+        self.comboBoxTime.addItems(self.column_names)
+        self.comboBoxLong.addItems(self.column_names)
+        self.comboBoxLat.addItems(self.column_names)
+        self.preview()
 
     # *************************************************
     # ********** END GENREIC FUNCS FOR REUSE  *********
@@ -477,7 +634,8 @@ class MainWindow(QMainWindow):
         
         # pdf viewer area
         self.viewer = PdfViewerWidget()
-        self.vertlLayoutDataStats.addWidget(self.viewer, stretch=0)
+        self.viewer.displayed.connect(self.on_figure_displayed)
+        self.vertlLayoutDataStats.addLayout(self.with_thumbnails(self.viewer, self.btnPrevStats, self.btnNextStats), stretch=0)
         
         # Connect controls
         self.btnPrevStats.clicked.connect(lambda: self.on_prev(self.viewer, self.btnPrevStats, self.btnNextStats))
@@ -527,10 +685,23 @@ class MainWindow(QMainWindow):
         self.hLayoutCtrlMap.addWidget(self.btnZoomInMap)
         self.hLayoutCtrlMap.addWidget(self.btnZoomOutMap)
         self.hLayoutCtrlMap.addWidget(self.btnSaveVisual)
+        self.btnInteractiveMap = QPushButton("Interactive map")
+        self.btnInteractiveMap.setCheckable(True)
+        self.btnInteractiveMap.setToolTip("Pan and zoom the partitions and points instead of the saved figures")
+        self.hLayoutCtrlMap.addWidget(self.btnInteractiveMap)
         
-        # pdf viewer area
+        # pdf viewer area, or the interactive map in its place
         self.map_viewer = PdfViewerWidget()
-        self.vLayoutMap.addWidget(self.map_viewer, stretch=0)
+        self.map_viewer.displayed.connect(self.on_figure_displayed)
+        figures = QWidget()
+        figures.setLayout(self.with_thumbnails(self.map_viewer, self.btnPrevMap, self.btnNextMap))
+        self.map_canvas = MapCanvas()
+        self.map_stack = QStackedWidget()
+        self.map_stack.addWidget(figures)
+        self.map_stack.addWidget(self.map_canvas)
+        self.vLayoutMap.addWidget(self.map_stack, stretch=0)
+        self.map_layers_stale = True
+        self.btnInteractiveMap.toggled.connect(self.on_interactive_map)
         
         # Connect controls
         self.btnPrevMap.clicked.connect(lambda: self.on_prev(self.map_viewer, self.btnPrevMap, self.btnNextMap))
@@ -573,6 +744,7 @@ class MainWindow(QMainWindow):
         self.hLayoutCtrlGraph.addWidget(self.btnSaveVisual)
         # pdf viewer area
         self.tgd_viewer = PdfViewerWidget()
+        self.tgd_viewer.displayed.connect(self.on_figure_displayed)
         self.vLayoutGraph.addWidget(self.tgd_viewer, stretch=0)
         # Connect controls
         self.btnZoomInTGD.clicked.connect(self.tgd_viewer.zoom_in)
@@ -586,59 +758,128 @@ class MainWindow(QMainWindow):
 
     # CALL -- PREPROCESSING FUNCTION 
     def start_preprocessing(self):
+        self.export_config()
         self.set_enabled_components([self.btnNext, self.btnBack, self.tabMain], False)
         self.spinnerPreprocess.show()
         self.moviePreprocess.start()
+        from thread_func import process_task
         self.prepocessor = Worker(process_task, CONFIG)
-        self.prepocessor.finished.connect(self.on_preprocess_func_done)
-        self.prepocessor.start()
+        self.run_task(self.prepocessor, self.on_preprocess_func_done, self.end_preprocessing)
 
-    def on_preprocess_func_done(self, result):
+    def end_preprocessing(self):
         self.set_enabled_components([self.tabMain, self.btnBack, self.btnNext], True)
         self.moviePreprocess.stop()
         self.spinnerPreprocess.hide()
+
+    def on_preprocess_func_done(self, result):
+        self.end_preprocessing()
+        self.statusbar.clearMessage()
         self.geo_df = result["data"]
+        if result.get("cached"):
+            self.statusbar.showMessage("Preprocessing result reused from cache", 5000)
         self.tabDataMain.setCurrentIndex(2)
         self.data_tab_index = self.tabDataMain.currentIndex()
         self.tabDataMain.setTabEnabled(self.data_tab_index, True)
 
     # CALL -- MAPPING FUNCTION 
-    def start_mapping_task(self):
+    def open_sweep(self):
+        dialog = SweepDialog(CONFIG, self.geo_df, self)
+        if not dialog.exec() or dialog.chosen is None:
+            return
+        params, mapping_result = dialog.chosen
+        # the line edits update CONFIG through validate_data_s4
+        if CONFIG["mapping"] == 'grid':
+            self.lineGridSizeVal.setText(str(params["cell_size"]))
+        else:
+            self.lineVoronoiCellSmallVal.setText(str(params["vor_small_cell_size"]))
+            self.lineVoronoiCellLargeVal.setText(str(params["vor_big_cell_size"]))
+        self.start_mapping_task(precomputed=mapping_result)
+
+    def start_mapping_task(self, precomputed=None):
+        self.export_config()
         self.set_enabled_components([self.btnNext, self.btnBack, self.tabMain], False)
         self.spinner.show()
         self.movie.start()
         self.tabMain.setEnabled(False)
-        self.map_worker = Worker(map_task, CONFIG, self.mapper, self.geo_df)
-        self.map_worker.finished.connect(self.on_mapping_func_done)
-        self.map_worker.start()
+        from thread_func import map_task, create_mapper, map_cache_key
+        self.mapper = create_mapper(CONFIG)
+        subprocess = "mapping" in CONFIG["subprocess_stages"]
+        if subprocess and precomputed is None:
+            # a repeat is served from this process's memory or the disk cache: not worth spawning a process
+            key = map_cache_key(CONFIG, self.geo_df)
+            subprocess = stage_cache.recall(CONFIG, "mapping", key) is None \
+                and stage_cache.lookup(CONFIG, "mapping", key) is None
+        self.map_worker = Worker(map_task, CONFIG, self.mapper, self.geo_df, precomputed=precomputed,
+                                 subprocess=subprocess)
+        self.run_task(self.map_worker, self.on_mapping_func_done, self.end_mapping)
 
-    def on_mapping_func_done(self, result):
+    def end_mapping(self):
         self.movie.stop()
         self.spinner.hide()
         self.set_enabled_components([self.tabMain, self.btnBack, self.btnNext], True)
+
+    def on_mapping_func_done(self, result):
+        self.end_mapping()
+        self.statusbar.clearMessage()
         self.map_geo_df, self.point_to_x = result["data"]["res"]
+        # a task process remembered it in its own memory only
+        stage_cache.remember("mapping", self.map_geo_df.attrs["stm_fingerprint"], result["data"]["res"])
+        if result.get("cached"):
+            self.statusbar.showMessage("Mapping result reused from cache", 5000)
         self.gdf_valid = result["data"]["geo_valid"]
         self.p2x_valid = result["data"]["p2x_valid"]
+        self.map_layers_stale = True
+        if getattr(self, "_s5_ui_built", False) and self.btnInteractiveMap.isChecked():
+            self.build_map_layers()
         self.tabDataMain.setCurrentIndex(4)
         self.data_tab_index = self.tabDataMain.currentIndex()
         self.tabDataMain.setTabEnabled(self.data_tab_index, True)
 
+    def on_interactive_map(self, checked):
+        for btn in (self.btnPrevMap, self.btnNextMap, self.btnZoomInMap, self.btnZoomOutMap, self.btnSaveVisual):
+            btn.setVisible(not checked)
+        self.map_stack.setCurrentIndex(1 if checked else 0)
+        if checked and self.map_layers_stale:
+            self.build_map_layers()
+
+    def build_map_layers(self):
+        # projecting, indexing and pre-rendering run in a worker; the canvas only gets the result
+        self.map_layers_stale = False
+        self.btnInteractiveMap.setEnabled(False)
+        self.statusbar.showMessage("Preparing interactive map...")
+        self.map_layer_worker = Worker(prepare_map_layers, self.map_geo_df, self.gdf_valid, self.p2x_valid,
+                                       CONFIG["meter_crs"])
+        self.map_layer_worker.finished.connect(self.on_map_layers_done)
+        self.map_layer_worker.start()
+
+    def on_map_layers_done(self, result):
+        self.btnInteractiveMap.setEnabled(True)
+        self.statusbar.clearMessage()
+        self.map_canvas.set_layers(result["layers"])
+
     # CALL -- GRAPH DATA GENERATE FUNC
     def start_data_gen(self):
+        self.export_config()
         self.set_enabled_components([self.btnNext, self.btnBack, self.tabMain], False)
         self.spinnerMap.show()
         self.movieMap.start()
         self.tabMain.setEnabled(False)
+        from thread_func import generate_data_task
         self.generator = Worker(generate_data_task, CONFIG, self.map_geo_df, self.gdf_valid, self.p2x_valid)
-        self.generator.finished.connect(self.on_datagen_func_done)
-        self.generator.start()
+        self.run_task(self.generator, self.on_datagen_func_done, self.end_data_gen)
 
-    def on_datagen_func_done(self, result):
+    def end_data_gen(self):
         self.movieMap.stop()
         self.spinnerMap.hide()
         self.set_enabled_components([self.tabMain, self.btnBack, self.btnNext], True)
+
+    def on_datagen_func_done(self, result):
+        self.end_data_gen()
         self.graph_data = result["graph_data"]
         self.temporal_graph_dataset = result["temporal_graph_data"]
+        self.lineGraphData.setText(result["dataset_path"])
+        if result.get("cached"):
+            self.statusbar.showMessage(f"Reused generated dataset {result['dataset_path']}", 5000)
         if CONFIG["osm_types"] is not None:
             self.osm_checked_list = ", ".join(CONFIG["osm_types"])
             self.osm_extracted_features = result["osm_features"]
@@ -666,25 +907,24 @@ class MainWindow(QMainWindow):
 
     # CALL -- DATA PLOT FUNC
     def start_plotting(self):
-        self.spinnerTGD.show()
-        self.movieTGD.start()
-        self.set_enabled_components([self.btnDataPlot, self.btnBack, self.btnNext, self.tabMain], False)
-        self.plot_worker = Worker(plot_task, CONFIG, 
-                                  self.temporal_graph_dataset, self.graph_data, 
-                                  self.osm_extracted_features, self.map_geo_df)
-        self.plot_worker.finished.connect(self.on_plotting_func_done)
-        self.plot_worker.start()
-
-    def on_plotting_func_done(self):
-        self.movieTGD.stop()
-        self.spinnerTGD.hide()
-        self.set_enabled_components([self.btnDataPlot, self.btnBack, self.btnNext, self.tabMain], True)
-        if CONFIG["plot_type"] == 'node':
-            self.tgd_viewer._load_file(f'{CONFIG["output_dir"]}/graph/time_series_{CONFIG["plot_nodes"]["View"][0]}.pdf')
-        elif CONFIG["plot_type"] == 'heatmap':
-            self.tgd_viewer._load_file(f'{CONFIG["output_dir"]}/graph/temporal_heatmap.pdf')
+        from thread_func import plot_task
+        job = self.submit_job(f"Plot {CONFIG['plot_type']}", plot_task,
+                              self.temporal_graph_dataset, self.graph_data,
+                              self.osm_extracted_features, self.map_geo_df, on_done=self.on_plotting_func_done)
+        if job is not None:
+            self.plot_jobs.append(job)
+            self.spinnerTGD.show()
+            self.movieTGD.start()
+
+    def on_plotting_func_done(self, job, result):
+        # the figure of this job's settings, whatever the plot controls show now
+        conf = job.conf
+        if conf["plot_type"] == 'node':
+            self.tgd_viewer._load_file(f'{conf["output_dir"]}/graph/time_series_{conf["plot_nodes"]["View"][0]}.pdf')
+        elif conf["plot_type"] == 'heatmap':
+            self.tgd_viewer._load_file(f'{conf["output_dir"]}/graph/temporal_heatmap.pdf')
         else: # spatial:
-            self.tgd_viewer._load_file(f'{CONFIG["output_dir"]}/graph/spatial_network.pdf')
+            self.tgd_viewer._load_file(f'{conf["output_dir"]}/graph/spatial_network.pdf')
 
     def validate_data_s1(self):
         is_valid_icrs = False
@@ -707,8 +947,65 @@ class MainWindow(QMainWindow):
             CONFIG["time_column"] = self.comboBoxTime.currentText()
             CONFIG["long_column"] = self.comboBoxLong.currentText()
             CONFIG["lat_column"] = self.comboBoxLat.currentText()
+            self.start_profile()
         self.btnNext.setEnabled(is_valid_icrs and is_valid_mcrs and CONFIG['data_path'] != "")
 
+    def start_profile(self):
+        # profile the whole file once the three columns are picked (distinct, and from this file's preview)
+        cols = (CONFIG["time_column"], CONFIG["lat_column"], CONFIG["long_column"])
+        key = (CONFIG['data_path'], *cols)
+        if key == self.profile_key or self.preview_path != CONFIG['data_path'] or len(set(cols)) < 3 \
+                or not set(cols) <= set(self.column_names):
+            return
+        self.profile_key = key
+        self.profile = None
+        self.profile_generation += 1
+        generation = self.profile_generation
+        self.labelProfile.setText("Profiling...")
+        if getattr(self, "profile_worker", None) is not None:
+            self.profile_worker.cancel() # stale columns or file: stop reading it
+        self.profile_worker = Worker(profile_task, *key)
+        self.profile_worker.progress.connect(lambda info: self.on_profile_progress(generation, info))
+        self.profile_worker.finished.connect(lambda result: self.on_profile_done(generation, result))
+        self.profile_worker.start()
+
+    def on_profile_progress(self, generation, info):
+        if generation == self.profile_generation:
+            percent = 100 * info["done"] / info["total"] if info["total"] else 100
+            self.labelProfile.setText(f"Profiling... {percent:.0f}%\n{info['summary']}")
+
+    def on_profile_done(self, generation, result):
+        if generation != self.profile_generation:
+            return
+        if result["status"] != "ok":
+            self.labelProfile.setText(result["message"])
+            return
+        self.profile = result["profile"]
+        self.labelProfile.setText(f"Full file profile\n{self.profile.summary()}")
+        self.prefill_from_profile(self.profile)
+
+    def prefill_from_profile(self, profile):
+        # test-mode bounds and date filters start at the data's extent; values typed by the user are kept
+        values = {}
+        box = profile.bounds()
+        if box:
+            values.update({self.lineMinLat: f"{box['min_lat']:.6f}", self.lineMaxLat: f"{box['max_lat']:.6f}",
+                           self.lineMinLong: f"{box['min_lon']:.6f}", self.lineMaxLong: f"{box['max_lon']:.6f}"})
+        for le, text in values.items():
+            if le.text() in ("", self.profile_prefill.get(le)):
+                le.blockSignals(True)
+                le.setText(text)
+                le.blockSignals(False)
+                self.profile_prefill[le] = text
+        if profile.time_min is not None:
+            for edit, combo, ts in ((self.dateEditStart, self.comboBoxFilterDS, profile.time_min),
+                                    (self.dateEditEnd, self.comboBoxFilterDE, profile.time_max)):
+                if combo.currentText() == "Yes": # filter already set up by the user
+                    continue
+                edit.blockSignals(True)
+                edit.setDate(QDate(ts.year, ts.month, ts.day))
+                edit.blockSignals(False)
+
     def validate_data_s2(self):
         # check appplication type
         if self.comboBoxOutType.currentText().__contains__("Regression"):
@@ -821,7 +1118,6 @@ class MainWindow(QMainWindow):
                 if CONFIG['cell_size'] <= 0:
                     is_valid = False
                     self.lineGridSizeVal.setStyleSheet("background: rgba(255, 0, 0, 0.3);")
-            self.mapper = stm_graph.GridMapping(cell_size=CONFIG['cell_size'], target_crs=CONFIG['meter_crs'])
         if CONFIG["mapping"] == 'administrative':
             if self.lineShapeFilePath.text():
                 CONFIG["adm_shape_file"] = self.lineShapeFilePath.text()
@@ -829,12 +1125,6 @@ class MainWindow(QMainWindow):
             else:
                 is_valid = False
                 self.lineShapeFilePath.setStyleSheet("background: rgba(255, 0, 0, 0.3);")
-            self.mapper = stm_graph.AdministrativeMapping(
-                admin_type="administrative",
-                districts_file=CONFIG['adm_shape_file'],
-                input_crs=CONFIG['input_crs'],
-                meter_crs=CONFIG['meter_crs']
-            )
         if CONFIG["mapping"] == 'voronoi-based':
             line_dict = {
                 'voronoiSmallSize': self.lineVoronoiCellSmallVal,
@@ -854,11 +1144,9 @@ class MainWindow(QMainWindow):
                     is_valid = False
                     self.lineVoronoiCellLargeVal.setStyleSheet("background: rgba(255, 0, 0, 0.3);")
                     self.lineVoronoiCellSmallVal.setStyleSheet("background: rgba(255, 0, 0, 0.3);")
-            self.mapper = stm_graph.VoronoiDegreeMapping(
-                place_name=None, testing_mode=False, buffer_distance=0.05,
-                large_cell_size=CONFIG['vor_big_cell_size'], 
-                small_cell_size=CONFIG['vor_small_cell_size']
-            )
+                if is_valid:
+                    CONFIG['vor_small_cell_size'] = self.voronoiSmallSize
+                    CONFIG['vor_big_cell_size'] = self.voronoiLargeSize
         self.btnNext.setEnabled(is_valid)
     
     def validate_data_s6(self):
@@ -914,9 +1202,9 @@ class MainWindow(QMainWindow):
                         self.gLayoutPlotConfig, 150)
   
     def update_mapping_config(self, mapping):
-        grid_comps = [self.lineGridSizeVal]
+        grid_comps = [self.lineGridSizeVal, self.btnSweep]
         adm_comps = [self.btnBrowseShapeFile, self.lineShapeFilePath]
-        voronoi_comps = [self.lineVoronoiCellSmallVal, self.lineVoronoiCellLargeVal, self.labelParams2]
+        voronoi_comps = [self.lineVoronoiCellSmallVal, self.lineVoronoiCellLargeVal, self.labelParams2, self.btnSweep]
         if mapping == 'grid':
             self.labelParams1.setText("Cell Size (m)")
             self.hide_components(adm_comps + voronoi_comps)
@@ -932,17 +1220,12 @@ class MainWindow(QMainWindow):
 
     def preview(self):
         if self.loaded_data is not None:
-            num_rows_limited = 15  # limit to 15 rows
-            num_cols = len(self.column_names)
-            self.tableInputView.setColumnCount(num_cols)
-            self.tableInputView.setRowCount(num_rows_limited)
-            self.tableInputView.setHorizontalHeaderLabels(self.column_names)
-            for i in range(num_rows_limited):
-                for j in range(num_cols):
-                    self.tableInputView.setItem(
-                        i, j, QTableWidgetItem(str(self.loaded_data.iloc[i, j]))
-                    )
-            self.tableInputView.resizeColumnsToContents()    
+            # the model formats only the cells in view; size the leading columns from a few rows
+            self.preview_model.set_data(self.loaded_data)
+            header = self.tableInputView.horizontalHeader()
+            header.setResizeContentsPrecision(15)
+            for col in range(min(len(self.column_names), 30)):
+                self.tableInputView.resizeColumnToContents(col)
     # *****************************************************
     # *********** END DATA TAB UI AND FUNCTIONS  **********
     
@@ -1115,23 +1398,33 @@ class MainWindow(QMainWindow):
             CONFIG["training"]["log_dir"] = self.txtLogDir.text() 
             self.btnNext.setEnabled(bool(CONFIG["training"]["log_dir"].strip()))
     
+    # CALL -- COMPARE MODELS FUNC
+    def start_compare(self):
+        if not CONFIG["training"]["graph_data_path"]:
+            QMessageBox.warning(self, "Compare models", "Select the graph data to train on first.")
+            return
+        models = [k for k, v in CONFIG["training"].items() if isinstance(v, dict)]
+        dialog = CompareDialog(models, selected=models, parent=self)
+        if not dialog.exec():
+            return
+        from compare_models import compare_task
+        stat_feat_count = self.osm_extracted_features.shape[1] if self.osm_extracted_features is not None else 0
+        self.submit_job(f"Compare {', '.join(dialog.models)}", compare_task, dialog.models, stat_feat_count,
+                        on_done=self.on_compare_done)
+
+    def on_compare_done(self, job, result):
+        from compare_models import comparison_frame
+        ComparisonResults(comparison_frame(result["results"]), self).show()
+
     # CALL -- CREATE MODEL FUNC
     def start_create_model(self):
         self.set_enabled_components([self.btnNext, self.tabMain], False)
+        from thread_func import prepare_training_data, create_model_task
         stat_feat_count = self.osm_extracted_features.shape[1] if self.osm_extracted_features is not None else 0
-        self.loaded_temporal_dataset = torch.load(CONFIG["training"]["graph_data_path"]) #4d
-        if CONFIG["training"]["model"] in ["gcn", "tgcn"]:
-            self.loaded_temporal_dataset = stm_graph.convert_4d_to_3d_dataset(self.loaded_temporal_dataset, static_features_count=stat_feat_count) #3d
-        CONFIG["training"][CONFIG["training"]["model"]]["in_channels"][0] = self.loaded_temporal_dataset.features[0].shape[-1]
-        if "num_nodes" in CONFIG["training"][CONFIG["training"]["model"]]:
-            CONFIG["training"][CONFIG["training"]["model"]]["num_nodes"][0] = self.loaded_temporal_dataset.features[0].shape[0]
-        kernel_list = [x for x in ('k', 'K', 'kernel_size', 'history_window') if x in CONFIG["training"][CONFIG["training"]["model"]]]
-        if len(kernel_list):
-            for k in kernel_list:
-                CONFIG["training"][CONFIG["training"]["model"]][k][0] = CONFIG["window_size"]
+        self.loaded_temporal_dataset = prepare_training_data(CONFIG, static_features_count=stat_feat_count)
         self.model_factory = Worker(create_model_task, CONFIG)
-        self.model_factory.finished.connect(self.on_create_model_func_done)
-        self.model_factory.start()
+        self.run_task(self.model_factory, self.on_create_model_func_done,
+                      lambda: self.set_enabled_components([self.tabMain, self.btnNext], True))
         
     def on_create_model_func_done(self, result):
         self.set_enabled_components([self.tabMain, self.btnNext], True)
@@ -1145,38 +1438,65 @@ class MainWindow(QMainWindow):
         
     # CALL -- TRAINING FUNC
     def start_training(self):
-        self.set_enabled_components([self.tabMain, self.btnBack, self.btnNext], False)
+        self.export_config()
+        from thread_func import training_task
+        # runs as a background job on its own copy of the model, dataset and config
+        job = self.submit_job(f"Train {CONFIG['training']['model']}", training_task, self.model,
+                              self.loaded_temporal_dataset, on_done=self.on_training_func_done)
+        if job is None:
+            return
+        # the log view follows the latest training job
+        self.stop_log_view()
+        self.training_job = job
+        self.training_log_dir = CONFIG["training"]["log_dir"] if self.log_type in ["local", "both"] else None
         self.plainLogPrint.setEnabled(True)
-        self.trainer = Worker(training_task, CONFIG, self.model, self.loaded_temporal_dataset)
-        self.trainer.finished.connect(self.on_training_func_done)
-        self.trainer.start()
-        if self.log_type in ["local", "both"]:
-            time.sleep(1)
-            self.log_watcher = LFW(folder=CONFIG["training"]["log_dir"])
+        # ring buffer: the view drops its oldest lines, memory stays flat on long runs
+        self.plainLogPrint.setMaximumBlockCount(CONFIG["training"].get("log_max_lines", 20000))
+        if job.status == "running":
+            self.start_log_view()
+        else: # the log view starts with the job (see job_queue.started)
+            self.statusbar.showMessage(f"Training queued as job #{job.id}", 5000)
+
+    def start_log_view(self):
+        if self.training_log_dir is not None:
+            # watch from the job's start, so the new log file cannot be missed
+            self.log_watcher = LFW(folder=self.training_log_dir)
             self.log_watcher.logfile_found.connect(self.start_log_printer)
             self.log_watcher.start()
     
     def start_log_printer(self, logfile):
-        self.printer = LP(logfile)
-        self.printer.newLine.connect(self.log_append)
+        conf = CONFIG["training"]
+        self.printer = LP(logfile, flush_ms=conf.get("log_flush_ms", 50), max_lines=conf.get("log_batch_lines", 500),
+                          tail_kb=conf.get("log_tail_kb"))
+        self.printer.newLines.connect(self.log_append)
         self.printer.start()
         self.log_watcher.stop()
 
-    def log_append(self, line):
-        self.plainLogPrint.appendPlainText(line)
+    def log_append(self, lines):
+        self.plainLogPrint.appendPlainText(lines)
 
-    def on_training_func_done(self):
-        self.set_enabled_components([self.tabMain, self.btnBack, self.btnNext], True)
+    def stop_log_view(self):
+        if self.log_watcher and self.log_watcher.isRunning():
+            self.log_watcher.stop()
+        if self.printer and self.printer.isRunning():
+            self.printer.stop()
+
+    def on_training_func_done(self, job, result):
+        if job is self.training_job:
+            self.model = result["model"] # trained weights (the job trained a copy in its own process)
         QMessageBox.information(
-            self, "Information", "Training process done and stopped."
+            self, "Information", f"Training job #{job.id} ({job.name}) done and stopped."
         )
-        if self.log_type in ["local", "both"] and self.printer and self.printer.isRunning():
-            self.printer.stop()
     
     # ***************************************************************
     # ********** END MODEL/TRAINING TAB UI AND FUNCTIONS  **********
 
-app = QApplication(sys.argv)
-window = MainWindow()
-window.show()
-sys.exit(app.exec())
\ No newline at end of file
+if __name__ == "__main__":
+    # worker processes (spawn) of a frozen executable must not start the GUI
+    import multiprocessing
+    multiprocessing.freeze_support()
+    app = QApplication(sys.argv)
+    window = MainWindow()
+    window.first_painted.connect(window.warm_up)
+    window.show()
+    sys.exit(app.exec())
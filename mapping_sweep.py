@@ -0,0 +1,109 @@
+"""
+Mapping parameter sweep: create_mapping for several cell sizes (grid) or small/large size pairs
+(voronoi) in parallel worker processes, with the statistics that tell the results apart. The events
+go to each worker process once (pool initializer), not once per value, and only their geometry.
+"""
+import os
+import time
+import numpy as np
+import projection
+from task_control import check_cancel, shutdown_pool
+
+# config keys a sweep value sets, per mapping method (administrative mapping has no parameter)
+SWEEP_PARAMS = {
+    "grid": ("cell_size",),
+    "voronoi-based": ("vor_small_cell_size", "vor_big_cell_size"),
+}
+
+_points = None # events of a sweep worker process, set by the pool initializer
+
+
+def parse_values(mapping, text):
+    """'500, 1000' (grid) or '1000:2000, 2000:4000' (voronoi small:large) -> list of config updates."""
+    if mapping not in SWEEP_PARAMS:
+        raise ValueError(f"{mapping} mapping has no parameter to sweep")
+    names = SWEEP_PARAMS[mapping]
+    values = []
+    for item in text.replace(";", ",").split(","):
+        if not item.strip():
+            continue
+        try:
+            parts = [int(p) for p in item.split(":")]
+        except ValueError:
+            raise ValueError(f"Not a whole number: {item.strip()}") from None
+        if len(parts) != len(names) or min(parts) <= 0:
+            raise ValueError(f"Expected {':'.join(names)} (positive, in meters), got {item.strip()}")
+        if mapping == "voronoi-based" and parts[1] <= parts[0]:
+            raise ValueError(f"Large cell size must be bigger than the small one: {item.strip()}")
+        values.append(dict(zip(names, parts)))
+    if not values:
+        raise ValueError("No values to sweep")
+    return list({tuple(v.values()): v for v in values}.values())
+
+
+def format_params(params):
+    return ":".join(str(v) for v in params.values())
+
+
+def sweep_points(conf, geodf):
+    # geometry only, in the CRS map_task hands the mapper
+    import geopandas as gpd
+    points = projection.to_projected(geodf, conf["meter_crs"]) if conf["mapping"] != "voronoi-based" else geodf
+    return gpd.GeoDataFrame(geometry=points.geometry, crs=points.crs)
+
+
+def mapping_stats(partition_gdf, p2x, seconds):
+    p2x = np.asarray(p2x)
+    valid = p2x[p2x >= 0]
+    regions = len(partition_gdf)
+    return {
+        "regions": regions,
+        "valid_ratio": len(valid) / len(p2x) if len(p2x) else 0.0,
+        "empty_ratio": 1 - len(np.unique(valid)) / regions if regions else 0.0,
+        "seconds": seconds,
+    }
+
+
+def _init_worker(points):
+    global _points
+    _points = points
+
+
+def map_one(conf, params):
+    # runs in a sweep worker process
+    from thread_func import create_mapper
+    conf = {**conf, **params}
+    started = time.time()
+    partition_gdf, p2x = create_mapper(conf).create_mapping(_points)
+    return params, (partition_gdf, p2x), mapping_stats(partition_gdf, p2x, time.time() - started)
+
+
+def sweep_task(conf, geodf, values, progress_callback=None, cancel_token=None):
+    """
+    Map geodf once per value of parse_values, in up to conf['sweep_workers'] processes (default one per
+    core). On cancel, values not started yet are dropped and the running ones are stopped.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    workers = max(1, min(len(values), conf.get("sweep_workers") or os.cpu_count() or 1))
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(sweep_points(conf, geodf),))
+    results = []
+    finished = False
+    try:
+        pending = {pool.submit(map_one, conf, params) for params in values}
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            check_cancel(cancel_token)
+            for fut in done:
+                params, result, stats = fut.result()
+                results.append({"params": params, "result": result, "stats": stats})
+                if progress_callback:
+                    progress_callback({"stage": "sweep", "done": len(results), "total": len(values),
+                                       "message": f"Mapped {format_params(params)}: {stats['regions']} regions "
+                                                  f"({len(results)}/{len(values)})"})
+        finished = True
+    finally:
+        shutdown_pool(pool, finished)
+    results.sort(key=lambda r: tuple(r["params"].values()))
+    return {"status": "ok", "mapping": conf["mapping"], "results": results}
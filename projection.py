@@ -0,0 +1,65 @@
+"""
+Projection of event coordinates, done once: pyproj Transformers are created once per CRS pair and
+applied to whole coordinate arrays in batches. Preprocessing stores the projected x/y as columns of
+the events frame (so they go to the stage cache with it), and later stages read those columns
+instead of reprojecting every point again.
+"""
+from functools import lru_cache
+import numpy as np
+
+BATCH = 1_000_000 # points per transform call (bounds the temporary arrays)
+
+
+@lru_cache(maxsize=16)
+def transformer(src, dst):
+    from pyproj import Transformer
+    return Transformer.from_crs(src, dst, always_xy=True)
+
+
+def crs_name(crs):
+    return crs if isinstance(crs, str) else crs.to_string()
+
+
+def transform(x, y, src, dst, batch=BATCH):
+    """x, y arrays from src to dst CRS (float64)."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if crs_name(src) == crs_name(dst):
+        return x, y
+    tr = transformer(crs_name(src), crs_name(dst))
+    out_x, out_y = np.empty_like(x), np.empty_like(y)
+    for s in range(0, len(x), batch):
+        out_x[s:s + batch], out_y[s:s + batch] = tr.transform(x[s:s + batch], y[s:s + batch])
+    return out_x, out_y
+
+
+def xy_columns(crs):
+    """Names of the stored projected columns, e.g. ('x_epsg_3857', 'y_epsg_3857')."""
+    tag = crs_name(crs).lower().replace(":", "_")
+    return f"x_{tag}", f"y_{tag}"
+
+
+def add_projected(gdf, crs):
+    """Add the x/y columns of gdf's points in crs (in place), return gdf."""
+    x_col, y_col = xy_columns(crs)
+    gdf[x_col], gdf[y_col] = transform(gdf.geometry.x.values, gdf.geometry.y.values, gdf.crs, crs)
+    return gdf
+
+
+def projected_xy(gdf, crs):
+    """x, y of gdf's points in crs: the stored columns when there are any, projected otherwise."""
+    x_col, y_col = xy_columns(crs)
+    if x_col in gdf.columns and y_col in gdf.columns:
+        return gdf[x_col].to_numpy(dtype=np.float64), gdf[y_col].to_numpy(dtype=np.float64)
+    if gdf.crs is None:
+        return gdf.geometry.x.values, gdf.geometry.y.values
+    return transform(gdf.geometry.x.values, gdf.geometry.y.values, gdf.crs, crs)
+
+
+def to_projected(gdf, crs):
+    """gdf with its point geometry in crs (same index and columns), built from projected_xy."""
+    import geopandas as gpd
+    if gdf.crs is not None and gdf.crs == crs:
+        return gdf
+    x, y = projected_xy(gdf, crs)
+    return gdf.set_geometry(gpd.GeoSeries(gpd.points_from_xy(x, y), index=gdf.index, crs=crs))
@@ -0,0 +1,192 @@
+"""
+Headless runner for the STM-Graph pipeline.
+
+Runs the same worker functions as the GUI (see thread_func.py) from a saved
+JSON/YAML config, without a QApplication. The GUI writes such a config to
+`<output_dir>/stm_config.json` whenever a stage is started.
+
+    python run_pipeline.py stm_config.json [more_configs.yaml ...]
+    python run_pipeline.py stm_config.json --from create_model --report report.json
+    python run_pipeline.py stm_config.json --from create_model --sweep sweep.json
+
+With --sweep, the train stage runs a hyperparameter sweep (see hparam_sweep.py) instead of one
+training, and writes the ranked trials to <output_dir>/sweep/ranking.csv. With --compare gcn,stgcn,...
+it trains those models in parallel on one shared copy of the dataset (see compare_models.py) and
+writes <output_dir>/compare/comparison.csv.
+
+Exit codes: 0 all stages ok, 2 bad arguments/config,
+10 + stage index when a stage fails (process=10, map=11, generate=12, create_model=13, train=14).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+
+from config import CONFIG, load_config
+
+STAGES = ["process", "map", "generate", "create_model", "train"]
+# stages a run may start from: everything else needs in-memory results of the previous stage
+ENTRY_STAGES = ["process", "create_model"]
+EXIT_OK = 0
+EXIT_CONFIG_ERROR = 2
+EXIT_STAGE_BASE = 10
+
+
+def run_stage(name, state, conf, sweep=None, compare=None):
+    from thread_func import (process_task, map_task, generate_data_task, create_mapper,
+                             prepare_training_data, create_model_task, training_task)
+    if name == "process":
+        state["geo_df"] = process_task(conf)["data"]
+    elif name == "map":
+        res = map_task(conf, create_mapper(conf), state["geo_df"])
+        state["map_geo_df"] = res["data"]["res"][0]
+        state["gdf_valid"] = res["data"]["geo_valid"]
+        state["p2x_valid"] = res["data"]["p2x_valid"]
+    elif name == "generate":
+        res = generate_data_task(conf, state["map_geo_df"], state["gdf_valid"], state["p2x_valid"])
+        state["temporal_dataset"] = res["temporal_graph_data"]
+        state["osm_features"] = res["osm_features"]
+        state["dataset_path"] = res["dataset_path"]
+        print(f"Nodes: {res['num_nodes']}, edges: {res['num_edges']}")
+    elif name == "create_model":
+        osm_features = state.get("osm_features")
+        stat_feat_count = osm_features.shape[1] if osm_features is not None else 0
+        state["temporal_dataset"] = prepare_training_data(conf, state.get("temporal_dataset"), stat_feat_count)
+        state["model"] = create_model_task(conf)["model"]
+    elif name == "train" and compare is not None:
+        run_compare(state, conf, compare)
+    elif name == "train" and sweep is not None:
+        run_sweep(state, conf, sweep)
+    elif name == "train":
+        results = training_task(conf, state["model"], state["temporal_dataset"])["training_results"]
+        if not results.get("completed", True):
+            raise RuntimeError(results.get("error", "training did not complete"))
+        state["training_results"] = results
+
+
+def run_sweep(state, conf, spec):
+    from hparam_sweep import hparam_sweep_task, ranking_frame
+    if not conf["training"]["graph_data_path"]:
+        conf["training"]["graph_data_path"] = state["dataset_path"] # trial processes load it from disk
+    osm_features = state.get("osm_features")
+    stat_feat_count = osm_features.shape[1] if osm_features is not None else 0
+    res = hparam_sweep_task(conf, spec, stat_feat_count, progress_callback=lambda info: print(info["message"], flush=True))
+    ranking = ranking_frame(res["trials"])
+    out_dir = os.path.join(conf["output_dir"] or "out", "sweep")
+    os.makedirs(out_dir, exist_ok=True)
+    ranking.to_csv(os.path.join(out_dir, "ranking.csv"), index=False)
+    print(ranking.head(20).to_string(index=False))
+    state["sweep"] = res
+
+
+def run_compare(state, conf, models):
+    from compare_models import compare_task, comparison_frame
+    if not conf["training"]["graph_data_path"]:
+        conf["training"]["graph_data_path"] = state["dataset_path"]
+    osm_features = state.get("osm_features")
+    stat_feat_count = osm_features.shape[1] if osm_features is not None else 0
+    res = compare_task(conf, models, stat_feat_count, progress_callback=lambda info: print(info["message"], flush=True))
+    comparison = comparison_frame(res["results"])
+    out_dir = os.path.join(conf["output_dir"] or "out", "compare")
+    os.makedirs(out_dir, exist_ok=True)
+    comparison.to_csv(os.path.join(out_dir, "comparison.csv"), index=False)
+    print(comparison.to_string(index=False))
+    state["compare"] = res
+
+
+def run_config(path, first, last, sweep=None, compare=None):
+    """Run the selected stages for one config file, return (exit_code, stage reports)."""
+    report = []
+    try:
+        conf = load_config(path)
+    except Exception as e:
+        print(f"[{path}] Cannot load config: {e}", file=sys.stderr)
+        return EXIT_CONFIG_ERROR, report
+    if conf["output_dir"]:
+        os.makedirs(conf["output_dir"], exist_ok=True)
+    if first == "create_model" and not conf["training"]["graph_data_path"]:
+        print(f"[{path}] training.graph_data_path is required when starting from create_model", file=sys.stderr)
+        return EXIT_CONFIG_ERROR, report
+
+    state = {}
+    for name in STAGES[STAGES.index(first):STAGES.index(last) + 1]:
+        print(f"[{path}] ===== {name} =====", flush=True)
+        start = time.perf_counter()
+        try:
+            run_stage(name, state, conf, sweep, compare)
+        except Exception:
+            traceback.print_exc()
+            code = EXIT_STAGE_BASE + STAGES.index(name)
+            report.append({"stage": name, "status": "failed", "seconds": time.perf_counter() - start, "exit_code": code})
+            return code, report
+        report.append({"stage": name, "status": "ok", "seconds": time.perf_counter() - start, "exit_code": EXIT_OK})
+    return EXIT_OK, report
+
+
+def print_report(path, code, report):
+    print(f"\n[{path}] exit code {code}")
+    for r in report:
+        print(f"  {r['stage']:<13} {r['status']:<7} {r['seconds']:10.2f}s  (exit {r['exit_code']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the STM-Graph pipeline without the GUI.")
+    parser.add_argument("configs", nargs="*", help="JSON/YAML config file(s), run one after another")
+    parser.add_argument("--from", dest="first", choices=ENTRY_STAGES, default="process",
+                        help="first stage to run (create_model loads training.graph_data_path)")
+    parser.add_argument("--to", dest="last", choices=STAGES, default="train", help="last stage to run")
+    parser.add_argument("--sweep", metavar="SPEC", help="hyperparameter sweep spec (JSON/YAML) to run instead of one training")
+    parser.add_argument("--compare", metavar="MODELS", help="comma separated models to train side by side instead of one")
+    parser.add_argument("--report", help="write per-stage timings and exit codes to this JSON file")
+    parser.add_argument("--dump-config", metavar="PATH", help="write the default config to PATH and exit")
+    args = parser.parse_args(argv)
+
+    if args.dump_config:
+        from config import save_config
+        save_config(CONFIG, args.dump_config)
+        return EXIT_OK
+    if not args.configs:
+        parser.print_usage(sys.stderr)
+        return EXIT_CONFIG_ERROR
+    if STAGES.index(args.last) < STAGES.index(args.first):
+        print("--to must not come before --from", file=sys.stderr)
+        return EXIT_CONFIG_ERROR
+    sweep = compare = None
+    if args.sweep and args.compare:
+        print("--sweep and --compare cannot be combined", file=sys.stderr)
+        return EXIT_CONFIG_ERROR
+    if args.compare:
+        compare = [m.strip().lower() for m in args.compare.split(",") if m.strip()]
+        unknown = [m for m in compare if not isinstance(CONFIG["training"].get(m), dict)]
+        if unknown or not compare:
+            print(f"Unknown models for --compare: {', '.join(unknown) or args.compare}", file=sys.stderr)
+            return EXIT_CONFIG_ERROR
+    if args.sweep:
+        from hparam_sweep import load_spec
+        try:
+            sweep = load_spec(args.sweep)
+        except Exception as e:
+            print(f"Cannot load sweep spec {args.sweep}: {e}", file=sys.stderr)
+            return EXIT_CONFIG_ERROR
+
+    # no display on compute boxes
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+    exit_code = EXIT_OK
+    runs = []
+    for path in args.configs:
+        code, report = run_config(path, args.first, args.last, sweep, compare)
+        print_report(path, code, report)
+        runs.append({"config": path, "exit_code": code, "stages": report})
+        if exit_code == EXIT_OK:
+            exit_code = code
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"exit_code": exit_code, "runs": runs}, f, indent=4)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
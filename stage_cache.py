@@ -0,0 +1,177 @@
+"""
+Content-addressed disk cache for pipeline stage results.
+
+Entries live in `<cache_dir>/<stage>/<key>/` (cache_dir defaults to `<output_dir>/.stm_cache`)
+with a manifest.json; a key is a hash over everything that influences the stage result.
+Entries are written to a temporary folder first and renamed, so a crash never leaves half an entry.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+from collections import OrderedDict
+
+CACHE_VERSION = 1
+MANIFEST = "manifest.json"
+MEMORY_ENTRIES = 4 # results kept in memory for instant repeats (e.g. Back + Map again)
+_memory = OrderedDict()
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """Hash file content (blake2b, 128 bit)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def file_fingerprint(path, content_hash=False):
+    """Identify a file by path, size and mtime (or by its content if content_hash)."""
+    st = os.stat(path)
+    fp = {"size": st.st_size}
+    if content_hash:
+        fp["hash"] = hash_file(path)
+    else:
+        fp["path"] = os.path.abspath(path)
+        fp["mtime_ns"] = st.st_mtime_ns
+    return fp
+
+def files_fingerprint(path, content_hash=True):
+    """Fingerprint a file together with its sidecars (.shp comes with .shx, .dbf, .prj, ...)."""
+    base, ext = os.path.splitext(path)
+    paths = [path]
+    if ext.lower() == ".shp":
+        paths += [base + e for e in (".shx", ".dbf", ".prj", ".cpg") if os.path.exists(base + e)]
+    return [file_fingerprint(p, content_hash) for p in paths]
+
+def make_key(stage, *parts):
+    payload = json.dumps([CACHE_VERSION, stage, parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+def frame_fingerprint(df):
+    """Key of the stage result a frame was produced/restored from, hash of its content otherwise."""
+    key = df.attrs.get("stm_fingerprint")
+    if key is None:
+        import numpy as np
+        import pandas as pd
+        h = hashlib.blake2b(digest_size=16)
+        h.update(pd.util.hash_pandas_object(df.drop(columns=df.geometry.name), index=True).values.tobytes())
+        try:
+            h.update(np.ascontiguousarray(df.geometry.x.values).tobytes())
+            h.update(np.ascontiguousarray(df.geometry.y.values).tobytes())
+        except ValueError: # not only points
+            h.update(b"".join(df.geometry.to_wkb().values))
+        key = h.hexdigest()
+    return key
+
+def remember(stage, key, value):
+    _memory[(stage, key)] = value
+    _memory.move_to_end((stage, key))
+    while len(_memory) > MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+def recall(conf, stage, key):
+    if not conf.get("use_cache", True):
+        return None
+    value = _memory.get((stage, key))
+    if value is not None:
+        _memory.move_to_end((stage, key))
+    return value
+
+def cache_dir(conf, stage):
+    root = conf.get("cache_dir") or os.path.join(conf["output_dir"], ".stm_cache")
+    return os.path.join(root, stage)
+
+def lookup(conf, stage, key):
+    """Return (entry_dir, manifest) of a complete cache entry, None if missing or caching is off."""
+    if not conf.get("use_cache", True):
+        return None
+    entry = os.path.join(cache_dir(conf, stage), key)
+    try:
+        with open(os.path.join(entry, MANIFEST), "r") as f:
+            return entry, json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def store(conf, stage, key, writer, meta=None):
+    """Create an entry: writer(tmp_dir) writes the files and returns extra manifest fields."""
+    if not conf.get("use_cache", True):
+        return None
+    stage_dir = cache_dir(conf, stage)
+    entry = os.path.join(stage_dir, key)
+    tmp = os.path.join(stage_dir, f".{key}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        manifest = {"version": CACHE_VERSION, "stage": stage, "key": key, "created": time.time(), "meta": meta or {}}
+        manifest.update(writer(tmp) or {})
+        with open(os.path.join(tmp, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=4, default=str)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+    except Exception as e:
+        # caching must never break the pipeline
+        shutil.rmtree(tmp, ignore_errors=True)
+        print(f"Could not write {stage} cache entry: {e}")
+        return None
+    return entry
+
+def save_frame(df, folder, name):
+    """Save a (Geo)DataFrame as (Geo)Parquet, falling back to pickle for types Arrow cannot hold."""
+    path = os.path.join(folder, name + ".parquet")
+    try:
+        df.to_parquet(path)
+        return {name: name + ".parquet"}
+    except Exception as e:
+        if os.path.exists(path):
+            os.remove(path)
+        print(f"Parquet not possible for {name} ({e}), using pickle")
+        df.to_pickle(os.path.join(folder, name + ".pkl"))
+        return {name: name + ".pkl"}
+
+def load_frame(entry, manifest, name):
+    path = os.path.join(entry, manifest["files"][name])
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        if b"geo" in (pq.read_schema(path).metadata or {}):
+            import geopandas as gpd
+            return gpd.read_parquet(path)
+        import pandas as pd
+        return pd.read_parquet(path)
+    import pandas as pd
+    return pd.read_pickle(path)
+
+def save_figures(src_dir, folder, since=0, ext=".pdf"):
+    """Copy the stage figures (written after `since`) into the entry."""
+    names = sorted(
+        fn for fn in os.listdir(src_dir)
+        if fn.lower().endswith(ext) and os.path.getmtime(os.path.join(src_dir, fn)) >= since
+    ) if os.path.isdir(src_dir) else []
+    if names:
+        os.makedirs(os.path.join(folder, "figures"))
+        for fn in names:
+            shutil.copy2(os.path.join(src_dir, fn), os.path.join(folder, "figures", fn))
+    return {"figures": names}
+
+def restore_figures(entry, manifest, dst_dir):
+    """Copy cached figures back to dst_dir (skipping identical files)."""
+    os.makedirs(dst_dir, exist_ok=True)
+    for fn in manifest.get("figures", []):
+        src = os.path.join(entry, "figures", fn)
+        dst = os.path.join(dst_dir, fn)
+        if os.path.exists(dst):
+            s, d = os.stat(src), os.stat(dst)
+            if s.st_size == d.st_size and int(s.st_mtime) == int(d.st_mtime):
+                continue
+        shutil.copy2(src, dst)
+
+def save_array(arr, folder, name):
+    """Save a numpy array as .npy (loadable memory-mapped)."""
+    import numpy as np
+    np.save(os.path.join(folder, name + ".npy"), np.ascontiguousarray(arr))
+    return {name: name + ".npy"}
+
+def load_array(entry, manifest, name, mmap=True):
+    import numpy as np
+    return np.load(os.path.join(entry, manifest["files"][name]), mmap_mode="r" if mmap else None)
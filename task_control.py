@@ -0,0 +1,49 @@
+"""
+Cooperative cancellation for the worker tasks (no Qt, so headless runs can use the same tasks).
+"""
+import threading
+
+
+class TaskCancelled(BaseException):
+    """
+    Raised inside a task at a cancel point after its CancelToken was cancelled. A BaseException
+    (like KeyboardInterrupt), so the "except Exception" fallbacks along the way do not swallow it.
+    """
+
+
+class CancelToken:
+    """Cooperative cancel flag; tasks call check() between steps. Works across processes with an mp Event."""
+
+    def __init__(self, event=None):
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise TaskCancelled()
+
+
+def check_cancel(cancel_token):
+    # cancel point for tasks that may run without a token
+    if cancel_token is not None:
+        cancel_token.check()
+
+
+def shutdown_pool(pool, finished):
+    """
+    Shut a ProcessPoolExecutor down. Unless finished (cancelled or failed), also stop the workers
+    still running a job: shutdown alone would let them compute it to the end.
+    """
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=finished, cancel_futures=True)
+    if not finished:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
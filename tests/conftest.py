@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def conf(tmp_path):
+    """Copy of the default CONFIG writing into tmp_path."""
+    from config import snapshot_config
+    conf = snapshot_config()
+    conf["output_dir"] = str(tmp_path / "out")
+    return conf
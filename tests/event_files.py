@@ -0,0 +1,57 @@
+"""Event files shared by the preprocessing tests, and the one-shot read they are compared with."""
+import numpy as np
+import pandas as pd
+
+ROWS = 60000
+
+
+def mixed_csv(path, rows=ROWS):
+    """Events whose id/code columns only turn alphanumeric after the first chunks, with duplicates."""
+    rng = np.random.default_rng(0)
+    keys = np.arange(rows).astype(object)
+    keys[rows // 2:] = [f"ABC{i}" for i in range(rows - rows // 2)]
+    keys[-100:] = keys[:100] # duplicated events
+    code = np.array([str(i % 7) for i in range(rows)], dtype=object)
+    code[rows // 2 + 5] = "X1"
+    df = pd.DataFrame({
+        "unique_key": keys,
+        "time": pd.date_range("2020-01-01", periods=rows, freq="min").strftime("%Y-%m-%d %H:%M:%S"),
+        "lat": rng.uniform(40.5, 40.9, rows).round(6),
+        "lon": rng.uniform(-74.2, -73.7, rows).round(6),
+        "code": code,
+        "big_id": 2**53 + np.arange(rows, dtype=np.int64),
+        "flag": np.where(np.arange(rows) % 2 == 0, "True", "False"),
+        "late": [None] * (rows - 10) + ["note"] * 10,
+    })
+    df.loc[7, "lat"] = None
+    df.to_csv(path, index=False)
+    return path
+
+
+def one_shot(path, time_col="time", lat_col="lat", lon_col="lon", bounds=None, filter_dates=None):
+    # the read_event_dataset steps on the whole file at once
+    df = pd.read_csv(path, low_memory=False)
+    df[time_col] = pd.to_datetime(df[time_col], errors="coerce")
+    df[lat_col] = pd.to_numeric(df[lat_col], errors="coerce")
+    df[lon_col] = pd.to_numeric(df[lon_col], errors="coerce")
+    df = df.dropna(subset=[time_col, lat_col, lon_col])
+    if bounds:
+        df = df[df[lat_col].between(bounds["min_lat"], bounds["max_lat"])
+                & df[lon_col].between(bounds["min_lon"], bounds["max_lon"])]
+    if filter_dates:
+        df = df[(df[time_col] >= pd.to_datetime(filter_dates[0])) & (df[time_col] <= pd.to_datetime(filter_dates[1]))]
+    id_col = next((c for c in ("unique_key", "id") if c in df.columns), None)
+    df = df.drop_duplicates(subset=[id_col] if id_col else None)
+    return df.dropna(axis=1, how="all").sort_values(time_col)
+
+
+def assert_same_events(got, expected):
+    assert len(got) == len(expected)
+    assert set(expected.columns) <= set(got.columns)
+    got = got.sort_values("time", kind="stable").reset_index(drop=True)
+    expected = expected.sort_values("time", kind="stable").reset_index(drop=True)
+    for col in expected.columns:
+        if col in ("lat", "lon"): # float32 in the copy
+            np.testing.assert_allclose(got[col].to_numpy(np.float64), expected[col].to_numpy(np.float64), atol=1e-5)
+        else:
+            assert got[col].astype(object).tolist() == expected[col].astype(object).tolist(), col
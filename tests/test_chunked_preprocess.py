@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from chunked_preprocess import chunk_rows_for, preprocess_chunked, MIN_CHUNK_ROWS
+from event_files import mixed_csv, one_shot, assert_same_events
+
+BOUNDS = {"min_lat": 40.6, "max_lat": 40.8, "min_lon": -74.0, "max_lon": -73.8}
+
+
+@pytest.fixture(scope="module")
+def mixed(tmp_path_factory):
+    return mixed_csv(tmp_path_factory.mktemp("chunked") / "events.csv")
+
+
+def test_memory_cap_splits_the_file(mixed):
+    assert chunk_rows_for(str(mixed), 1) == MIN_CHUNK_ROWS # several chunks for 60,000 rows
+    assert chunk_rows_for(str(mixed), 1024) > MIN_CHUNK_ROWS
+
+
+def test_chunked_matches_one_shot_read(mixed):
+    reports = []
+    gdf = preprocess_chunked(str(mixed), "time", "lat", "lon", memory_mb=1, progress_callback=reports.append)
+    assert_same_events(gdf, one_shot(mixed))
+    assert len(reports) > 1
+    assert gdf["big_id"].dtype == "int64"
+
+
+def test_chunked_filters_like_one_shot_read(mixed):
+    dates = ("2020-01-10", "2020-01-20")
+    gdf = preprocess_chunked(str(mixed), "time", "lat", "lon", testing_mode=True, test_bounds=BOUNDS,
+                             filter_dates=dates, memory_mb=1)
+    expected = one_shot(mixed, bounds=BOUNDS, filter_dates=dates)
+    assert 0 < len(expected) < 60000
+    assert_same_events(gdf, expected)
+    # bounds only apply in test mode
+    assert len(preprocess_chunked(str(mixed), "time", "lat", "lon", test_bounds=BOUNDS, memory_mb=1)) \
+        == len(one_shot(mixed))
+
+
+def test_no_surviving_rows_keeps_the_columns(tmp_path):
+    path = tmp_path / "none.csv"
+    pd.DataFrame({"time": ["bad", "worse"], "lat": [40.6, 40.7], "lon": [-74.0, -73.9], "kind": ["a", "b"]}) \
+        .to_csv(path, index=False)
+    gdf = preprocess_chunked(str(path), "time", "lat", "lon", memory_mb=1)
+    assert len(gdf) == 0
+    assert {"time", "lat", "lon"} <= set(gdf.columns)
+
+
+def test_missing_column_is_reported(tmp_path):
+    path = tmp_path / "nolon.csv"
+    pd.DataFrame({"time": ["2020-01-01"], "lat": [40.6]}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match="lon"):
+        preprocess_chunked(str(path), "time", "lat", "lon")
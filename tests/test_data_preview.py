@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_preview import read_sample, preview_task
+
+
+def sample_frame(n=3000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "time": pd.date_range("2020-01-01", periods=n, freq="min").strftime("%Y-%m-%d %H:%M:%S"),
+        "lat": rng.uniform(40.5, 40.9, n).round(6),
+        "lon": rng.uniform(-74.2, -73.7, n).round(6),
+        "kind": rng.choice(["noise", "heat"], n),
+    })
+
+
+def test_csv_sample_is_the_head_of_the_file(tmp_path):
+    path = tmp_path / "events.csv"
+    sample_frame().to_csv(path, index=False)
+    got = read_sample(str(path), 1000)
+    expected = pd.read_csv(path, nrows=1000)
+    assert list(got.columns) == list(expected.columns)
+    assert len(got) == 1000
+    np.testing.assert_allclose(got["lat"], expected["lat"])
+    assert got["kind"].astype(str).tolist() == expected["kind"].tolist()
+
+
+def test_short_csv_is_read_whole(tmp_path):
+    path = tmp_path / "short.csv"
+    sample_frame(10).to_csv(path, index=False)
+    assert len(read_sample(str(path), 1000)) == 10
+
+
+def test_excel_sample_is_the_head_of_the_sheet(tmp_path):
+    pytest.importorskip("openpyxl")
+    path = tmp_path / "events.xlsx"
+    sample_frame(200).to_excel(path, index=False)
+    got = read_sample(str(path), 50)
+    expected = pd.read_excel(path, nrows=50)
+    assert list(got.columns) == list(expected.columns)
+    assert len(got) == 50
+    np.testing.assert_allclose(got["lon"].astype(float), expected["lon"])
+
+
+def test_preview_task_reports_unreadable_files(tmp_path):
+    path = tmp_path / "broken.xlsx"
+    path.write_bytes(b"not a workbook")
+    result = preview_task(str(path))
+    assert result["status"] == "error"
+    assert "broken.xlsx" in result["message"]
+
+
+def test_dataframe_model_shows_the_frame():
+    pytest.importorskip("PyQt6")
+    from PyQt6.QtCore import Qt
+    from DataFrameModel import DataFrameModel
+    model = DataFrameModel()
+    assert model.rowCount() == 0 and model.columnCount() == 0
+    df = sample_frame(5)
+    model.set_data(df)
+    assert (model.rowCount(), model.columnCount()) == df.shape
+    assert model.data(model.index(2, 3)) == str(df.iat[2, 3])
+    assert model.headerData(1, Qt.Orientation.Horizontal) == "lat"
+    assert model.headerData(0, Qt.Orientation.Vertical) == "1"
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_profile
+from data_profile import DataProfile, profile_task
+from task_control import CancelToken
+
+
+def events(n=5000):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        "time": pd.date_range("2020-03-01", periods=n, freq="15min").strftime("%Y-%m-%d %H:%M:%S"),
+        "lat": rng.uniform(40.5, 40.9, n).round(6).astype(object),
+        "lon": rng.uniform(-74.2, -73.7, n).round(6),
+        "other": "x",
+    })
+    df.loc[10, "time"] = "not a date"
+    df.loc[4000, "lat"] = "n/a" # text far down the file
+    df.loc[20, "lon"] = np.nan
+    return df
+
+
+def expected_profile(df):
+    times = pd.to_datetime(df["time"], errors="coerce")
+    lat = pd.to_numeric(df["lat"], errors="coerce")
+    lon = pd.to_numeric(df["lon"], errors="coerce")
+    return times, lat, lon
+
+
+@pytest.mark.parametrize("ext", ["csv", "xlsx"])
+def test_profile_matches_a_full_read(tmp_path, monkeypatch, ext):
+    if ext == "xlsx":
+        pytest.importorskip("openpyxl")
+    monkeypatch.setattr(data_profile, "BLOCK_BYTES", 16 << 10) # many blocks
+    monkeypatch.setattr(data_profile, "EXCEL_CHUNK_ROWS", 700)
+    df = events(3000 if ext == "xlsx" else 5000)
+    path = tmp_path / f"events.{ext}"
+    df.to_csv(path, index=False) if ext == "csv" else df.to_excel(path, index=False)
+    reports = []
+    result = profile_task(str(path), "time", "lat", "lon", progress_callback=reports.append)
+    assert result["status"] == "ok"
+    profile = result["profile"]
+    times, lat, lon = expected_profile(df)
+    assert profile.rows == len(df)
+    assert profile.missing == {"time": times.isna().sum(), "lat": lat.isna().sum(), "lon": lon.isna().sum()}
+    assert (profile.time_min, profile.time_max) == (times.min(), times.max())
+    assert profile.bounds() == pytest.approx({"min_lat": lat.min(), "max_lat": lat.max(),
+                                              "min_lon": lon.min(), "max_lon": lon.max()})
+    assert len(reports) > 1 and reports[-1]["done"] == reports[-1]["total"]
+
+
+def test_empty_profile_has_no_bounds():
+    profile = DataProfile("time", "lat", "lon")
+    assert profile.bounds() is None
+    assert profile.missing_rate("lat") == 0.0
+    assert "Rows: 0" in profile.summary()
+
+
+def test_profile_stops_when_cancelled(tmp_path):
+    from task_control import TaskCancelled
+    path = tmp_path / "events.csv"
+    events().to_csv(path, index=False)
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(TaskCancelled):
+        profile_task(str(path), "time", "lat", "lon", cancel_token=token)
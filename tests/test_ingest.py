@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest
+from event_files import mixed_csv, one_shot, assert_same_events
+
+
+def ingest_conf(conf, path):
+    conf.update({"data_path": str(path), "time_column": "time", "lat_column": "lat", "long_column": "lon",
+                 "preprocess_memory_mb": 1}) # several chunks
+    return conf
+
+
+def test_ingest_matches_one_shot_read_on_mixed_types(conf, tmp_path):
+    path = mixed_csv(tmp_path / "events.csv")
+    gdf = ingest.preprocess_ingested(ingest_conf(conf, path))
+    expected = one_shot(path)
+    assert_same_events(gdf, expected)
+    assert "ABC1" in set(gdf["unique_key"])
+    assert "X1" in set(gdf["code"])
+    assert gdf["big_id"].dtype == np.int64 # exact above 2**53
+    assert gdf["flag"].dtype == bool
+
+
+def test_ingest_copy_is_reused(conf, tmp_path):
+    conf = ingest_conf(conf, mixed_csv(tmp_path / "events.csv", rows=20000))
+    first = ingest.ensure_parquet(conf)
+    assert ingest.ensure_parquet(conf) == first
+    assert ingest.ingest_key(conf) == ingest.ingest_key(dict(conf))
+
+
+def test_ingest_keeps_local_wall_time(conf, tmp_path):
+    path = tmp_path / "tz.csv"
+    pd.DataFrame({
+        "time": ["2020-01-01 23:30:00+02:00", "2020-01-02 00:30:00+02:00"],
+        "lat": [40.6, 40.7], "lon": [-74.0, -73.9],
+    }).to_csv(path, index=False)
+    gdf = ingest.preprocess_ingested(ingest_conf(conf, path))
+    assert gdf["time"].dt.tz is None
+    assert [t.day for t in gdf["time"]] == [1, 2]
+    assert [t.hour for t in gdf["time"]] == [23, 0]
+
+
+def test_projected_columns_without_id_keep_distinct_events(conf, tmp_path):
+    path = tmp_path / "noid.csv"
+    pd.DataFrame({
+        "time": ["2020-01-01 10:00:00"] * 3,
+        "lat": [40.6] * 3, "lon": [-74.0] * 3,
+        "kind": ["a"] * 3,
+        "note": ["first", "second", "second"], # two distinct events, one exact duplicate
+    }).to_csv(path, index=False)
+    conf = ingest_conf(conf, path)
+    conf["ingest_columns"] = ["kind"]
+    gdf = ingest.preprocess_ingested(conf)
+    assert len(gdf) == 2
+    assert "note" not in gdf.columns
+
+
+def test_ingest_matches_stm_graph(conf, tmp_path):
+    stm_graph = pytest.importorskip("stm_graph")
+    path = mixed_csv(tmp_path / "events.csv")
+    expected = stm_graph.preprocess_dataset(
+        data_path=str(tmp_path), dataset="events.csv", time_col="time", lat_col="lat", lng_col="lon",
+        filter_dates=(None, None), testing_mode=False, test_bounds=None, crs="EPSG:4326",
+        visualize=False, output_dir=str(tmp_path / "ref"),
+    )
+    gdf = ingest.preprocess_ingested(ingest_conf(conf, path))
+    assert len(gdf) == len(expected)
+    assert set(gdf["unique_key"].astype(str)) == set(expected["unique_key"].astype(str))
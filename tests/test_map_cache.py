@@ -0,0 +1,99 @@
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+import projection
+import stage_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_memory():
+    stage_cache._memory.clear()
+    yield
+    stage_cache._memory.clear()
+
+
+class CountingMapper:
+    """Two cells split at lon -73.5; counts create_mapping calls."""
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def create_mapping(self, points_gdf):
+        self.calls += 1
+        cells = gpd.GeoDataFrame(geometry=[box(-74, 40, -73.5, 41), box(-73.5, 40, -73, 41)], crs="EPSG:4326") \
+            .to_crs(points_gdf.crs)
+        p2x = pd.Series(np.where(points_gdf.geometry.x < cells.geometry.bounds.maxx.iloc[0], 0, 1),
+                        index=points_gdf.index)
+        return cells, p2x
+
+    def visualize(self, out_dir, **kwargs):
+        # like the stm_graph mappers: figures go to <out_dir>/mapping
+        os.makedirs(os.path.join(out_dir, "mapping"), exist_ok=True)
+        with open(os.path.join(out_dir, "mapping", f"{self.name}.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4 fake")
+
+
+def events(conf, n=40):
+    rng = np.random.default_rng(0)
+    gdf = gpd.GeoDataFrame({"time": pd.date_range("2020-01-01", periods=n, freq="h")},
+                           geometry=gpd.points_from_xy(rng.uniform(-74, -73, n), rng.uniform(40, 41, n)),
+                           crs="EPSG:4326")
+    projection.add_projected(gdf, conf["meter_crs"])
+    return gdf
+
+
+def test_memory_cache_is_bounded_and_respects_use_cache(conf):
+    for i in range(stage_cache.MEMORY_ENTRIES + 1):
+        stage_cache.remember("mapping", f"k{i}", i)
+    assert stage_cache.recall(conf, "mapping", "k0") is None # oldest evicted
+    assert stage_cache.recall(conf, "mapping", f"k{stage_cache.MEMORY_ENTRIES}") == stage_cache.MEMORY_ENTRIES
+    conf["use_cache"] = False
+    assert stage_cache.recall(conf, "mapping", "k1") is None
+
+
+def test_array_round_trip_is_memory_mapped(conf):
+    arr = np.arange(10, dtype=np.int64)
+    key = stage_cache.make_key("mapping", "arrays")
+    stage_cache.store(conf, "mapping", key, lambda d: {"files": stage_cache.save_array(arr, d, "p2x")})
+    loaded = stage_cache.load_array(*stage_cache.lookup(conf, "mapping", key), "p2x")
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, arr)
+
+
+def test_frame_fingerprint_prefers_the_stage_key(conf):
+    gdf = events(conf)
+    content = stage_cache.frame_fingerprint(gdf)
+    assert stage_cache.frame_fingerprint(gdf.copy()) == content
+    moved = gdf.copy()
+    moved.geometry = gpd.points_from_xy(moved.geometry.x + 0.1, moved.geometry.y, crs=moved.crs)
+    assert stage_cache.frame_fingerprint(moved) != content
+    gdf.attrs["stm_fingerprint"] = "preprocess-key"
+    assert stage_cache.frame_fingerprint(gdf) == "preprocess-key"
+
+
+def test_map_task_reuses_memory_and_disk(conf):
+    thread_func = pytest.importorskip("thread_func", exc_type=ImportError)
+    gdf = events(conf)
+    mapper = CountingMapper()
+    first = thread_func.map_task(conf, mapper, gdf)
+    assert not first["cached"] and mapper.calls == 1
+
+    again = thread_func.map_task(conf, mapper, gdf) # from memory
+    assert again["cached"] and mapper.calls == 1
+    assert again["data"]["res"][1].equals(first["data"]["res"][1])
+
+    stage_cache._memory.clear()
+    from_disk = thread_func.map_task(conf, mapper, gdf)
+    assert from_disk["cached"] and mapper.calls == 1
+    np.testing.assert_array_equal(np.asarray(from_disk["data"]["res"][1]), np.asarray(first["data"]["res"][1]))
+    assert len(from_disk["data"]["geo_valid"]) == len(first["data"]["geo_valid"])
+
+    conf["cell_size"] *= 2 # other settings: mapped again
+    thread_func.map_task(conf, mapper, gdf)
+    assert mapper.calls == 2
@@ -0,0 +1,99 @@
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+
+import stage_cache
+
+
+def points(n=50):
+    rng = np.random.default_rng(0)
+    return gpd.GeoDataFrame(
+        {"time": pd.date_range("2020-01-01", periods=n, freq="h"), "kind": rng.choice(["a", "b"], n)},
+        geometry=gpd.points_from_xy(rng.uniform(-74, -73, n), rng.uniform(40, 41, n)), crs="EPSG:4326",
+    )
+
+
+def test_make_key_is_stable_and_sensitive():
+    key = stage_cache.make_key("preprocess", {"path": "a.csv", "size": 1}, "time", None)
+    assert key == stage_cache.make_key("preprocess", {"size": 1, "path": "a.csv"}, "time", None)
+    assert key != stage_cache.make_key("preprocess", {"path": "a.csv", "size": 2}, "time", None)
+    assert key != stage_cache.make_key("mapping", {"path": "a.csv", "size": 1}, "time", None)
+
+
+def test_file_fingerprint_follows_the_content(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n1,2\n")
+    by_stat = stage_cache.file_fingerprint(str(path))
+    by_hash = stage_cache.file_fingerprint(str(path), content_hash=True)
+    path.write_text("a,b\n1,3\n") # same size, new content
+    os.utime(path, ns=(by_stat["mtime_ns"] + 10**9, by_stat["mtime_ns"] + 10**9))
+    assert stage_cache.file_fingerprint(str(path)) != by_stat
+    assert stage_cache.file_fingerprint(str(path), content_hash=True) != by_hash
+    # a copy elsewhere is the same input by content, not by path
+    copy = tmp_path / "copy.csv"
+    copy.write_bytes(path.read_bytes())
+    assert stage_cache.file_fingerprint(str(copy), content_hash=True) == \
+        stage_cache.file_fingerprint(str(path), content_hash=True)
+
+
+def test_store_and_lookup_round_trip(conf):
+    gdf, df = points(), pd.DataFrame({"x": [1.5, 2.5], "label": ["a", "b"]})
+    key = stage_cache.make_key("preprocess", "round-trip")
+    assert stage_cache.lookup(conf, "preprocess", key) is None
+    entry = stage_cache.store(conf, "preprocess", key, lambda d: {
+        "files": {**stage_cache.save_frame(gdf, d, "geo_df"), **stage_cache.save_frame(df, d, "table")},
+    }, meta={"rows": len(gdf)})
+    hit = stage_cache.lookup(conf, "preprocess", key)
+    assert hit is not None and hit[0] == entry
+    assert hit[1]["meta"] == {"rows": len(gdf)}
+    loaded = stage_cache.load_frame(*hit, "geo_df")
+    assert isinstance(loaded, gpd.GeoDataFrame)
+    assert loaded.crs == gdf.crs
+    pd.testing.assert_frame_equal(pd.DataFrame(loaded.drop(columns="geometry")), pd.DataFrame(gdf.drop(columns="geometry")))
+    assert loaded.geometry.geom_equals(gdf.geometry).all()
+    pd.testing.assert_frame_equal(stage_cache.load_frame(*hit, "table"), df)
+
+
+def test_store_is_off_without_cache_and_never_leaves_half_entries(conf):
+    key = stage_cache.make_key("preprocess", "broken")
+
+    def broken(d):
+        stage_cache.save_frame(points(), d, "geo_df")
+        raise OSError("disk full")
+
+    assert stage_cache.store(conf, "preprocess", key, broken) is None
+    assert stage_cache.lookup(conf, "preprocess", key) is None
+    assert os.listdir(stage_cache.cache_dir(conf, "preprocess")) == []
+    conf["use_cache"] = False
+    assert stage_cache.store(conf, "preprocess", key, lambda d: {}) is None
+
+
+def test_figures_are_restored(conf, tmp_path):
+    src = tmp_path / "figs"
+    src.mkdir()
+    (src / "events.pdf").write_bytes(b"%PDF-1.4 fake")
+    key = stage_cache.make_key("preprocess", "figures")
+    stage_cache.store(conf, "preprocess", key, lambda d: stage_cache.save_figures(str(src), d))
+    dst = tmp_path / "restored"
+    stage_cache.restore_figures(*stage_cache.lookup(conf, "preprocess", key), str(dst))
+    assert (dst / "events.pdf").read_bytes() == b"%PDF-1.4 fake"
+
+
+def test_process_cache_key(conf, tmp_path):
+    thread_func = pytest.importorskip("thread_func", exc_type=ImportError)
+    path = tmp_path / "data.csv"
+    path.write_text("t,lat,lon\n2020-01-01,40.6,-74.0\n")
+    conf.update({"data_path": str(path), "time_column": "t", "lat_column": "lat", "long_column": "lon"})
+    key = thread_func.process_cache_key(conf)
+    assert thread_func.process_cache_key(dict(conf)) == key
+    # bounds only count in test mode
+    conf["bounds"] = {**conf["bounds"], "min_lat": 0}
+    assert thread_func.process_cache_key(conf) == key
+    conf["test_mode"] = True
+    assert thread_func.process_cache_key(conf) != key
+    conf["test_mode"] = False
+    conf["date_filter_start"] = "2020-01-02"
+    assert thread_func.process_cache_key(conf) != key
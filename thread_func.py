@@ -1,52 +1,234 @@
 import stm_graph
 import os
+import time
 import numpy as np
+import stage_cache
+import density_render
+import projection
 from utils import rasterize_process_check
-from time import strftime, localtime
+from task_control import check_cancel
 from datetime import timedelta
 
 # ********** START WORKER THREAD FUNC HERE  **********
-def process_task(conf):
-    geo_df = stm_graph.preprocess_dataset(
-        data_path= os.path.dirname(conf['data_path']),
-        dataset= os.path.basename(conf['data_path']),
-        time_col=conf["time_column"],
-        lat_col=conf["lat_column"],
-        lng_col=conf["long_column"],
+def process_cache_key(conf):
+    return stage_cache.make_key(
+        "preprocess",
+        stage_cache.file_fingerprint(conf["data_path"], content_hash=conf.get("cache_hash_input", False)),
+        conf["time_column"], conf["lat_column"], conf["long_column"],
+        conf["input_crs"], conf["meter_crs"],
+        conf["date_filter_start"], conf["date_filter_end"],
+        conf["test_mode"], conf["bounds"] if conf["test_mode"] else None,
+        figure_params(conf),
+        # the Parquet copy stores lat/lon as float32
+        conf.get("use_ingest", True), conf.get("ingest_columns"),
+    )
+
+def figure_params(conf):
+    # the cached figures depend on how points are drawn
+    return {"vis_mode": conf.get("vis_mode", "scatter"), "resolution": conf.get("density_resolution")}
+
+def process_task(conf, progress_callback=None, cancel_token=None):
+    key = process_cache_key(conf)
+    fig_dir = f'{conf["output_dir"]}/preprocess'
+    hit = stage_cache.lookup(conf, "preprocess", key)
+    if hit:
+        entry, manifest = hit
+        print(f"Reusing cached preprocessing result {entry}")
+        geo_df = stage_cache.load_frame(entry, manifest, "geo_df")
+        stage_cache.restore_figures(entry, manifest, fig_dir)
+        geo_df.attrs["stm_fingerprint"] = key
+        return {"status": "ok", "data": geo_df, "cached": True}
+
+    started = time.time()
+    density = conf.get("vis_mode", "scatter") == "density"
+    geo_df = None
+    if conf.get("use_ingest", True):
+        from ingest import preprocess_ingested
+        geo_df = preprocess_ingested(conf, progress_callback)
+    if geo_df is None and conf.get("preprocess_memory_mb"):
+        geo_df = chunked_process(conf, progress_callback)
+    check_cancel(cancel_token)
+    if geo_df is not None:
+        projection.add_projected(geo_df, conf["meter_crs"])
+        if not density:
+            scatter_preprocess_figures(conf, geo_df)
+    else:
+        geo_df = stm_graph.preprocess_dataset(
+            data_path= os.path.dirname(conf['data_path']),
+            dataset= os.path.basename(conf['data_path']),
+            time_col=conf["time_column"],
+            lat_col=conf["lat_column"],
+            lng_col=conf["long_column"],
+            filter_dates=(conf["date_filter_start"], conf["date_filter_end"]),
+            testing_mode=conf["test_mode"],
+            test_bounds= conf["bounds"],
+            crs=conf["input_crs"],
+            visualize=not density,
+            fig_format="pdf",
+            output_dir=conf["output_dir"],
+            show_background_map=True,
+            point_color="red",
+            point_alpha=0.5,
+            point_size=1,
+            vis_crs=conf["meter_crs"],
+        )
+        projection.add_projected(geo_df, conf["meter_crs"])
+    check_cancel(cancel_token)
+    if density:
+        density_render.render_preprocess_figures(
+            geo_df, conf["time_column"], conf["output_dir"], vis_crs=conf["meter_crs"],
+            resolution=conf.get("density_resolution", density_render.DEFAULT_RESOLUTION),
+        )
+    rasterize_process_check(out_prepocess_dir=fig_dir, progress_callback=progress_callback,
+                            memory_mb=conf.get("raster_memory_mb", 256))
+    stage_cache.store(conf, "preprocess", key, lambda d: {
+        "files": stage_cache.save_frame(geo_df, d, "geo_df"),
+        **stage_cache.save_figures(fig_dir, d, since=started),
+    }, meta={"data_path": conf["data_path"], "rows": len(geo_df)})
+    geo_df.attrs["stm_fingerprint"] = key
+    return {"status": "ok", "data": geo_df, "cached": False}
+
+def chunked_process(conf, progress_callback=None):
+    # out-of-core preprocessing (see chunked_preprocess.py)
+    from chunked_preprocess import preprocess_chunked
+    return preprocess_chunked(
+        conf['data_path'], conf["time_column"], conf["lat_column"], conf["long_column"],
+        crs=conf["input_crs"], testing_mode=conf["test_mode"], test_bounds=conf["bounds"],
         filter_dates=(conf["date_filter_start"], conf["date_filter_end"]),
-        testing_mode=conf["test_mode"],
-        test_bounds= conf["bounds"],
-        crs=conf["input_crs"],
-        visualize=True,
-        fig_format="pdf",
-        output_dir=conf["output_dir"],
-        show_background_map=True,
-        point_color="red",
-        point_alpha=0.5,
-        point_size=1,
-        vis_crs=conf["meter_crs"],
+        memory_mb=conf["preprocess_memory_mb"], progress_callback=progress_callback,
+    )
+
+def scatter_preprocess_figures(conf, geo_df):
+    # the figures preprocess_dataset makes, for frames preprocessed outside of it
+    from stm_graph.data.loader import visualize_preprocessed_data
+    visualize_preprocessed_data(
+        projection.to_projected(geo_df, conf["meter_crs"]), conf["time_column"], conf["output_dir"], show_background_map=True,
+        point_color="red", point_alpha=0.5, point_size=1, vis_crs=conf["meter_crs"], fig_format="pdf",
     )
-    rasterize_process_check(out_prepocess_dir=f'{conf["output_dir"]}/preprocess')
-    return {"status": "ok", "data": geo_df}
-
-def map_task(conf, mapper, geodf):
-    mapping_result = mapper.create_mapping(geodf) # tuple (df, p2x)
-    mapper.visualize(
-        points_gdf=geodf,
-        partition_gdf=mapping_result[0],
-        point_to_partition=mapping_result[1],
-        out_dir=conf['output_dir'],
-        remove_empty=True,
-        testing_mode=False,
-        file_format="pdf"
+
+def map_cache_key(conf, geodf):
+    if conf["mapping"] == 'grid':
+        params = {"cell_size": conf["cell_size"]}
+    elif conf["mapping"] == 'voronoi-based':
+        params = {"small": conf["vor_small_cell_size"], "big": conf["vor_big_cell_size"]}
+    else: # administrative
+        params = {"shape_file": stage_cache.files_fingerprint(conf["adm_shape_file"])}
+    return stage_cache.make_key(
+        "mapping", stage_cache.frame_fingerprint(geodf), conf["mapping"], params,
+        conf["input_crs"], conf["meter_crs"], figure_params(conf),
     )
-    rasterize_process_check(out_prepocess_dir=f'{conf["output_dir"]}/mapping')
+
+def load_mapping(conf, key):
+    # cached (partition_gdf, p2x) with p2x memory-mapped, None if not cached
+    hit = stage_cache.lookup(conf, "mapping", key)
+    if not hit:
+        return None
+    entry, manifest = hit
+    import pandas as pd
+    partition_gdf = stage_cache.load_frame(entry, manifest, "partitions")
+    p2x = pd.Series(stage_cache.load_array(entry, manifest, "p2x"),
+                    index=stage_cache.load_array(entry, manifest, "p2x_index"), copy=False)
+    stage_cache.restore_figures(entry, manifest, f'{conf["output_dir"]}/mapping')
+    return partition_gdf, p2x
+
+def map_task(conf, mapper, geodf, progress_callback=None, cancel_token=None, precomputed=None):
+    # precomputed: (partition_gdf, p2x) of these settings from a sweep, only figures and caching left to do
+    key = map_cache_key(conf, geodf)
+    cached = stage_cache.recall(conf, "mapping", key)
+    if cached is not None:
+        # figures may have been overwritten by another mapping since
+        hit = stage_cache.lookup(conf, "mapping", key)
+        if hit:
+            stage_cache.restore_figures(*hit, f'{conf["output_dir"]}/mapping')
+    else:
+        cached = load_mapping(conf, key)
+    if cached is not None:
+        print(f"Reusing cached mapping result {key}")
+        mapping_result = cached
+    else:
+        started = time.time()
+        # grid and administrative mappers work on points in meter_crs: hand them the stored projection
+        points_meter = projection.to_projected(geodf, conf["meter_crs"]) if conf["mapping"] != "voronoi-based" else geodf
+        mapping_result = precomputed if precomputed is not None else mapper.create_mapping(points_meter) # tuple (df, p2x)
+        check_cancel(cancel_token)
+        if conf.get("vis_mode", "scatter") == "density":
+            density_render.render_mapping_figures(
+                geodf, mapping_result[0], mapping_result[1], conf['output_dir'], name=mapper.name,
+                resolution=conf.get("density_resolution", density_render.DEFAULT_RESOLUTION),
+            )
+        else:
+            mapper.visualize(
+                # plotted in EPSG:3857
+                points_gdf=projection.to_projected(geodf, "EPSG:3857"),
+                partition_gdf=mapping_result[0],
+                point_to_partition=mapping_result[1],
+                out_dir=conf['output_dir'],
+                remove_empty=True,
+                testing_mode=False,
+                file_format="pdf"
+            )
+        rasterize_process_check(out_prepocess_dir=f'{conf["output_dir"]}/mapping', progress_callback=progress_callback,
+                                memory_mb=conf.get("raster_memory_mb", 256))
+        stage_cache.store(conf, "mapping", key, lambda d: {
+            "files": {
+                **stage_cache.save_frame(mapping_result[0], d, "partitions"),
+                **stage_cache.save_array(mapping_result[1].to_numpy(), d, "p2x"),
+                **stage_cache.save_array(mapping_result[1].index.to_numpy(), d, "p2x_index"),
+            },
+            **stage_cache.save_figures(f'{conf["output_dir"]}/mapping', d, since=started),
+        }, meta={"mapping": conf["mapping"], "regions": len(mapping_result[0])})
+    stage_cache.remember("mapping", key, mapping_result)
+    mapping_result[0].attrs["stm_fingerprint"] = key
     p2x = mapping_result[1]
     gdf_valid = geodf[p2x >= 0].copy()
     p2x_valid = p2x[p2x >= 0].copy()
-    return {"status": "ok", "data": {"res": mapping_result, "geo_valid":gdf_valid, "p2x_valid": p2x_valid}}
+    gdf_valid.attrs["stm_fingerprint"] = key
+    return {"status": "ok", "cached": cached is not None,
+            "data": {"res": mapping_result, "geo_valid":gdf_valid, "p2x_valid": p2x_valid}}
+
+def generate_cache_key(conf, mapped_geodf):
+    return stage_cache.make_key(
+        "graph", stage_cache.frame_fingerprint(mapped_geodf),
+        conf["osm_types"], conf["bounds"] if conf["osm_types"] is not None else None,
+        conf["input_crs"], conf["meter_crs"], conf["time_column"],
+        conf["pred_type"], conf["horizon"], conf["interval_step"], conf["window_size"],
+        conf["use_time_features"], conf["app_type"],
+    )
+
+def load_graph_artifacts(conf, key, dataset_path):
+    # (graph_data, osm_features) of a previous identical build, None if not cached or .pt removed
+    hit = stage_cache.lookup(conf, "graph", key)
+    if not hit or not os.path.isfile(dataset_path):
+        return None
+    entry, manifest = hit
+    graph_data = {
+        "edge_index": stage_cache.load_array(entry, manifest, "edge_index"),
+        "edge_weight": stage_cache.load_array(entry, manifest, "edge_weight"),
+        "node_features": stage_cache.load_array(entry, manifest, "node_features"),
+        "node_ids": stage_cache.load_array(entry, manifest, "node_ids", mmap=False).tolist(),
+        "augmented_df": None, # not persisted, only needed to build the temporal dataset
+        "num_nodes": manifest["meta"]["num_nodes"],
+    }
+    osm_features = None
+    if "osm_features" in manifest["files"]:
+        osm_features = stage_cache.load_frame(entry, manifest, "osm_features")
+        osm_features_path = os.path.join(conf["output_dir"], "osm_features.csv")
+        if not os.path.exists(osm_features_path):
+            osm_features.to_csv(osm_features_path)
+    return graph_data, osm_features
+
+def generate_data_task(conf, mapped_geodf, gdf_valid, p2x_valid, cancel_token=None):
+    # same settings -> same dataset name, so identical runs reuse (or overwrite) one artifact
+    key = generate_cache_key(conf, mapped_geodf)
+    dataset_name = f"stmgraph_data_{key[:12]}"
+    dataset_path = os.path.join(conf["output_dir"], f"{dataset_name}.pt")
+    cached = load_graph_artifacts(conf, key, dataset_path)
+    if cached is not None:
+        print(f"Reusing generated dataset {dataset_path}")
+        graph_data, osm_features = cached
+        temporal_dataset = stm_graph.load_static_temporal_data(dataset_path)
+        return make_generate_result(temporal_dataset, graph_data, osm_features, dataset_path, cached=True)
 
-def generate_data_task(conf, mapped_geodf, gdf_valid, p2x_valid):
     osm_features = None
     if conf["osm_types"] is not None:
         osm_features = stm_graph.extract_osm_features(
@@ -59,6 +241,7 @@ def generate_data_task(conf, mapped_geodf, gdf_valid, p2x_valid):
         )
         osm_features_path = os.path.join(conf["output_dir"], "osm_features.csv")
         osm_features.to_csv(osm_features_path)
+    check_cancel(cancel_token)
     
     graph_data = stm_graph.build_graph_and_augment(
         grid_gdf=mapped_geodf,
@@ -70,6 +253,7 @@ def generate_data_task(conf, mapped_geodf, gdf_valid, p2x_valid):
         save_flag=False,
         static_features=osm_features,
     )
+    check_cancel(cancel_token)
     
     temporal_dataset, _, _ = stm_graph.create_temporal_dataset(
         edge_index=graph_data["edge_index"],
@@ -89,26 +273,42 @@ def generate_data_task(conf, mapped_geodf, gdf_valid, p2x_valid):
         normalize=True,
         scaler_type="minmax",
         out_dir=conf["output_dir"],
-        dataset_name=f"stmgraph_data_{strftime('%Y-%m-%d_%H%M%S', localtime())}",
+        dataset_name=dataset_name,
         output_format="4d", 
     )    
+    def write_graph(d):
+        files = {}
+        for k in ("edge_index", "edge_weight", "node_features"):
+            files.update(stage_cache.save_array(np.asarray(graph_data[k]), d, k))
+        files.update(stage_cache.save_array(np.asarray(graph_data["node_ids"]), d, "node_ids"))
+        if osm_features is not None:
+            files.update(stage_cache.save_frame(osm_features, d, "osm_features"))
+        return {"files": files}
+    stage_cache.store(conf, "graph", key, write_graph,
+                      meta={"dataset_path": dataset_path, "num_nodes": graph_data["num_nodes"]})
+    return make_generate_result(temporal_dataset, graph_data, osm_features, dataset_path, cached=False)
+
+def make_generate_result(temporal_dataset, graph_data, osm_features, dataset_path, cached):
     res = {"status": "ok", "temporal_graph_data": temporal_dataset, 
                 "graph_data": graph_data,
                 "num_nodes": graph_data["num_nodes"], 
                 "num_edges": graph_data["edge_index"].shape[1],
-                "osm_features": osm_features
+                "osm_features": osm_features,
+                "dataset_path": dataset_path,
+                "cached": cached,
     }
     if osm_features is not None:
         res["num_extracted_osm_features"] = len(osm_features.columns)
         
     return res
         
-def plot_task(conf, temporal_dataset, graph_data, osm_features, mapped_geodf):
+def plot_task(conf, temporal_dataset, graph_data, osm_features, mapped_geodf, cancel_token=None):
     # convert 4d to 3d
     stat_feat_count = osm_features.shape[1] if osm_features is not None else 0
     temporal_dataset_3d = stm_graph.convert_4d_to_3d_dataset(
         temporal_dataset, static_features_count=stat_feat_count
     )
+    check_cancel(cancel_token)
     
     if conf["plot_type"] == "node":
         plot_view = conf["plot_nodes"]["View"][0]
@@ -173,6 +373,44 @@ def plot_task(conf, temporal_dataset, graph_data, osm_features, mapped_geodf):
             fig_dpi=300,
         )
 
+def create_mapper(conf):
+    if conf["mapping"] == 'grid':
+        return stm_graph.GridMapping(cell_size=conf['cell_size'], target_crs=conf['meter_crs'])
+    if conf["mapping"] == 'administrative':
+        return stm_graph.AdministrativeMapping(
+            admin_type="administrative",
+            districts_file=conf['adm_shape_file'],
+            input_crs=conf['input_crs'],
+            meter_crs=conf['meter_crs']
+        )
+    if conf["mapping"] == 'voronoi-based':
+        return stm_graph.VoronoiDegreeMapping(
+            place_name=None, testing_mode=False, buffer_distance=0.05,
+            large_cell_size=conf['vor_big_cell_size'], 
+            small_cell_size=conf['vor_small_cell_size']
+        )
+    raise ValueError(f"Unknown mapping type: {conf['mapping']}")
+
+# models trained on the 3d dataset [T, N, H*F+S]; the others take the 4d one
+THREE_D_MODELS = ("gcn", "tgcn")
+
+def prepare_training_data(conf, temporal_dataset=None, static_features_count=0):
+    # load 4d dataset from disk if not given, convert for 3d models and sync model params with data shape
+    selected_model = conf["training"]["model"]
+    if temporal_dataset is None:
+        import torch
+        temporal_dataset = torch.load(conf["training"]["graph_data_path"]) #4d
+    if selected_model in THREE_D_MODELS:
+        temporal_dataset = stm_graph.convert_4d_to_3d_dataset(temporal_dataset, static_features_count=static_features_count) #3d
+    model_conf = conf["training"][selected_model]
+    model_conf["in_channels"][0] = temporal_dataset.features[0].shape[-1]
+    if "num_nodes" in model_conf:
+        model_conf["num_nodes"][0] = temporal_dataset.features[0].shape[0]
+    for k in ('k', 'K', 'kernel_size', 'history_window'):
+        if k in model_conf:
+            model_conf[k][0] = conf["window_size"]
+    return temporal_dataset
+
 def create_model_task(conf):
     selected_model = conf["training"]["model"]
     conf["training"][selected_model].keys()
@@ -188,6 +426,7 @@ def create_model_task(conf):
     return {"status": "ok", "model": model}
 
 def training_task(conf, model, temporal_dataset):
+    # train_model has no cancel point: a training job is cancelled by killing its process
     fixed_batch_size = False
     if conf["training"]["model"] == "agcrn":
         fixed_batch_size = True
@@ -216,7 +455,8 @@ def training_task(conf, model, temporal_dataset):
         log_dir=conf["training"]["log_dir"],
         fixed_batch_size=fixed_batch_size
     )
-    return {"status": "ok", "training_results": results}
+    # the trained model, which is a copy when training ran in its own process
+    return {"status": "ok", "training_results": results, "model": model}
 
 # ********** END WORKER THREAD FUNC HERE  **********
         
\ No newline at end of file
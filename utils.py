@@ -1,28 +1,67 @@
 import os
-import fitz
-from PIL import Image
-from PyQt6.QtCore import QFileInfo
+import math
+import time
+import importlib
+
+# imported lazily by the GUI, preloaded in background after the window shows
+HEAVY_MODULES = ["pandas", "fitz", "torch", "stm_graph", "thread_func"]
 
 def check_file_size(file_path, max_size_mb=4):
     """Check if file size exceeds max_size_mb (in MB)."""
-    file_info = QFileInfo(file_path)
-    file_size_mb = file_info.size() / (1024 * 1024)  # Convert bytes to MB
+    file_size_mb = os.path.getsize(file_path) / (1024 * 1024)  # Convert bytes to MB
     return file_size_mb >= max_size_mb
 
-def generate_rasterized_pdf(input_pdf_path, output_pdf_path, dpi=200):
-    """Generate a rasterized version of the PDF by scale."""
-    pdf_doc = fitz.open(input_pdf_path)
-    page = pdf_doc.load_page(0) 
-    original_width = page.rect.width
-    original_height = page.rect.height
-    zoom = dpi / 72 
-    matrix = fitz.Matrix(zoom, zoom) 
-    pix = page.get_pixmap(matrix=matrix) 
-    img = Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
-    target_width = int(original_width * zoom)
-    target_height = int(original_height * zoom)
-    img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)  # Use LANCZOS for high-quality resampling
-    img.save(output_pdf_path)
+def generate_rasterized_pdf(input_pdf_path, output_pdf_path, dpi=200, max_band_mb=64, jpg_quality=75):
+    """Rasterize every page of a PDF, rendering horizontal bands of at most max_band_mb (RGB) at a time."""
+    import fitz
+    zoom = dpi / 72
+    matrix = fitz.Matrix(zoom, zoom)
+    src = fitz.open(input_pdf_path)
+    out = fitz.open()
+    for page in src:
+        rect = page.rect
+        out_page = out.new_page(width=rect.width, height=rect.height)
+        # rows per band from the memory cap, band height snapped to whole pixels
+        rows = max(1, int(max_band_mb * 1024 * 1024 // (math.ceil(rect.width * zoom) * 3)))
+        # parse the page once, every band replays the display list
+        display_list = page.get_displaylist()
+        y = rect.y0
+        while y < rect.y1:
+            clip = fitz.Rect(rect.x0, y, rect.x1, min(y + rows / zoom, rect.y1))
+            pix = display_list.get_pixmap(matrix=matrix, clip=clip, alpha=False)
+            target = fitz.Rect(0, clip.y0 - rect.y0, rect.width, clip.y1 - rect.y0)
+            out_page.insert_image(target, stream=pix.tobytes("jpeg", jpg_quality=jpg_quality))
+            del pix
+            y = clip.y1
+    # a killed worker must not leave a truncated file that needs_rasterized takes as up to date
+    # (no .pdf suffix: the figure lists pick up every *.pdf)
+    tmp = f"{output_pdf_path}.{os.getpid()}.tmp"
+    try:
+        out.save(tmp, garbage=3, deflate=True)
+        os.replace(tmp, output_pdf_path)
+    finally:
+        out.close()
+        src.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+_display_lists = {} # (path, mtime_ns, page) -> fitz display list, per render process
+
+def render_pdf_clip(pdf_path, page_no, zoom, clip=None):
+    """Render clip (x0, y0, x1, y1 in points, None: whole page) of a page at zoom -> (width, height, RGB bytes)."""
+    import fitz
+    key = (pdf_path, os.stat(pdf_path).st_mtime_ns, page_no)
+    display_list = _display_lists.get(key)
+    if display_list is None:
+        # parsing a huge vector page is the slow part: do it once, every tile replays the list
+        doc = fitz.open(pdf_path)
+        display_list = doc[page_no].get_displaylist()
+        doc.close()
+        if len(_display_lists) >= 2:
+            _display_lists.pop(next(iter(_display_lists)))
+        _display_lists[key] = display_list
+    pix = display_list.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=fitz.Rect(clip) if clip else None, alpha=False)
+    return pix.width, pix.height, pix.samples
 
 def filter_pdf(pdf_files):
     """List PDFs with prioritize rasterized versions."""
@@ -33,14 +72,76 @@ def filter_pdf(pdf_files):
             display_files.remove(base_name[:-11] + ".pdf")
     return display_files
 
-def rasterize_process_check(out_prepocess_dir):
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError: # not on Linux
+        return os.cpu_count() or 1
+
+def needs_rasterized(pdf_path, max_size_mb=8):
+    """Big PDF without an up-to-date rasterized version -> (True, rasterized path)."""
+    base_name, ext = os.path.splitext(pdf_path)
+    rasterized = base_name + "_rasterized" + ext
+    if base_name.endswith("_rasterized") or not check_file_size(pdf_path, max_size_mb=max_size_mb):
+        return False, rasterized
+    if os.path.exists(rasterized) and os.path.getmtime(rasterized) >= os.path.getmtime(pdf_path):
+        return False, rasterized
+    return True, rasterized
+
+def rasterize_process_check(out_prepocess_dir, max_workers=None, progress_callback=None, memory_mb=256):
     print(f"Generate additional rasterized version for big files in {out_prepocess_dir}")
     pdfs = sorted(os.path.join(out_prepocess_dir, fn)
         for fn in os.listdir(out_prepocess_dir) if fn.lower().endswith(".pdf")
     )
+    jobs = []
     for x in pdfs:
-        if check_file_size(x, max_size_mb=8):
-            base_name, ext = os.path.splitext(x)
-            x_rasterized = base_name + "_rasterized" + ext
-            generate_rasterized_pdf(x, x_rasterized)
-            print(f"|-- Rasterized version of {x} generated and saved")
+        todo, x_rasterized = needs_rasterized(x)
+        if todo:
+            jobs.append((x, x_rasterized))
+        elif os.path.exists(x_rasterized):
+            print(f"|-- Rasterized version of {x} is up to date")
+    if not jobs:
+        return
+    workers = min(len(jobs), max_workers or available_cpus())
+    # memory_mb is shared by all workers, each renders bands of its share
+    band_mb = max(1, memory_mb // workers)
+    if workers == 1:
+        for i, (x, x_rasterized) in enumerate(jobs):
+            generate_rasterized_pdf(x, x_rasterized, max_band_mb=band_mb)
+            report_rasterized(x, i + 1, len(jobs), progress_callback)
+        return
+    # spawn: forking a process that runs Qt threads is unsafe
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    import multiprocessing
+    from task_control import shutdown_pool
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    finished = False
+    try:
+        futures = {pool.submit(generate_rasterized_pdf, x, x_rasterized, max_band_mb=band_mb): x for x, x_rasterized in jobs}
+        for i, fut in enumerate(as_completed(futures)):
+            fut.result()
+            # progress reports are cancel points: a cancel stops the queued and running files too
+            report_rasterized(futures[fut], i + 1, len(jobs), progress_callback)
+        finished = True
+    finally:
+        shutdown_pool(pool, finished)
+
+def report_rasterized(path, done, total, progress_callback):
+    print(f"|-- Rasterized version of {path} generated and saved")
+    if progress_callback:
+        progress_callback({"stage": "rasterize", "done": done, "total": total,
+                           "message": f"Rasterizing figures {done}/{total}: {os.path.basename(path)}"})
+
+
+def warm_up_imports(modules=HEAVY_MODULES):
+    """Import modules ahead of first use, return import time per module (in seconds)."""
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Preloading {name} failed: {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings